@@ -13,6 +13,10 @@ import jaydebeapi
 import sys
 import traceback
 import logging
+try:
+    from secret_cache import secret_cache
+except ImportError:
+    secret_cache = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -40,8 +44,11 @@ class FileNotFoundError(GlueJobError):
 def get_secret(vault_name,region_name):
     """"
     obtiene los secretos de la base de datos desde aws secret manager.
+    si el job se ejecuta con secret_cache.py en --extra-py-files se usa su cache.
     """
-    
+    if secret_cache is not None:
+        return secret_cache.get(vault_name, region_name=region_name)
+
     region_name = region_name
     session = boto3.session.Session()
     client = session.client(
@@ -14,6 +14,10 @@ import json
 from pyspark.sql.utils import AnalysisException
 from pyspark.sql.functions import substring, lit, col, count, regexp_replace
 from pyspark.sql import DataFrame
+try:
+    from secret_cache import secret_cache
+except ImportError:
+    secret_cache = None
 
 # configuracion de logging
 logging.basicConfig(level=logging.INFO)
@@ -42,8 +46,11 @@ class FileNotFoundError(GlueJobError):
 def get_secret(vault_name,region_name):
     """"
     obtiene los secretos de la base de datos desde aws secret manager.
+    si el job se ejecuta con secret_cache.py en --extra-py-files se usa su cache.
     """
-    
+    if secret_cache is not None:
+        return secret_cache.get(vault_name, region_name=region_name)
+
     region_name = region_name
     session = boto3.session.Session()
     client = session.client(
@@ -0,0 +1,116 @@
+"""
+Benchmark del arranque en frio (fase init) de las Lambdas.
+
+Por cada Lambda importa lambda_function en un interprete nuevo con
+python -X importtime, varias veces, y reporta la mediana del tiempo de
+importacion y los modulos con mayor costo acumulado. Con --save se guarda
+una linea base en JSON y con --compare se falla (exit 1) si alguna Lambda
+supera la linea base en mas de --tolerance.
+
+Uso (desde la raiz del repositorio):
+    python benchmarks/bench_cold_start.py [--runs 7] [--top 8]
+    python benchmarks/bench_cold_start.py --save benchmarks/cold_start_baseline.json
+    python benchmarks/bench_cold_start.py --compare benchmarks/cold_start_baseline.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HANDLERS = {
+    "main-lambda-component": os.path.join(ROOT, "main-lambda-component"),
+    "sqs-handler": os.path.join(ROOT, "sqs-handler"),
+    "main-lambda-event-minsait": os.path.join(ROOT, "main-lambda-event-minsait"),
+}
+CHILD = (
+    "import time; start = time.perf_counter(); import lambda_function; "
+    "print('INIT_MS', (time.perf_counter() - start) * 1000)"
+)
+
+
+def parse_importtime(stderr):
+    """
+    Lee la salida de -X importtime: modulo -> (self_us, cumulative_us)
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run_once(directory):
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        cwd=directory, env=env, capture_output=True, text=True, check=True,
+    )
+    init_ms = float(next(line.split()[1] for line in result.stdout.splitlines() if line.startswith("INIT_MS")))
+    return init_ms, parse_importtime(result.stderr)
+
+
+def measure(directory, runs):
+    init_times = []
+    last_modules = {}
+    for _ in range(runs):
+        init_ms, last_modules = run_once(directory)
+        init_times.append(init_ms)
+    return {
+        "init_ms_p50": round(statistics.median(init_times), 1),
+        "init_ms_min": round(min(init_times), 1),
+        "modules": last_modules,
+    }
+
+
+def top_modules(modules, top):
+    # Se excluye el propio lambda_function y site (arranque del interprete)
+    candidates = [(name, cumulative) for name, (_, cumulative) in modules.items() if name not in ("lambda_function", "site")]
+    return sorted(candidates, key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--save", help="guarda la mediana por Lambda como linea base")
+    parser.add_argument("--compare", help="linea base contra la que se compara")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="regresion maxima permitida (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = {}
+    for name, directory in HANDLERS.items():
+        result = measure(directory, args.runs)
+        results[name] = result["init_ms_p50"]
+        print(f"\n{name}: init p50 {result['init_ms_p50']} ms (min {result['init_ms_min']} ms, {args.runs} ejecuciones)")
+        for module, cumulative in top_modules(result["modules"], args.top):
+            print(f"    {module:<40} {cumulative / 1000:8.1f} ms")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nLinea base guardada en {args.save}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = []
+        print("\nComparacion con la linea base:")
+        for name, init_ms in results.items():
+            if name not in baseline:
+                continue
+            change = (init_ms - baseline[name]) / baseline[name]
+            print(f"    {name:<28} {baseline[name]:8.1f} -> {init_ms:8.1f} ms ({change:+.0%})")
+            if change > args.tolerance:
+                regressions.append(name)
+        if regressions:
+            print(f"Regresion de arranque en frio en: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
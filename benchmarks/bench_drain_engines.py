@@ -0,0 +1,155 @@
+"""
+Benchmark de los motores de drenado de sqs-handler contra un Latinia local.
+
+Drena una cola SQS en memoria con --messages mensajes y los envia por HTTP a
+un servidor local que simula Latinia con --latency-ms de latencia por
+solicitud. Compara el envio secuencial (threads con concurrency 1), el motor
+threads y, si aiohttp esta instalado, el motor asyncio, y reporta mensajes
+por segundo y, con --memory, el pico de memoria de cada drenado.
+
+Uso (desde la raiz del repositorio):
+    python benchmarks/bench_drain_engines.py [--messages 2000] [--latency-ms 50]
+    python benchmarks/bench_drain_engines.py --concurrency 10 --async-concurrency 200 --memory
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SQS_HANDLER = os.path.join(ROOT, "sqs-handler", "lambda_function.py")
+
+
+def load_sqs_handler():
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    spec = importlib.util.spec_from_file_location("sqs_handler_lambda_function", SQS_HANDLER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class LatiniaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def latinia_handler(latency_seconds):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            time.sleep(latency_seconds)
+            body = b'{"codigo":"0"}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class FakeSQS:
+    """
+    Cola SQS en memoria: entrega lotes de 10 mensajes y cuenta los eliminados
+    """
+
+    def __init__(self, count):
+        self.messages = [
+            {
+                "MessageId": f"m-{index}",
+                "ReceiptHandle": f"r-{index}",
+                "Body": json.dumps({"payload": {"header": {"id": f"m-{index}", "refService": "PAGTC"}, "data": {"valor": "1"}}}),
+            }
+            for index in range(count)
+        ]
+        self.deleted = 0
+        self.delete_calls = 0
+        self._lock = threading.Lock()
+
+    def get_queue_attributes(self, QueueUrl, AttributeNames):
+        return {"Attributes": {"ApproximateNumberOfMessages": str(len(self.messages))}}
+
+    def receive_message(self, MaxNumberOfMessages, **kwargs):
+        with self._lock:
+            batch, self.messages = self.messages[:MaxNumberOfMessages], self.messages[MaxNumberOfMessages:]
+        return {"Messages": batch} if batch else {}
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        with self._lock:
+            self.deleted += len(Entries)
+            self.delete_calls += 1
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries]}
+
+    def change_message_visibility_batch(self, QueueUrl, Entries):
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries]}
+
+
+def run_engine(sqs_handler, latinia_url, messages, engine, concurrency, memory):
+    sqs = FakeSQS(messages)
+    sqs_handler.get_client = lambda service_name, region_name=None: sqs
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    stats = sqs_handler.process_all_messages_and_send_to_latinia(
+        "url", latinia_url, 0, 0.5, 10, logging.getLogger("bench"), "secreto", "https://auth",
+        concurrency=concurrency, engine=engine,
+    )
+    elapsed = time.perf_counter() - start
+    peak_mb = None
+    if memory:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    return stats["successful_sends"], sqs.deleted, sqs.delete_calls, elapsed, peak_mb
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--sequential-messages", type=int, default=100, help="mensajes del envio secuencial")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="latencia simulada de Latinia")
+    parser.add_argument("--concurrency", type=int, default=10, help="hilos del motor threads")
+    parser.add_argument("--async-concurrency", type=int, default=200, help="envios en curso del motor asyncio")
+    parser.add_argument("--memory", action="store_true", help="mide el pico de memoria con tracemalloc")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    sqs_handler = load_sqs_handler()
+    sqs_handler.get_oauth_token = lambda *args, **kwargs: "token"
+    sqs_handler.put_metrics = lambda *args, **kwargs: {}
+
+    server = LatiniaServer(("127.0.0.1", 0), latinia_handler(args.latency_ms / 1000))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    latinia_url = f"http://127.0.0.1:{server.server_address[1]}/notify"
+
+    runs = [
+        ("secuencial", sqs_handler.DRAIN_ENGINE_THREADS, 1, args.sequential_messages),
+        ("threads", sqs_handler.DRAIN_ENGINE_THREADS, args.concurrency, args.messages),
+    ]
+    if importlib.util.find_spec("aiohttp") is not None:
+        runs.append(("asyncio", sqs_handler.DRAIN_ENGINE_ASYNCIO, args.async_concurrency, args.messages))
+    else:
+        print("aiohttp no esta instalado: se omite el motor asyncio")
+
+    print(f"Latinia local con {args.latency_ms} ms de latencia")
+    for name, engine, concurrency, messages in runs:
+        sent, deleted, delete_calls, elapsed, peak_mb = run_engine(sqs_handler, latinia_url, messages, engine, concurrency, args.memory)
+        line = f"{name:<11} concurrency {concurrency:>4}: {sent}/{messages} enviados, {deleted} eliminados en {delete_calls} llamadas, {sent / elapsed:8.1f} msgs/s"
+        if peak_mb is not None:
+            line += f", pico de memoria {peak_mb:.1f} MB"
+        print(line)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
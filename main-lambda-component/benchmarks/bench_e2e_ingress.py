@@ -0,0 +1,426 @@
+"""
+Benchmark de punta a punta de la Lambda de ingreso (lambda_handler) sin desplegar.
+
+Dependencias simuladas:
+- S3 (configuracion YAML con ETag), SQS y Secrets Manager: clientes en memoria
+  con latencia configurable, instalados en el cache de clientes de boto3
+- MySQL: conexion de pymysql simulada que responde pa_tcr_obtener_param_noti
+  con latencia de conexion y de consulta
+- Latinia y Cognito: servidor HTTP local con latencia, variacion y tasa de
+  errores (503) configurables
+
+Ejecuta N invocaciones con la concurrencia indicada y reporta latencia p50,
+p95 y p99, throughput, codigos de respuesta y tiempos por etapa (config,
+validation, secret, db_params, oauth, latinia, sqs). Los tiempos por etapa
+son inclusivos: oauth incluye la lectura de su secreto.
+
+Modos:
+- warm: contenedor caliente, los caches se conservan entre invocaciones
+- cold: antes de cada invocacion se vacian los caches del contenedor
+  (configuracion, secretos, parametros, conexion a MySQL, token, sesiones
+  HTTP y clientes). Se ejecuta con concurrencia 1, porque los caches son
+  compartidos por los hilos. La importacion del modulo se mide aparte con
+  benchmarks/bench_cold_start.py en la raiz del repositorio.
+
+Uso (desde main-lambda-component):
+    python benchmarks/bench_e2e_ingress.py [--invocations 200] [--concurrency 8] [--mode both]
+    python benchmarks/bench_e2e_ingress.py --latinia-latency-ms 120 --latinia-error-rate 0.05 --json resultado.json
+"""
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pymysql
+import yaml
+from botocore.exceptions import ClientError
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+import lambda_function
+import request_validation
+from request_validation import NEMONIC_CONFIG
+from utils import aws_clients
+from utils import utils as lambda_utils
+from utils.secret_cache import DEFAULT_REGION, secret_cache
+
+STAGES = [
+    ("config", "load_yaml_file"),
+    ("catalog", "refresh_nemonic_catalog"),
+    ("validation", "parse_request"),
+    ("validation", "validate_body"),
+    ("secret", "get_secret"),
+    ("db_params", "get_params_noti_from_secret"),
+    ("oauth", "get_oauth_token"),
+    ("latinia", "send_notification_to_latinia"),
+    ("sqs", "send_notification_to_queue"),
+    ("sqs", "send_notifications_to_queue"),
+]
+DB_PARAMS = [
+    {"pa_nombre": "NotiEmpresa", "pa_valor": "BOLIVARIANO", "pa_descripcion": ""},
+    {"pa_nombre": "NotiRefMessageLabel", "pa_valor": "Avisos24", "pa_descripcion": ""},
+]
+
+
+def pause(latency_ms, jitter_ms=0.0):
+    delay = latency_ms + (random.uniform(-jitter_ms, jitter_ms) if jitter_ms else 0.0)
+    if delay > 0:
+        time.sleep(delay / 1000)
+
+
+class FakeS3:
+    def __init__(self, config_file, latency_ms):
+        self.body = yaml.safe_dump(config_file).encode("utf-8")
+        self.etag = f'"{uuid.uuid4().hex}"'
+        self.latency_ms = latency_ms
+        # El catalogo de nemonicos se sirve igual al del paquete
+        self.objects = {}
+        catalog_key = (config_file.get("nemonics") or {}).get("s3_key")
+        if catalog_key:
+            self.objects[catalog_key] = json.dumps(NEMONIC_CONFIG).encode("utf-8")
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None):
+        pause(self.latency_ms)
+        if IfNoneMatch == self.etag:
+            raise ClientError({"Error": {"Code": "304"}, "ResponseMetadata": {"HTTPStatusCode": 304}}, "GetObject")
+        return {"Body": io.BytesIO(self.objects.get(Key, self.body)), "ETag": self.etag}
+
+    def put_object(self, **kwargs):
+        pause(self.latency_ms)
+        return {"ETag": self.etag}
+
+
+class FakeSQS:
+    def __init__(self, latency_ms):
+        self.latency_ms = latency_ms
+
+    def send_message(self, QueueUrl, MessageBody, **kwargs):
+        pause(self.latency_ms)
+        return {"MessageId": str(uuid.uuid4())}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        pause(self.latency_ms)
+        return {"Successful": [{"Id": entry["Id"], "MessageId": str(uuid.uuid4())} for entry in Entries], "Failed": []}
+
+
+class FakeSecretsManager:
+    def __init__(self, latency_ms):
+        self.latency_ms = latency_ms
+
+    def get_secret_value(self, SecretId):
+        pause(self.latency_ms)
+        secret = {
+            "username": "bench", "password": "bench", "host": "127.0.0.1", "port": "3306", "dbname": "DB_TC_ODS",
+            "client_id": "bench-client-id", "client_secret": "bench-client-secret",
+        }
+        return {"SecretString": json.dumps(secret)}
+
+
+class FakeMySQLConnection:
+    """
+    Conexion de pymysql simulada: responde pa_tcr_obtener_param_noti
+    """
+
+    def __init__(self, query_latency_ms):
+        self.query_latency_ms = query_latency_ms
+        self.description = [("pa_nombre",), ("pa_valor",), ("pa_descripcion",)]
+
+    def ping(self, reconnect=True):
+        pass
+
+    def close(self):
+        pass
+
+    @contextlib.contextmanager
+    def cursor(self):
+        yield self
+
+    def callproc(self, name):
+        if name != "pa_tcr_obtener_param_noti":
+            raise pymysql.err.ProgrammingError(1305, f"PROCEDURE {name} does not exist")
+        pause(self.query_latency_ms)
+
+    def fetchall(self):
+        return [dict(row) for row in DB_PARAMS]
+
+
+class LatiniaMock:
+    """
+    Servidor HTTP local para Latinia (/latinia) y Cognito (/oauth2/token)
+    """
+
+    def __init__(self, latency_ms, jitter_ms, error_rate, oauth_latency_ms):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Sin esto el ACK retardado agrega ~40 ms a las conexiones keep-alive
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if self.path.startswith("/oauth2/token"):
+                    pause(mock.oauth_latency_ms)
+                    self.respond(200, {"access_token": uuid.uuid4().hex, "expires_in": 3600, "token_type": "Bearer"})
+                elif random.random() < mock.error_rate:
+                    pause(mock.latency_ms, mock.jitter_ms)
+                    self.respond(503, {"error": "Servicio no disponible"})
+                else:
+                    pause(mock.latency_ms, mock.jitter_ms)
+                    self.respond(200, {"codigo": 0, "mensaje": "OK"})
+
+            def respond(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.oauth_latency_ms = oauth_latency_ms
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeContext:
+    def __init__(self, timeout_ms):
+        self.deadline = time.monotonic() + timeout_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return int((self.deadline - time.monotonic()) * 1000)
+
+
+_current = threading.local()
+
+
+def instrument(stage, attribute):
+    """
+    Envuelve lambda_function.<attribute> para acumular su tiempo en la etapa
+    """
+    original = getattr(lambda_function, attribute)
+
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            stages = getattr(_current, "stages", None)
+            if stages is not None:
+                stages[stage] = stages.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+
+    setattr(lambda_function, attribute, wrapper)
+
+
+def build_config(latinia_url, rate_limit):
+    with open(os.path.join(ROOT, "config-dev.yml")) as file:
+        config = yaml.safe_load(file)
+    config["latinia"]["url"] = f"{latinia_url}/latinia"
+    config["latinia"]["auth"] = f"{latinia_url}/oauth2/token"
+    config["latinia"]["circuit_breaker"] = {"store": "memory"}
+    config["latinia"]["rate_limit"] = {"enabled": rate_limit > 0, "rate_per_second": rate_limit, "store": "memory"}
+    config["lambda"]["ids"] = {"store": "random"}
+    config["logging"]["level"] = "CRITICAL"
+    config["logging"]["payload_sample_rate"] = 0
+    return config
+
+
+def build_event(batch_size):
+    nemonic, settings = next(iter(NEMONIC_CONFIG.items()))
+
+    def notification():
+        return {
+            "refService": nemonic,
+            "channels": "BMO",
+            "cod_ente": 123,
+            "data": {field: "valor" for field in settings["required_fields"]},
+            "addresses": [{"className": "email", "type": "TO", "ref": "usuario@ejemplo.com"}],
+        }
+
+    body = [notification() for _ in range(batch_size)] if batch_size else notification()
+    return {"body": json.dumps(body)}
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.latinia = LatiniaMock(args.latinia_latency_ms, args.latinia_jitter_ms, args.latinia_error_rate, args.oauth_latency_ms)
+        self.config = build_config(self.latinia.url, args.rate_limit)
+        self.s3 = FakeS3(self.config, args.s3_latency_ms)
+        self.sqs = FakeSQS(args.sqs_latency_ms)
+        self.secrets = FakeSecretsManager(args.secret_latency_ms)
+        self.event = build_event(args.batch_size)
+        pymysql.connect = self.connect_mysql
+        for stage, attribute in STAGES:
+            instrument(stage, attribute)
+        self.install_clients()
+
+    def connect_mysql(self, **kwargs):
+        pause(self.args.db_connect_ms)
+        return FakeMySQLConnection(self.args.db_latency_ms)
+
+    def install_clients(self):
+        aws_clients._clients.update({"s3": self.s3, "sqs": self.sqs})
+        secret_cache._clients[DEFAULT_REGION] = self.secrets
+        secret_cache._clients["us-east-1"] = self.secrets
+
+    def reset_container(self):
+        """
+        Vacia los caches que un contenedor nuevo no tendria
+        """
+        lambda_function.config_cache.invalidate()
+        request_validation._catalog_cache = None
+        request_validation._catalog_next_check = 0.0
+        lambda_function.oauth_token_cache.invalidate()
+        lambda_function._circuit_breakers.clear()
+        lambda_function._rate_limiters.clear()
+        secret_cache.invalidate()
+        lambda_utils.invalidate_params_noti_cache()
+        lambda_utils.close_db_connection()
+        with lambda_utils._sessions_lock:
+            for session in lambda_utils._sessions.values():
+                session.close()
+            lambda_utils._sessions.clear()
+        aws_clients._clients.clear()
+        secret_cache._clients.clear()
+        self.install_clients()
+
+    def invoke(self, cold):
+        if cold:
+            self.reset_container()
+        _current.stages = {}
+        start = time.perf_counter()
+        response = lambda_function.lambda_handler(self.event, FakeContext(self.args.timeout_ms))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        stages = _current.stages
+        _current.stages = None
+        return elapsed_ms, response["statusCode"], stages
+
+    def run(self, mode):
+        cold = mode == "cold"
+        concurrency = 1 if cold else self.args.concurrency
+        if not cold:
+            # Calentamiento: la primera invocacion llena los caches
+            self.invoke(False)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda _: self.invoke(cold), range(self.args.invocations)))
+        wall_seconds = time.perf_counter() - start
+        return summarize(mode, concurrency, results, wall_seconds)
+
+    def close(self):
+        self.latinia.close()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def distribution(values):
+    return {
+        "p50": round(percentile(values, 0.50), 2),
+        "p95": round(percentile(values, 0.95), 2),
+        "p99": round(percentile(values, 0.99), 2),
+        "max": round(max(values), 2),
+        "mean": round(statistics.fmean(values), 2),
+    }
+
+
+def summarize(mode, concurrency, results, wall_seconds):
+    latencies = [elapsed for elapsed, _, _ in results]
+    status_codes = {}
+    stage_values = {}
+    for _, status_code, stages in results:
+        status_codes[str(status_code)] = status_codes.get(str(status_code), 0) + 1
+        for stage, elapsed in stages.items():
+            stage_values.setdefault(stage, []).append(elapsed)
+    ordered_stages = [stage for stage in dict.fromkeys(name for name, _ in STAGES) if stage in stage_values]
+    return {
+        "mode": mode,
+        "invocations": len(results),
+        "concurrency": concurrency,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_per_second": round(len(results) / wall_seconds, 1),
+        "latency_ms": distribution(latencies),
+        "status_codes": status_codes,
+        "stages_ms": {stage: {"count": len(stage_values[stage]), **distribution(stage_values[stage])} for stage in ordered_stages},
+    }
+
+
+def print_result(result):
+    latency = result["latency_ms"]
+    print(f"\n[{result['mode']}] {result['invocations']} invocaciones, concurrencia {result['concurrency']}, "
+          f"{result['wall_seconds']} s, {result['throughput_per_second']} invocaciones/s")
+    print(f"    latencia ms: p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    print(f"    codigos de respuesta: {result['status_codes']}")
+    print(f"    {'etapa':<12} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for stage, values in result["stages_ms"].items():
+        print(f"    {stage:<12} {values['count']:>6} {values['p50']:>9} {values['p95']:>9} {values['p99']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invocations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mode", choices=["warm", "cold", "both"], default="both")
+    parser.add_argument("--batch-size", type=int, default=0, help="0 envia una notificacion; N envia un lote de N")
+    parser.add_argument("--timeout-ms", type=int, default=10000, help="tiempo restante de la Lambda al iniciar")
+    parser.add_argument("--latinia-latency-ms", type=float, default=50)
+    parser.add_argument("--latinia-jitter-ms", type=float, default=20)
+    parser.add_argument("--latinia-error-rate", type=float, default=0.0)
+    parser.add_argument("--oauth-latency-ms", type=float, default=30)
+    parser.add_argument("--s3-latency-ms", type=float, default=15)
+    parser.add_argument("--sqs-latency-ms", type=float, default=15)
+    parser.add_argument("--secret-latency-ms", type=float, default=20)
+    parser.add_argument("--db-connect-ms", type=float, default=25)
+    parser.add_argument("--db-latency-ms", type=float, default=5)
+    parser.add_argument("--rate-limit", type=float, default=0, help="limite de Latinia en solicitudes por segundo (0 sin limite)")
+    parser.add_argument("--json", help="guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    harness = Harness(args)
+    modes = ["warm", "cold"] if args.mode == "both" else [args.mode]
+    results = []
+    try:
+        for mode in modes:
+            # La Lambda escribe prints y metricas EMF en stdout
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                result = harness.run(mode)
+            results.append(result)
+            print_result(result)
+    finally:
+        harness.close()
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
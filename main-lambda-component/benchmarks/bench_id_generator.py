@@ -0,0 +1,86 @@
+"""
+Benchmark del generador de IDs de notificacion.
+
+Compara el generador anterior (timestamp fijo al importar + 6 digitos de
+hash(uuid4)) con NotificationIdGenerator en:
+- throughput (IDs por segundo en un proceso)
+- colisiones al simular varios contenedores concurrentes que generan IDs
+  durante el mismo segundo
+
+Uso (desde main-lambda-component):
+    python benchmarks/bench_id_generator.py [--ids 200000] [--containers 50]
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+import uuid
+
+import pytz
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.id_generator import NotificationIdGenerator, random_worker_id
+
+FECHA_ARRANQUE = datetime.datetime.now(pytz.timezone("America/Guayaquil"))
+
+
+def legacy_id(canal: str = "BMO", fecha_proceso=FECHA_ARRANQUE) -> str:
+    """Generador anterior: la fecha se evaluaba una sola vez al importar"""
+    canal = canal.ljust(3, '0')[:3]
+    timestamp = fecha_proceso.strftime("%Y%m%d%H%M%S")
+    uuid_suffix = str(abs(hash(str(uuid.uuid4()))))[-6:].zfill(6)
+    return f"{canal}{timestamp}{uuid_suffix}"
+
+
+def throughput(generate, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        generate("BMO")
+    elapsed = time.perf_counter() - start
+    return count / elapsed
+
+
+def collisions(ids):
+    return len(ids) - len(set(ids))
+
+
+def simulate_containers(containers, ids_per_container, worker_ids):
+    """
+    Contenedores concurrentes que comparten el mismo reloj (el peor caso:
+    todos generan en el mismo milisegundo que avanza a la par)
+    """
+    now_ns = [time.time_ns()]
+    generators = [NotificationIdGenerator(worker_id=worker, clock=lambda: now_ns[0]) for worker in worker_ids]
+    ids = []
+    for step in range(ids_per_container):
+        for generator in generators:
+            ids.append(generator.next_id("BMO"))
+        if step % 50 == 0:
+            now_ns[0] += 1_000_000
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ids", type=int, default=200000)
+    parser.add_argument("--containers", type=int, default=50)
+    args = parser.parse_args()
+
+    generator = NotificationIdGenerator(worker_id=1)
+    print(f"Throughput ({args.ids} IDs)")
+    print(f"    anterior       {throughput(legacy_id, args.ids):>12,.0f} IDs/s")
+    print(f"    snowflake      {throughput(generator.next_id, args.ids):>12,.0f} IDs/s")
+
+    per_container = max(1, args.ids // args.containers)
+    legacy = [legacy_id() for _ in range(per_container * args.containers)]
+    leased = simulate_containers(args.containers, per_container, range(args.containers))
+    randomized = simulate_containers(args.containers, per_container, [random_worker_id() for _ in range(args.containers)])
+    print(f"\nColisiones ({args.containers} contenedores x {per_container} IDs)")
+    print(f"    anterior                       {collisions(legacy):>8}")
+    print(f"    snowflake, worker de DynamoDB  {collisions(leased):>8}")
+    print(f"    snowflake, worker aleatorio    {collisions(randomized):>8}")
+
+
+if __name__ == "__main__":
+    main()
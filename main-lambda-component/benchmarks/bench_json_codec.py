@@ -0,0 +1,82 @@
+"""
+Benchmark de serializacion JSON en la ruta de una notificacion.
+
+Compara json de la libreria estandar con utils.json_codec (orjson si esta
+instalado) en las operaciones que hace cada notificacion:
+- loads del body de API Gateway
+- dumps del MessageBody para SQS
+- dumps del payload para Latinia (bytes)
+- loads del MessageBody en el sqs-handler
+
+Uso (desde main-lambda-component):
+    python benchmarks/bench_json_codec.py [--iterations 50000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import json_codec
+
+LATINIA_PAYLOAD = {
+    "canal": "BMO",
+    "nemonico": "TRANSFERENCIA",
+    "idNotificacion": "BMO2025010212345612300001000",
+    "cliente": {
+        "identificacion": "0912345678",
+        "nombre": "José Peña Álvarez",
+        "correo": "jose.pena@example.com",
+        "telefono": "+593991234567",
+    },
+    "parametros": {f"campo{i}": f"valor con tildes á é í ó ú {i}" for i in range(20)},
+    "montos": [1250.75, 10.0, 0.35],
+    "fechaProceso": "2025-01-02 12:34:56",
+}
+SQS_ENVELOPE = {"body": LATINIA_PAYLOAD, "fecha_proceso": "2025-01-02 12:34:56"}
+
+
+def stdlib_dumps(value):
+    return json.dumps(value)
+
+
+def stdlib_dumps_bytes(value):
+    return json.dumps(value).encode("utf-8")
+
+
+def timed(function, argument, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function(argument)
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    request_body = json.dumps(LATINIA_PAYLOAD)
+    message_body = json.dumps(SQS_ENVELOPE)
+    cases = [
+        ("loads body API Gateway", json.loads, json_codec.loads, request_body),
+        ("dumps MessageBody SQS", stdlib_dumps, json_codec.dumps, SQS_ENVELOPE),
+        ("dumps payload Latinia", stdlib_dumps_bytes, json_codec.dumps_bytes, LATINIA_PAYLOAD),
+        ("loads MessageBody SQS", json.loads, json_codec.loads, message_body),
+    ]
+
+    print(f"Backend de json_codec: {json_codec.JSON_BACKEND} ({args.iterations} iteraciones)")
+    print(f"{'operacion':<26} {'json (us)':>10} {'codec (us)':>11} {'mejora':>8}")
+    total_stdlib = total_codec = 0.0
+    for name, stdlib, codec, argument in cases:
+        stdlib_us = timed(stdlib, argument, args.iterations)
+        codec_us = timed(codec, argument, args.iterations)
+        total_stdlib += stdlib_us
+        total_codec += codec_us
+        print(f"{name:<26} {stdlib_us:10.2f} {codec_us:11.2f} {stdlib_us / codec_us:7.1f}x")
+    print(f"{'total por notificacion':<26} {total_stdlib:10.2f} {total_codec:11.2f} {total_stdlib / total_codec:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
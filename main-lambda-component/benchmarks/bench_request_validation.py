@@ -0,0 +1,102 @@
+"""
+Benchmark del costo de validacion por request segun el tamaño del catalogo de nemonicos.
+
+Compara jsonschema.validate con el esquema completo (comportamiento anterior),
+el validador completo precompilado (todo el allOf) y los validadores
+precompilados por nemonico, y la validacion rapida generada como codigo Python.
+
+Uso (desde main-lambda-component):
+    python benchmarks/bench_request_validation.py [--iterations 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from jsonschema import validate
+from jsonschema.exceptions import best_match
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from request_validation import build_fast_validators, build_request_schema, build_request_validators, select_validator
+
+DATA_FIELDS = [
+    "desccanal", "canal", "tipotrj", "valor", "numtrj", "identi", "des_transaccion",
+    "des_comercio", "plazo", "nombre_titular", "estado_pais", "nom_pais", "fecha",
+    "hora", "nombre_cliente", "motivo", "fecha_hora", "gsm", "email",
+]
+CATALOGUE_SIZES = [10, 25, 50, 100, 200]
+
+
+def build_catalogue(size, seed=7):
+    """
+    Genera un catalogo sintetico de nemonicos con campos requeridos aleatorios
+    """
+    rng = random.Random(seed)
+    return {
+        f"N{index:04d}": {
+            "description": f"Nemonico sintetico {index}",
+            "required_fields": rng.sample(DATA_FIELDS, rng.randint(3, 10)),
+        }
+        for index in range(size)
+    }
+
+
+def build_request(nemonic, config):
+    return {
+        "refService": nemonic,
+        "channels": "BMO",
+        "cod_ente": 123,
+        "data": {field: "valor" for field in config["required_fields"]},
+        "addresses": [{"className": "email", "type": "TO", "ref": "usuario@ejemplo.com"}],
+        "contents": [{"value": "hola", "type": "text/plain", "encoding": "UTF-8", "name": "mensaje"}],
+    }
+
+
+def measure(function, requests, iterations):
+    start = time.perf_counter()
+    for index in range(iterations):
+        function(requests[index % len(requests)])
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'nemonicos':>10} {'validate (us)':>15} {'allOf (us)':>12} {'por nemonico (us)':>18} {'codigo generado (us)':>21}")
+    for size in CATALOGUE_SIZES:
+        catalogue = build_catalogue(size)
+        requests = [build_request(nemonic, config) for nemonic, config in catalogue.items()]
+        schema = build_request_schema(catalogue)
+        validators = build_request_validators(catalogue)
+        fast_validators = build_fast_validators(catalogue)
+
+        def full_validation(body):
+            validate(instance=body, schema=schema)
+
+        def all_of_validation(body):
+            error = best_match(validators["all"].iter_errors(body))
+            if error is not None:
+                raise error
+
+        def precompiled_validation(body):
+            error = best_match(select_validator(body, validators).iter_errors(body))
+            if error is not None:
+                raise error
+
+        def fast_validation(body):
+            if not select_validator(body, fast_validators)(body):
+                raise ValueError("request invalido")
+
+        # jsonschema.validate verifica el esquema en cada llamada, se mide con menos iteraciones
+        full_us = measure(full_validation, requests, max(args.iterations // 100, 5))
+        all_of_us = measure(all_of_validation, requests, args.iterations)
+        precompiled_us = measure(precompiled_validation, requests, args.iterations)
+        fast_us = measure(fast_validation, requests, args.iterations * 10)
+        print(f"{size:>10} {full_us:>15.1f} {all_of_us:>12.1f} {precompiled_us:>18.1f} {fast_us:>21.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,39 @@
-import boto3
 import json
-import yaml
-from request_validation import validate_request
-from dotenv import load_dotenv
+from request_validation import parse_request,validate_body,validate_request,get_nemonic_priority,get_known_nemonic,refresh_nemonic_catalog
 import os
-import botocore
-from utils.utils import get_proccess_date,create_session,validate_config,build_latinia_payload
+from utils.utils import get_proccess_date,get_session,get_pool_config,get_connection_stats,post_with_budget,validate_config,build_latinia_payload
 from utils.utils import get_secret
 from utils.utils import get_params_noti_as_dict
-import requests
-import logging
-
+from utils import json_codec
+from utils.aws_clients import get_client
+from utils.config_cache import ConfigCache
+from utils.oauth_token import OAuthTokenCache
+from utils.circuit_breaker import build_circuit_breaker
+from utils.rate_limiter import build_rate_limiter
+from utils.deadline import LatencyBudget
+from utils.log_config import LazyJson, config_logger, log_payload
+from utils.id_generator import configure_id_generator
+from utils.claim_check import CLAIM_CHECK_ATTRIBUTE, configure_claim_check, delete_payload, offload_payload
+from utils.metrics import UNKNOWN_DIMENSION, InvocationSpans
 import uuid
-sqs = boto3.client('sqs')
-s3 = boto3.client('s3') 
 
 
 BUCKET_NAME = os.getenv("CONFIG_BUCKET_NAME") or "bb-emisormdp-config"
-load_dotenv()
+if os.path.exists(".env"):
+    # Solo para ejecucion local; en Lambda no existe y se evita importar dotenv
+    from dotenv import load_dotenv
+    load_dotenv()
 SECRET_KEY_NAME = os.getenv("SECRET_KEY_NAME") or "mysql_mock"
+FUNCTION_NAME = os.getenv("AWS_LAMBDA_FUNCTION_NAME") or "main-lambda-component"
+# Nombre del bucket en el almacen compartido; la tabla es la misma del circuit breaker
+RATE_LIMITER_NAME = "latinia-rate-limit"
+MYSQL_ACCESS_DENIED = 1045
+SQS_BATCH_MAX_MESSAGES = 10
+SQS_BATCH_MAX_BYTES = 256 * 1024
+config_cache = ConfigCache()
+oauth_token_cache = OAuthTokenCache()
+_circuit_breakers = {}
+_rate_limiters = {}
 
 flujo_operacion = {
     "codigoError":0,
@@ -31,13 +46,11 @@ flujo_operacion = {
 
 def load_yaml_file(config_path):
     """
-    Carga del archivo yaml de configuracion
+    Carga del archivo yaml de configuracion.
+    Se lee desde el cache del contenedor y se revalida contra S3 al vencer el TTL
     """
-    response = s3.get_object(Bucket=BUCKET_NAME, Key=config_path)
-    config_data = response['Body'].read().decode('utf-8')
-    print(f"Configuracion cargada desde S3: {BUCKET_NAME}/{config_path}")
     try:
-        config = yaml.safe_load(config_data)
+        config = config_cache.get(BUCKET_NAME, config_path)
         print(f"Configuracion cargada desde {config_path}")
         return config
 
@@ -45,36 +58,52 @@ def load_yaml_file(config_path):
         print(f"Error al cargar el archivo de configuracion: {e}")
         raise
 
-def config_logger(config_file: dict):
+def lambda_handler(event,context):
     """
-    configuracion del logger de la aplicacion lambda
-    Args:
-        config_file (dict): archivo de configuracion
+    Punto de entrada de la Lambda. Al terminar publica los tiempos por etapa
+    de la invocacion como metricas EMF (dimensiones Nemonic y Outcome)
     """
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    formatter = logging.Formatter(config_file["logging"]["format"])
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
-    error_handler = logging.StreamHandler()
-    error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(formatter)
-    logger.addHandler(error_handler)
-    warn_handler = logging.StreamHandler()
-    warn_handler.setLevel(logging.WARNING)
-    warn_handler.setFormatter(formatter)
-    logger.addHandler(warn_handler)
-    logger.info("Logger configurado correctamente")
-
-    return logger
+    spans = InvocationSpans(FUNCTION_NAME)
+    response = None
+    try:
+        response = handle_request(event, context, spans)
+        return response
+    finally:
+        spans.emit(get_outcome(response))
 
+def get_outcome(response):
+    """
+    Resultado de la invocacion para la dimension Outcome de las metricas
+    """
+    status_code = (response or {}).get("statusCode", 500)
+    if status_code == 207:
+        return "partial"
+    if status_code < 300:
+        return "success"
+    if status_code < 500:
+        return "invalid"
+    return "error"
+
+def get_batch_nemonic(bodies):
+    """
+    Nemonico de un lote para las metricas: el comun a todas las notificaciones o MIXED.
+    Los refService que no son nemonicos del catalogo cuentan como NA
+    """
+    nemonics = {get_known_nemonic(item.get("refService")) for item in bodies if isinstance(item, dict)}
+    if len(nemonics) != 1:
+        return "MIXED"
+    return nemonics.pop() or UNKNOWN_DIMENSION
+
+def handle_request(event, context, spans):
+    import botocore.exceptions
+    import requests
+    from utils.deadline import BudgetExceeded
 
-def lambda_handler(event,context):
     # *******************Carga de configuracion y logger************************
     enviroment = os.getenv("ENV")
     enviroment = "dev" if enviroment is None else enviroment
-    config_file = load_yaml_file(f"config-{enviroment}.yml")
+    with spans.span("config"):
+        config_file = load_yaml_file(f"config-{enviroment}.yml")
 
 
     if config_file is None:
@@ -84,7 +113,7 @@ def lambda_handler(event,context):
                 "Content-Type":"application/json",
                 
             },
-            'body':json.dumps({
+            'body':json_codec.dumps({
                 'codigoError':7011,
                 'message':'Error al cargar el archivo de configuracion',
                 'messageId':'',
@@ -94,9 +123,28 @@ def lambda_handler(event,context):
     logger = config_logger(config_file)
     fecha_proceso = get_proccess_date().strftime('%Y-%m-%d %H:%M:%S')
     logger.info("Fecha de proceso de notificacion: %s", fecha_proceso)
-    logger.info("Evento recibido: %s", json.dumps(event, indent=2, ensure_ascii=False))
+    logger.info("Evento recibido: %s", log_payload(event))
+    budget = LatencyBudget.from_context(context, config_file)
+    # Las etapas del presupuesto se publican junto con las de la invocacion
+    budget.stages = spans.stages
+    configure_id_generator(config_file["lambda"].get("ids"))
+    configure_claim_check(config_file.get("sqs", {}).get("claim_check"), config_file.get("s3", {}).get("bucket_name") or BUCKET_NAME)
+    with budget.stage("catalog"):
+        refresh_nemonic_catalog(config_file.get("nemonics"), config_file.get("s3", {}).get("bucket_name") or BUCKET_NAME)
     #********************Validacion de request************************
-    error,body = validate_request(event)
+    with budget.stage("validation"):
+        try:
+            request_body = parse_request(event)
+        except Exception:
+            request_body = None
+        if isinstance(request_body, list):
+            spans.set_nemonic(get_batch_nemonic(request_body))
+        else:
+            error,body = validate_request(event) if request_body is None else validate_body(request_body)
+            if not error:
+                spans.set_nemonic(get_known_nemonic(body.get("refService")))
+    if isinstance(request_body, list):
+        return process_notification_batch(request_body, config_file, logger, fecha_proceso, budget)
     if error:
         status_code = 400
         if error.get("error_type") == "UNEXPECTED_ERROR":
@@ -106,13 +154,13 @@ def lambda_handler(event,context):
             "headers": {
                 "Content-Type": "application/json",
             },
-            'body': json.dumps({
+            'body': json_codec.dumps({
                 'codigoError': 40001,
                 'error': error.get("error_type", "VALIDATION_ERROR"),
                 'message': error.get("message", "Error en la validación de datos"),
                 'details': error.get("errors", []) if error.get("error_type") == "VALIDATION_ERROR" else error.get("details"),
                 'timestamp': fecha_proceso,
-            }, ensure_ascii=False, indent=2)
+            }, pretty=True)
         }
     
     try:
@@ -120,7 +168,7 @@ def lambda_handler(event,context):
         validate_config(config_file)
         print(f"Archivo de configuracion valido: {config_file}")
         #*********************Obtencion de parametros de notificacion************************
-        queue_url = config_file["sqs"]["queue_url"]
+        queue_url = get_queue_url(config_file, body.get("refService"))
         parametro_mantenimiento = config_file["latinia"]["mantenimiento"]
         latinia_url = config_file["latinia"]["url"]
         latinia_url_auth = config_file["latinia"]["auth"]
@@ -130,7 +178,8 @@ def lambda_handler(event,context):
         backoff_factor = float(config_file["lambda"]["backoff"]["backoff_factor"])
         
         #lectura de secreto para conexion rds
-        secret = get_secret(db_secret_name)
+        with budget.stage("secret"):
+            secret = get_secret(db_secret_name)
         if secret is None:
             logger.error("No se pudo obtener el secreto de la base de datos")
             return {
@@ -139,20 +188,15 @@ def lambda_handler(event,context):
                     "Content-Type":"application/json",
                     
                 },
-                'body':json.dumps({
+                'body':json_codec.dumps({
                     'codigoError':60010,
                     'message':'Error al obtener el secreto de la base de datos',
                     'messageId':'',
                     'timestamp':fecha_proceso,
                 })
             }
-        user = secret["username"]
-        password = secret["password"]
-        host = secret["host"]
-        port = int(secret["port"])
-        db = secret["dbname"]
-
-        params_noti = get_params_noti_as_dict(user, password, host, port, db)
+        with budget.stage("db_params"):
+            params_noti = get_params_noti_from_secret(secret, db_secret_name, logger)
         if not params_noti:
             logger.error("No se encontraron parametros de notificacion")
             return {
@@ -161,19 +205,24 @@ def lambda_handler(event,context):
                     "Content-Type":"application/json",
                     
                 },
-                'body':json.dumps({
+                'body':json_codec.dumps({
                     'codigoError':60010,
                     'message':'No se encontraron parametros de notificacion',
                     'messageId':'',
                     'timestamp':fecha_proceso,
                 })
             }
-        logger.info(f"Parametros de notificacion obtenidos: {params_noti}")
-        body = build_latinia_payload(body,params_noti,logger)
-        logger.info(f"Payload de Latinia construido: {json.dumps(body, indent=2, ensure_ascii=False)}")
-        if parametro_mantenimiento is True:
-            logger.info("Latinia fuera de servicio.Todo trafico se envia hacia la cola")
-            message_id = send_notification_to_queue(queue_url, body,fecha_proceso)
+        logger.info("Parametros de notificacion obtenidos: %s", LazyJson(params_noti))
+        with budget.stage("payload"):
+            body = build_latinia_payload(body,params_noti,logger)
+        logger.info("Payload de Latinia construido: %s", log_payload(body))
+        circuit_breaker = get_circuit_breaker(config_file)
+        if parametro_mantenimiento is True or not circuit_breaker.allow_request():
+            logger.info(f"Latinia fuera de servicio (circuito {circuit_breaker.state}).Todo trafico se envia hacia la cola")
+            with budget.stage("sqs"):
+                message_id = send_notification_to_queue(queue_url, body,fecha_proceso)
+            spans.outcome = "queued"
+            logger.info(f"Presupuesto de latencia: {budget.summary()}")
 
             return {
                 "statusCode":200,
@@ -181,7 +230,7 @@ def lambda_handler(event,context):
                     "Content-Type":"application/json",
                     
                 },
-                'body':json.dumps({
+                'body':json_codec.dumps({
                     'codigoError':10,
                     'message':'Latinia fuera de servicio. Todo trafico se envia hacia la cola',
                     'messageId':message_id,
@@ -189,68 +238,93 @@ def lambda_handler(event,context):
                 })
             }
 
+        rate_limiter = get_rate_limiter(config_file)
+        if rate_limiter is not None and not rate_limiter.try_acquire():
+            # Sin tokens no se espera: la notificacion se envia a la cola
+            logger.info("Limite de envio a Latinia alcanzado. La notificacion se envia hacia la cola")
+            with budget.stage("sqs"):
+                message_id = send_notification_to_queue(queue_url, body,fecha_proceso)
+            spans.outcome = "rate_limited"
+            return {
+                "statusCode":200,
+                "headers":{
+                    "Content-Type":"application/json",
+                },
+                'body':json_codec.dumps({
+                    'codigoError':11,
+                    'message':'Limite de envio a Latinia alcanzado. La notificacion se envia hacia la cola',
+                    'messageId':message_id,
+                    'timestamp':fecha_proceso,
+                })
+            }
         else:
             logger.info("Latinia se encuentra disponible. Envio de notificacion a Latinia")
             timeout_seconds = int(config_file["latinia"]["timeout_seconds"])
-            session = create_session(reintentos,backoff_factor)
+            # Los reintentos se controlan con el presupuesto de tiempo, no con urllib3
+            session = get_session(latinia_url,0,backoff_factor,**get_pool_config(config_file))
             try:
-                oauth_token = get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger)
-                send_notification_to_latinia(latinia_url,body,session,timeout_seconds,logger,oauth_token)
+                with budget.stage("oauth"):
+                    oauth_token = get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger, budget=budget)
+                with budget.stage("latinia"):
+                    send_notification_to_latinia(
+                        latinia_url,body,session,timeout_seconds,logger,oauth_token,
+                        refresh_token=lambda: get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger, force_refresh=True, budget=budget),
+                        budget=budget,reintentos=reintentos,backoff_factor=backoff_factor,rate_limiter=rate_limiter,
+                    )
+                circuit_breaker.record_success()
+                logger.info(f"Reutilizacion de conexiones HTTP: {get_connection_stats()}")
+                logger.info(f"Presupuesto de latencia: {budget.summary()}")
                 return {
                 "statusCode":200,
                 "headers":{
                     "Content-Type":"application/json",
                     
                 },
-                'body':json.dumps({
+                'body':json_codec.dumps({
                     'codigoError':0,
                     'message':'Notificacion enviada a Latinia',
                     'messageId':'',
                     'timestamp':fecha_proceso,
                 })
             }
-            except requests.exceptions.Timeout:
-                send_notification_to_queue(queue_url, body,fecha_proceso)
+            except requests.exceptions.Timeout as e:
+                # BudgetExceeded: no hubo tiempo para intentar, Latinia no fallo
+                if not isinstance(e, BudgetExceeded):
+                    circuit_breaker.record_failure()
+                with budget.stage("sqs"):
+                    send_notification_to_queue(queue_url, body,fecha_proceso)
+                spans.outcome = "queued"
+                logger.info(f"Presupuesto de latencia: {budget.summary()}")
                 return {
                     "statusCode":500,
                     "headers":{
                         "Content-Type":"application/json",
                         
                     },
-                    'body':json.dumps({
+                    'body':json_codec.dumps({
                         'codigoError':60010,
-                        'message':'La solicitud a Latinia ha excedido el tiempo de espera. Cambiando parametro de mantenimiento a True',
+                        'message':'La solicitud a Latinia ha excedido el tiempo de espera. El mensaje será reencolado',
                         'messageId':'',
                         'timestamp':fecha_proceso,
                     })
                 }
-            
-            except requests.exceptions.Timeout:
-                message_id = send_notification_to_queue(queue_url, body,fecha_proceso)
-                change_param_to_config_file(config_file, "mantenimiento", True)
-                return {
-                    "statusCode": 500,
-                    "headers": {
-                        "Content-Type": "application/json",
-                    },
-                    'body': json.dumps({
-                        'codigoError': 60010,
-                        'message': f'La solicitud a Latinia ha excedido el tiempo de espera. Cambiando parametro de mantenimiento a True:',
-                        'messageId': message_id,
-                        'timestamp': fecha_proceso,
-                 })
-                }
             except requests.exceptions.RequestException as e:
                 logger.error(f"Hubo un error al comunicarse con Latinia. El mensaje será reencolado: {e}",exc_info=True,stack_info=True)
-                change_param_to_config_file(config_file, "mantenimiento", True)
-                message_id = send_notification_to_queue(queue_url, body,fecha_proceso)
+                if is_latinia_outage(e):
+                    circuit_breaker.record_failure()
+                else:
+                    circuit_breaker.record_success()
+                with budget.stage("sqs"):
+                    message_id = send_notification_to_queue(queue_url, body,fecha_proceso)
+                spans.outcome = "queued"
+                logger.info(f"Presupuesto de latencia: {budget.summary()}")
                 return {
                     "statusCode":500,
                     "headers":{
                         "Content-Type":"application/json",
                         
                     },
-                    'body':json.dumps({
+                    'body':json_codec.dumps({
                         'codigoError':69,
                         'message':'Error al comunicarse con Latinia. El mensaje será reencolado',
                         'messageId':message_id,
@@ -260,13 +334,12 @@ def lambda_handler(event,context):
             
     except ValueError as e:
         logger.error("Error en la validacion del archivo de configuracion",exc_info=True,stack_info=True)
-        change_param_to_config_file(config_file, "mantenimiento", True)
         return {
             "statusCode":500,
             "headers":{
                 "Content-Type":"application/json",    
             },
-            'body':json.dumps({
+            'body':json_codec.dumps({
                 'codigoError':60010,
                 'message':'Error al cargar el archivo de configuracion',
                 'messageId':'',
@@ -281,7 +354,7 @@ def lambda_handler(event,context):
                 "Content-Type":"application/json",
                 
             },
-            'body':json.dumps({
+            'body':json_codec.dumps({
                 'codigoError':9082,
                 'message':'Error al comunicarse con AWS',
                 'messageId':'',
@@ -297,7 +370,7 @@ def lambda_handler(event,context):
                 "Content-Type":"application/json",
                 
             },
-            'body':json.dumps({
+            'body':json_codec.dumps({
                'codigoError':69,
                 'message':'Error al comunicarse con latinia. el mensaje será reencolado',
                 'messageId':'',
@@ -305,16 +378,218 @@ def lambda_handler(event,context):
             })
         }    
 
-def get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger):
+def get_params_noti_from_secret(secret, db_secret_name, logger):
     """
-    Obtiene el token de autenticación de Latinia
+    Obtiene los parametros de notificacion con las credenciales del secreto.
+    Si la base de datos rechaza las credenciales se vuelve a leer el secreto
+    (rotacion) y se reintenta una vez
+    Args:
+        secret (dict): secreto de la base de datos
+        db_secret_name (str): nombre del secreto en Secrets Manager
+        logger (Logger): Logger configurado para la aplicación
+    Returns:
+        dict: parametros de notificacion
+    """
+    import pymysql
+
+    host = secret["host"]
+    port = int(secret["port"])
+    db = secret["dbname"]
+    try:
+        return get_params_noti_as_dict(secret["username"], secret["password"], host, port, db)
+    except pymysql.err.OperationalError as e:
+        if e.args[0] != MYSQL_ACCESS_DENIED:
+            raise
+        logger.warning("Credenciales de base de datos rechazadas. Se vuelve a leer el secreto")
+        secret = get_secret(db_secret_name, force_refresh=True)
+        return get_params_noti_as_dict(secret["username"], secret["password"], host, port, db)
+
+def process_notification_batch(bodies, config_file, logger, fecha_proceso, budget=None):
+    """
+    Procesa un lote de notificaciones en una sola invocacion.
+    Cada notificacion se valida y se construye por separado; el secreto, los
+    parametros, el token de OAuth y la sesion HTTP se obtienen una sola vez
+    para todo el lote, y las notificaciones que no se envian a Latinia se
+    encolan con SendMessageBatch
+    Args:
+        bodies (list): notificaciones recibidas
+        config_file (dict): archivo de configuracion
+        logger (Logger): Logger configurado para la aplicación
+        fecha_proceso (str): fecha de proceso de la notificacion
+        budget (LatencyBudget): presupuesto de tiempo de la invocacion
+    Returns:
+        dict: respuesta de la lambda con el resultado de cada notificacion
+    """
+    import botocore.exceptions
+    import requests
+    from utils.deadline import BudgetExceeded
+
+    budget = budget or LatencyBudget.from_context(None, config_file)
+    max_items = int(config_file["lambda"].get("batch", {}).get("max_items", 100))
+    if len(bodies) > max_items:
+        return batch_response(400, 40002, f'El lote supera el maximo de {max_items} notificaciones', [], fecha_proceso)
+
+    results = [None] * len(bodies)
+    valid_items = []
+    with budget.stage("validation"):
+        for index, item in enumerate(bodies):
+            error, body = validate_body(item)
+            if error:
+                results[index] = {
+                    'index': index,
+                    'codigoError': 40001,
+                    'error': error.get("error_type", "VALIDATION_ERROR"),
+                    'message': error.get("message", "Error en la validación de datos"),
+                    'details': error.get("errors", []) if error.get("error_type") == "VALIDATION_ERROR" else error.get("details"),
+                    'messageId': '',
+                }
+            else:
+                valid_items.append((index, body))
+    logger.info(f"Lote recibido: {len(bodies)} notificaciones, {len(valid_items)} validas")
+    if not valid_items:
+        return batch_response(400, 40001, 'Ninguna notificacion del lote es valida', results, fecha_proceso)
+
+    try:
+        validate_config(config_file)
+        latinia_url = config_file["latinia"]["url"]
+        latinia_url_auth = config_file["latinia"]["auth"]
+        latinia_secret_id_oauth = config_file["latinia"]["secret_name_oauth"]
+        db_secret_name = config_file["db"]["secret_name_db"]
+
+        with budget.stage("secret"):
+            secret = get_secret(db_secret_name)
+        if secret is None:
+            logger.error("No se pudo obtener el secreto de la base de datos")
+            return batch_response(500, 60010, 'Error al obtener el secreto de la base de datos', results, fecha_proceso)
+        with budget.stage("db_params"):
+            params_noti = get_params_noti_from_secret(secret, db_secret_name, logger)
+        if not params_noti:
+            logger.error("No se encontraron parametros de notificacion")
+            return batch_response(500, 60010, 'No se encontraron parametros de notificacion', results, fecha_proceso)
+
+        with budget.stage("payload"):
+            payloads = [(index, build_latinia_payload(body, params_noti, logger)) for index, body in valid_items]
+        to_queue = []
+        rate_limiter = get_rate_limiter(config_file)
+        circuit_breaker = get_circuit_breaker(config_file)
+        if config_file["latinia"]["mantenimiento"] is True or not circuit_breaker.allow_request():
+            logger.info(f"Latinia fuera de servicio (circuito {circuit_breaker.state}).Todo el lote se envia hacia la cola")
+            to_queue = payloads
+        else:
+            backoff = config_file["lambda"]["backoff"]
+            reintentos = int(backoff["max_retries"])
+            backoff_factor = float(backoff["backoff_factor"])
+            session = get_session(latinia_url, 0, backoff_factor, **get_pool_config(config_file))
+            timeout_seconds = int(config_file["latinia"]["timeout_seconds"])
+            refresh_token = lambda: get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger, force_refresh=True, budget=budget)
+            oauth_token = None
+            for position, (index, payload) in enumerate(payloads):
+                if rate_limiter is not None and not rate_limiter.try_acquire():
+                    logger.info(f"Limite de envio a Latinia alcanzado. {len(payloads) - position} notificaciones del lote se envian hacia la cola")
+                    to_queue.extend(payloads[position:])
+                    break
+                try:
+                    if oauth_token is None:
+                        with budget.stage("oauth"):
+                            oauth_token = get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger, budget=budget)
+                    with budget.stage("latinia"):
+                        send_notification_to_latinia(
+                            latinia_url, payload, session, timeout_seconds, logger, oauth_token,
+                            refresh_token=refresh_token, budget=budget, reintentos=reintentos, backoff_factor=backoff_factor,
+                            rate_limiter=rate_limiter,
+                        )
+                    circuit_breaker.record_success()
+                    results[index] = {'index': index, 'codigoError': 0, 'message': 'Notificacion enviada a Latinia', 'messageId': ''}
+                except BudgetExceeded as e:
+                    logger.warning(f"Presupuesto de tiempo agotado. El resto del lote será encolado: {e}")
+                    to_queue.extend(payloads[position:])
+                    break
+                except requests.exceptions.RequestException as e:
+                    if not is_latinia_outage(e):
+                        logger.error(f"Latinia rechazo la notificacion. Sera encolada: {e}")
+                        to_queue.append((index, payload))
+                        continue
+                    # Latinia no responde: el resto del lote se encola sin esperar nuevos timeouts
+                    logger.error(f"Error al comunicarse con Latinia. El resto del lote será encolado: {e}")
+                    circuit_breaker.record_failure()
+                    to_queue.extend(payloads[position:])
+                    break
+
+        lanes = {}
+        for index, payload in to_queue:
+            lanes.setdefault(get_queue_url(config_file, payload["header"]["refService"]), []).append((index, payload))
+        for queue_url, items in lanes.items():
+            with budget.stage("sqs"):
+                queued = send_notifications_to_queue(queue_url, [payload for _, payload in items], fecha_proceso)
+            for (index, _), result in zip(items, queued):
+                if 'messageId' in result:
+                    results[index] = {'index': index, 'codigoError': 10, 'message': 'Notificacion enviada hacia la cola', 'messageId': result['messageId']}
+                else:
+                    results[index] = {'index': index, 'codigoError': 9082, 'message': f'Error al encolar la notificacion: {result["error"]}', 'messageId': ''}
+        logger.info(f"Reutilizacion de conexiones HTTP: {get_connection_stats()}")
+        logger.info(f"Presupuesto de latencia: {budget.summary()}")
+
+    except ValueError as e:
+        logger.error("Error en la validacion del archivo de configuracion",exc_info=True,stack_info=True)
+        return batch_response(500, 60010, 'Error al cargar el archivo de configuracion', results, fecha_proceso)
+    except botocore.exceptions.ClientError as e:
+        logger.error(f"Error al comunicarse con AWS{e}",exc_info=True,stack_info=True)
+        return batch_response(500, 9082, 'Error al comunicarse con AWS', results, fecha_proceso)
+
+    failed = sum(1 for result in results if result['codigoError'] not in (0, 10))
+    if failed:
+        return batch_response(207, 0, f'Lote procesado con {failed} notificaciones fallidas', results, fecha_proceso)
+    return batch_response(200, 0, 'Lote procesado', results, fecha_proceso)
+
+def batch_response(status_code, codigo_error, message, results, fecha_proceso):
+    """
+    Respuesta de la lambda para un lote de notificaciones
+    """
+    return {
+        "statusCode":status_code,
+        "headers":{
+            "Content-Type":"application/json",
+        },
+        'body':json_codec.dumps({
+            'codigoError':codigo_error,
+            'message':message,
+            'total':len(results),
+            'results':[result for result in results if result is not None],
+            'timestamp':fecha_proceso,
+        })
+    }
+
+def get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger, force_refresh=False, budget=None):
+    """
+    Obtiene el token de autenticación de Latinia.
+    El token se reutiliza entre invocaciones hasta poco antes de su expiracion
     Args:
         latinia_url_auth (str): URL de autenticación de Latinia
         latinia_secret_id_oauth (str): ID del secreto de OAuth en AWS Secrets Manager
         logger (Logger): Logger configurado para la aplicación
+        force_refresh (bool): descarta el token en cache, por ejemplo ante un 401
+        budget (LatencyBudget): limita el timeout de la solicitud de un token nuevo
     Returns:
         str: Token de autenticación
     """
+    return oauth_token_cache.get(
+        (latinia_url_auth, latinia_secret_id_oauth),
+        lambda: request_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger, budget),
+        force_refresh=force_refresh,
+    )
+
+def request_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger, budget=None):
+    """
+    Solicita un token nuevo al endpoint de OAuth de Latinia
+    Args:
+        latinia_url_auth (str): URL de autenticación de Latinia
+        latinia_secret_id_oauth (str): ID del secreto de OAuth en AWS Secrets Manager
+        logger (Logger): Logger configurado para la aplicación
+        budget (LatencyBudget): presupuesto de tiempo de la invocacion; limita
+            el timeout de cada intento y los reintentos ante 5xx o errores de conexion
+    Returns:
+        dict: Respuesta de OAuth con access_token y expires_in
+    """
     try:
         logger.info("Obteniendo token de OAuth para Latinia")
 
@@ -325,7 +600,8 @@ def get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger):
         
         logger.info(f"Secreto de OAuth obtenido: {latinia_secret_id_oauth}")
 
-        session = create_session()
+        # Con presupuesto los reintentos los controla post_with_budget, no urllib3
+        session = get_session(latinia_url_auth, 0) if budget else get_session(latinia_url_auth)
 
 
         auth_data = {
@@ -345,14 +621,20 @@ def get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger):
         logger.info(f"Usando Basic Auth con client_id: {secret.get('client_id')[:10]}...")
 
 
-        response = session.post(
-            url=latinia_url_auth,
-            data=auth_data,
-            headers=headers,
-            auth=(secret.get("client_id"), secret.get("client_secret")),
-            timeout=30
-        )
+        def post_oauth(secret):
+            kwargs = {"data": auth_data, "headers": headers, "auth": (secret.get("client_id"), secret.get("client_secret"))}
+            if budget is None:
+                return session.post(url=latinia_url_auth, timeout=30, **kwargs)
+            return post_with_budget(session, latinia_url_auth, budget, 30, **kwargs)
+
+        response = post_oauth(secret)
         logger.info(f"Respuesta de autenticación OAuth: {response.status_code}")
+        if is_oauth_credentials_error(response):
+            # El secreto en cache puede estar desactualizado por una rotacion
+            logger.warning("Credenciales de OAuth rechazadas. Se vuelve a leer el secreto")
+            secret = get_secret(latinia_secret_id_oauth, force_refresh=True)
+            response = post_oauth(secret)
+            logger.info(f"Respuesta de autenticación OAuth: {response.status_code}")
         response.raise_for_status()
 
         token_data = response.json()
@@ -362,43 +644,102 @@ def get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger):
             raise ValueError("No se pudo obtener el access_token de la respuesta de OAuth")
         
 
-        return access_token
+        return token_data
     
     except Exception as e:
         logger.error(f"Error al obtener el token de OAuth: {e}", exc_info=True)
         raise
 
+def is_oauth_credentials_error(response):
+    """
+    Indica si la respuesta de Cognito corresponde a credenciales rechazadas
+    Args:
+        response (Response): respuesta del endpoint de OAuth
+    """
+    if response.status_code == 401:
+        return True
+    if response.status_code == 400:
+        try:
+            return response.json().get("error") == "invalid_client"
+        except ValueError:
+            return False
+    return False
+
+def get_queue_url(config_file, nemonic):
+    """
+    URL de la cola del carril que corresponde a la prioridad del nemonico
+    (sqs.lanes.high o sqs.lanes.low). Sin carriles configurados se usa
+    sqs.queue_url
+    Args:
+        config_file (dict): archivo de configuracion
+        nemonic (str): refService de la notificacion
+    """
+    lane = (config_file["sqs"].get("lanes") or {}).get(get_nemonic_priority(nemonic)) or {}
+    return lane.get("queue_url") or config_file["sqs"]["queue_url"]
+
+def build_queue_message(body,fecha_proceso):
+    """
+    Construye el mensaje de la cola con el payload de Latinia.
+    Si el payload supera el umbral del claim-check se guarda en S3 y el
+    mensaje lleva solo la referencia (payload_ref)
+    Args:
+        body (dict): cuerpo del request previamente validado
+        fecha_proceso (str): fecha de proceso de la notificacion
+    Returns:
+        dict: MessageBody y MessageAttributes del mensaje
+    """
+    message_id = str(uuid.uuid4())
+    message = {
+        'timestamp':fecha_proceso,
+        'messageId':message_id,
+        'intentos':0
+    }
+    message_attributes = {
+        'MessageId': {
+            'DataType': 'String',
+            'StringValue': message_id
+        },
+        'FechaProceso': {
+            'DataType': 'String',
+            'StringValue': fecha_proceso
+        }
+    }
+    payload_ref = offload_payload(body, message_id, fecha_proceso)
+    if payload_ref:
+        message['payload_ref'] = payload_ref
+        message_attributes[CLAIM_CHECK_ATTRIBUTE] = {
+            'DataType': 'String',
+            'StringValue': f"s3://{payload_ref['bucket']}/{payload_ref['key']}"
+        }
+    else:
+        message['payload'] = body
+    return {
+        'MessageBody':json_codec.dumps(message),
+        'MessageAttributes':message_attributes
+    }
+
 def send_notification_to_queue(queue_url,body,fecha_proceso):
     """
-    Envio de notificacion a la cola
+    Envio de notificacion a la cola. Si el envio falla se elimina el payload
+    que se haya guardado en S3 con claim-check
     Args:
         queue_url (string):url de la cola
         body (dict): cuerpo del request previamente validado
     """
-    
+    import botocore.exceptions
+
+    message = build_queue_message(body,fecha_proceso)
     try:
-        response = sqs.send_message(
+        response = get_client('sqs').send_message(
             QueueUrl=queue_url,
-            MessageBody=json.dumps(
-                {
-                    'payload':body,
-                    'timestamp':fecha_proceso,
-                    'messageId':str(uuid.uuid4()),
-                    'intentos':0
-                }),
-            MessageAttributes={
-                'MessageId': {
-                    'DataType': 'String',
-                    'StringValue': str(uuid.uuid4())
-                },
-                'FechaProceso': {
-                    'DataType': 'String',
-                    'StringValue': fecha_proceso
-                }
-            }
+            **message
         )
         print("Respuesta de la cola:", response)
         return response["MessageId"]
+    except botocore.exceptions.BotoCoreError as e:
+        print(f"Error al enviar el mensaje a la cola: {e}")
+        delete_payload(message['MessageAttributes'])
+        raise
     except botocore.exceptions.ClientError as e:
         print(f"Error al enviar el mensaje a la cola: {e}")
         if e.response['Error']['Code'] == 'ThrottlingException':
@@ -407,20 +748,102 @@ def send_notification_to_queue(queue_url,body,fecha_proceso):
             print("La cola especificada no existe.")
         elif e.response['Error']['Code'] == 'InvalidParameterValue':
             print("Uno o más parámetros proporcionados son inválidos.")
+        delete_payload(message['MessageAttributes'])
         raise
-        
-
-
 
-def send_notification_to_latinia(latinia_url,body,session,timeout_seconds,logger,oauth_token=None):
+def send_notifications_to_queue(queue_url,bodies,fecha_proceso):
+    """
+    Envio de varias notificaciones a la cola con SendMessageBatch, en grupos
+    de hasta 10 mensajes sin superar el tamaño maximo de un lote.
+    Las entradas rechazadas por un error transitorio se reintentan una vez;
+    las que no se encolan pierden su payload de claim-check en S3
+    Args:
+        queue_url (string):url de la cola
+        bodies (list): payloads previamente validados
+        fecha_proceso (str): fecha de proceso de la notificacion
+    Returns:
+        list: por cada payload, dict con messageId si fue encolado o error si fallo
+    """
+    import botocore.exceptions
+
+    results = [None] * len(bodies)
+    entries = [
+        {'Id': str(index), **build_queue_message(body,fecha_proceso)}
+        for index, body in enumerate(bodies)
+    ]
+    pending = entries
+    for intento in range(2):
+        retry = []
+        for group in split_queue_batches(pending):
+            try:
+                response = get_client('sqs').send_message_batch(QueueUrl=queue_url, Entries=group)
+            except (botocore.exceptions.ClientError, botocore.exceptions.BotoCoreError) as e:
+                print(f"Error al enviar el lote de mensajes a la cola: {e}")
+                code = e.response['Error']['Code'] if isinstance(e, botocore.exceptions.ClientError) else type(e).__name__
+                for entry in group:
+                    results[int(entry['Id'])] = {'error': code}
+                continue
+            for successful in response.get('Successful', []):
+                results[int(successful['Id'])] = {'messageId': successful['MessageId']}
+            group_entries = {entry['Id']: entry for entry in group}
+            for failed in response.get('Failed', []):
+                print(f"Mensaje {failed['Id']} rechazado por la cola: {failed.get('Code')} - {failed.get('Message')}")
+                results[int(failed['Id'])] = {'error': failed.get('Code')}
+                if not failed.get('SenderFault'):
+                    retry.append(group_entries[failed['Id']])
+        if not retry:
+            break
+        pending = retry
+    for entry, result in zip(entries, results):
+        if 'error' in result:
+            delete_payload(entry['MessageAttributes'])
+    return results
+
+def split_queue_batches(entries):
+    """
+    Agrupa entradas de SendMessageBatch respetando 10 mensajes y 256 KB por lote
+    Args:
+        entries (list): entradas con Id, MessageBody y MessageAttributes
+    """
+    group = []
+    group_size = 0
+    for entry in entries:
+        entry_size = len(entry['MessageBody'].encode('utf-8')) + sum(
+            len(name) + len(attribute['DataType']) + len(attribute['StringValue'].encode('utf-8'))
+            for name, attribute in entry['MessageAttributes'].items()
+        )
+        if group and (len(group) == SQS_BATCH_MAX_MESSAGES or group_size + entry_size > SQS_BATCH_MAX_BYTES):
+            yield group
+            group = []
+            group_size = 0
+        group.append(entry)
+        group_size += entry_size
+    if group:
+        yield group
+
+def send_notification_to_latinia(latinia_url,body,session,timeout_seconds,logger,oauth_token=None,refresh_token=None,budget=None,reintentos=3,backoff_factor=0.5,rate_limiter=None):
     """
     Envio de notificacion a latinia
     Args:
         latinia_url (string):url de latinia
         body (dict): cuerpo del request previamente validado
         session (Session): sesion de requests con configuracion de reintentos
+        refresh_token (Callable): obtiene un token nuevo si Latinia responde 401
+        budget (LatencyBudget): si se indica, los timeouts y reintentos se ajustan
+            al tiempo restante de la invocacion (la sesion debe venir sin reintentos)
+        rate_limiter (TokenBucket): limitador de Latinia; el primer envio ya
+            tomo su token, los reintentos toman uno cada uno
     """
+    import requests
+
     req_session = session
+    # El body se serializa una sola vez y se reutiliza en reintentos
+    data = json_codec.dumps_bytes(body)
+
+    def post(headers):
+        if budget is None:
+            return req_session.post(url=latinia_url, data=data, headers=headers, timeout=timeout_seconds)
+        return post_with_budget(req_session, latinia_url, budget, timeout_seconds, reintentos, backoff_factor, rate_limiter=rate_limiter, data=data, headers=headers)
     try:
 
         headers = {
@@ -433,13 +856,13 @@ def send_notification_to_latinia(latinia_url,body,session,timeout_seconds,logger
         else:
             logger.warning("No se proporcionó token de OAuth. La solicitud a Latinia puede fallar.")
 
-        response = req_session.post(
-            url=latinia_url,
-            json=body,
-            headers=headers,
-            timeout=timeout_seconds
-        )
-        logger.info(f"Respuesta de Latinia: {response.status_code} - {response.text}")
+        response = post(headers)
+        logger.info("Respuesta de Latinia: %s - %s", response.status_code, log_payload(response.text))
+        if response.status_code == 401 and refresh_token is not None and (rate_limiter is None or rate_limiter.try_acquire()):
+            logger.warning("Latinia rechazo el token de OAuth. Se solicita un token nuevo")
+            headers['Authorization'] = f'Bearer {refresh_token()}'
+            response = post(headers)
+            logger.info("Respuesta de Latinia: %s - %s", response.status_code, log_payload(response.text))
         response.raise_for_status()
     except requests.exceptions.ConnectionError as e:
         logger.error("Error de conexión a Latinia", exc_info=True, stack_info=True)
@@ -451,33 +874,45 @@ def send_notification_to_latinia(latinia_url,body,session,timeout_seconds,logger
         logger.error("Error al comunicarse con Latinia", exc_info=True, stack_info=True)
         raise
     
-def change_param_to_config_file(config_file,param_name,new_value):
+def get_circuit_breaker(config_file):
     """
-    Cambia un parametro en el archivo de configuracion
+    Circuit breaker de Latinia, compartido por las invocaciones del contenedor.
+    Se configura con la seccion opcional latinia.circuit_breaker del YAML
     Args:
         config_file (dict): archivo de configuracion
-        param_name (str): nombre del parametro a cambiar
-        new_value (any): nuevo valor del parametro
     """
-    
-    if param_name in config_file["latinia"]:
-        config_file["latinia"][param_name] = new_value
-    else:
-        raise KeyError(f"El parametro {param_name} no existe en el archivo de configuracion")
-    
-    return config_file
-
-def change_param_to_config_file(config_file, param_name, new_value):
+    settings = config_file["latinia"].get("circuit_breaker") or {}
+    key = json.dumps(settings, sort_keys=True, default=str)
+    circuit_breaker = _circuit_breakers.get(key)
+    if circuit_breaker is None:
+        circuit_breaker = build_circuit_breaker("latinia", settings)
+        _circuit_breakers[key] = circuit_breaker
+    return circuit_breaker
+
+def get_rate_limiter(config_file):
     """
-    Cambia un parametro en el archivo de configuracion
+    Limitador de tasa hacia Latinia, compartido por las invocaciones del
+    contenedor. Se configura con la seccion opcional latinia.rate_limit del
+    YAML; sin ella (o con enabled en falso) no se limita
     Args:
         config_file (dict): archivo de configuracion
-        param_name (str): nombre del parametro a cambiar
-        new_value (any): nuevo valor del parametro
     """
-    if param_name in config_file["latinia"]:
-        config_file["latinia"][param_name] = new_value
-    else:
-        raise KeyError(f"El parametro {param_name} no existe en el archivo de configuracion")
-    
-    return config_file
\ No newline at end of file
+    settings = config_file["latinia"].get("rate_limit") or {}
+    key = json.dumps(settings, sort_keys=True, default=str)
+    if key not in _rate_limiters:
+        _rate_limiters[key] = build_rate_limiter(RATE_LIMITER_NAME, settings)
+    return _rate_limiters[key]
+
+def is_latinia_outage(error):
+    """
+    Indica si el error de Latinia corresponde a una caida del servicio.
+    Las respuestas 4xx son rechazos de la notificacion y no abren el circuito
+    Args:
+        error (RequestException): error de la solicitud a Latinia
+    """
+    import requests
+
+    response = getattr(error, "response", None)
+    if isinstance(error, requests.exceptions.HTTPError) and response is not None:
+        return response.status_code >= 500 or response.status_code == 429
+    return True
@@ -1,6 +1,14 @@
-from jsonschema import validate,ValidationError
 import json
 import os
+import threading
+import time
+from utils import json_codec
+from utils.config_cache import ConfigCache
+from utils.schema_codegen import UnsupportedSchemaError, compile_fast_validator
+
+PRIORITY_HIGH = "high"
+PRIORITY_LOW = "low"
+DEFAULT_CATALOG_TTL_SECONDS = 60
 
 def load_nemonic_config():
     """
@@ -14,7 +22,7 @@ def load_nemonic_config():
         print(f"Error: El archivo de configuracion {config_path} no fue encontrado.")
         return {}
     
-def format_validation_error(error: ValidationError) -> dict:
+def format_validation_error(error: "ValidationError") -> dict:
     """
     Formatea el error de validación de JSON Schema en un formato más legible
     
@@ -70,6 +78,21 @@ def get_allowed_nemonics_from_config():
     config = load_nemonic_config()
     return list(config.keys())
 
+def get_nemonic_priority(nemonic):
+    """
+    Prioridad del nemonico segun el campo priority de nemonic_config.json:
+    "high" para notificaciones urgentes y "low" para el resto o si no se indica
+    """
+    priority = NEMONIC_CONFIG.get(nemonic, {}).get("priority") if isinstance(nemonic, str) else None
+    return PRIORITY_HIGH if priority == PRIORITY_HIGH else PRIORITY_LOW
+
+def get_known_nemonic(nemonic):
+    """
+    Nemonico si es un texto del catalogo, None en otro caso. Se usa como
+    dimension de las metricas, que solo admite valores del catalogo
+    """
+    return nemonic if isinstance(nemonic, str) and nemonic in NEMONIC_CONFIG else None
+
 def generate_conditional_validations(nemonic_config):
     """
     Genera las validaciones condicionales basadas en la configuracion 
@@ -95,129 +118,438 @@ def generate_conditional_validations(nemonic_config):
             })
     return validations
 
-NEMONIC_CONFIG = load_nemonic_config()
-ALLOWED_NEMONICS = get_allowed_nemonics_from_config()
-
-request_schema = {
-    "type":"object",
-    "required":["data","addresses"],
-    "properties":{
-        "refservice":{
-            "type":"string",
-            "enum":ALLOWED_NEMONICS
-        },
-        "channels":{
-            "type": ["string"]
-        },
-        "cod_ente":{
-            "type": ["integer", "null"],
-            "minimum": 0
-        },
-        # "header":{
-        #     "type":"object",
-        #     "properties":{
-        #         "id":{
-        #             "type":"string"
-        #         },
-        #         "refCompany":{
-        #             "type":"string"
-        #         },
-        #         "refService":{
-        #             "type":"string",
-        #             "enum":ALLOWED_NEMONICS
-        #         },
-        #         "keyValue":{
-        #             "type":"string"
-        #         },
-        #         "channels":{
-        #             "type":["string","null"]
-        #         },
-        #         "refMsgLabel":{"type":"string"}
-        #     }
-        # },
-        # "info":{
-        #     "type":"object",
-        #     "required": ["loginEnterprise", "refContract"],
-        #     "properties": {
-        #         "loginEnterprise": {"type": "string"},
-        #         "refContract": {"type": "string"}
-        #     }
-        # },
-        "data":{
-            "type": "object",
-            "properties": {
-                "desccanal": {"type": ["string", "null"]},
-                "canal": {"type": ["string", "null"]},
-                "tipotrj": {"type": ["string", "null"]},
-                "valor": {"type": ["string", "null"]},
-                "numtrj": {"type": ["string", "null"]},
-                "identi": {"type": ["string", "null"]},
-                "des_transaccion": {"type": ["string", "null"]},
-                "des_comercio": {"type": ["string", "null"]},
-                "plazo": {"type": ["string", "null"]},
-                "nombre_titular": {"type": ["string", "null"]},
-                "estado_pais": {"type": ["string", "null"]},
-                "nom_pais": {"type": ["string", "null"]},
-                "fecha": {"type": ["string", "null"]},
-                "hora": {"type": ["string", "null"]},
-                "nombre_cliente": {"type": ["string", "null"]},
-                "motivo": {"type": ["string", "null"]},
-                "fecha_hora": {"type": ["string", "null"]},
-                "gsm": {"type": ["string", "null"]},
-                "email": {"type": ["string", "null"]}
-            }
-        },
-        "addresses":{
-            "type": "array",
-            "items": {
+def build_request_schema(nemonic_config):
+    """
+    Construye el esquema del request a partir de la configuracion de nemonicos
+    """
+    return {
+        "type":"object",
+        "required":["data","addresses"],
+        "properties":{
+            "refservice":{
+                "type":"string",
+                "enum":list(nemonic_config.keys())
+            },
+            "channels":{
+                "type": ["string"]
+            },
+            "cod_ente":{
+                "type": ["integer", "null"],
+                "minimum": 0
+            },
+            # "header":{
+            #     "type":"object",
+            #     "properties":{
+            #         "id":{
+            #             "type":"string"
+            #         },
+            #         "refCompany":{
+            #             "type":"string"
+            #         },
+            #         "refService":{
+            #             "type":"string",
+            #             "enum":ALLOWED_NEMONICS
+            #         },
+            #         "keyValue":{
+            #             "type":"string"
+            #         },
+            #         "channels":{
+            #             "type":["string","null"]
+            #         },
+            #         "refMsgLabel":{"type":"string"}
+            #     }
+            # },
+            # "info":{
+            #     "type":"object",
+            #     "required": ["loginEnterprise", "refContract"],
+            #     "properties": {
+            #         "loginEnterprise": {"type": "string"},
+            #         "refContract": {"type": "string"}
+            #     }
+            # },
+            "data":{
                 "type": "object",
-                "required": ["className", "type", "ref"],
                 "properties": {
-                    "className": {"type": "string"},
-                    "type": {"type": "string"},
-                    "ref": {"type": "string"}
+                    "desccanal": {"type": ["string", "null"]},
+                    "canal": {"type": ["string", "null"]},
+                    "tipotrj": {"type": ["string", "null"]},
+                    "valor": {"type": ["string", "null"]},
+                    "numtrj": {"type": ["string", "null"]},
+                    "identi": {"type": ["string", "null"]},
+                    "des_transaccion": {"type": ["string", "null"]},
+                    "des_comercio": {"type": ["string", "null"]},
+                    "plazo": {"type": ["string", "null"]},
+                    "nombre_titular": {"type": ["string", "null"]},
+                    "estado_pais": {"type": ["string", "null"]},
+                    "nom_pais": {"type": ["string", "null"]},
+                    "fecha": {"type": ["string", "null"]},
+                    "hora": {"type": ["string", "null"]},
+                    "nombre_cliente": {"type": ["string", "null"]},
+                    "motivo": {"type": ["string", "null"]},
+                    "fecha_hora": {"type": ["string", "null"]},
+                    "gsm": {"type": ["string", "null"]},
+                    "email": {"type": ["string", "null"]}
                 }
-            }
-        },
-        "contents": {
-            "type": "array",
-            "items": {
-                "type": "object",
-                "required": ["value", "type", "encoding", "name"],
-                "properties": {
-                    "value": {"type": "string"},
-                    "type": {"type": "string"},
-                    "encoding": {"type": "string"},
-                    "name": {"type": "string"}
+            },
+            "addresses":{
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "required": ["className", "type", "ref"],
+                    "properties": {
+                        "className": {"type": "string"},
+                        "type": {"type": "string"},
+                        "ref": {"type": "string"}
+                    }
+                }
+            },
+            "contents": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "required": ["value", "type", "encoding", "name"],
+                    "properties": {
+                        "value": {"type": "string"},
+                        "type": {"type": "string"},
+                        "encoding": {"type": "string"},
+                        "name": {"type": "string"}
+                    }
                 }
             }
-        }
 
-    },
-    "allOf":generate_conditional_validations(NEMONIC_CONFIG)
-}
+        },
+        "allOf":generate_conditional_validations(nemonic_config)
+    }
+
+def build_request_schemas(nemonic_config):
+    """
+    Construye los esquemas usados para validar: uno base sin condicionales y,
+    por nemonico, solo su validacion condicional. Un request cumple el esquema
+    completo si cumple el base y todas las condicionales, y el de su nemonico
+    si cumple el base y la condicional del nemonico
+
+    Returns:
+        dict: esquema "base" y "conditionals" (por nemonico)
+    """
+    schema = build_request_schema(nemonic_config)
+    schemas = {
+        "base": {key: value for key, value in schema.items() if key != "allOf"},
+        "conditionals": {},
+    }
+    for nemonic, config in nemonic_config.items():
+        conditional = generate_conditional_validations({nemonic: config})
+        if conditional:
+            schemas["conditionals"][nemonic] = conditional[0]
+    return schemas
+
+class SchemaCompiler:
+    """
+    Compila esquemas guardando el resultado por contenido del esquema. Al
+    recargar el catalogo se crea con previous para reutilizar los validadores
+    de los esquemas que no cambiaron: solo se compilan los nuevos o modificados
+    """
+
+    def __init__(self, compile_schema, previous=None):
+        self.compile_schema = compile_schema
+        self.compiled = {}
+        self.compiled_count = 0
+        self._previous = previous.compiled if previous is not None else {}
+
+    def __call__(self, schema):
+        key = json.dumps(schema, sort_keys=True)
+        validator = self.compiled.get(key)
+        if validator is None:
+            validator = self._previous.get(key)
+            if validator is None:
+                validator = self.compile_schema(schema)
+                self.compiled_count += 1
+            self.compiled[key] = validator
+        return validator
+
+class AllOfValidator:
+    """
+    Validador de jsonschema compuesto: entrega en orden los errores de cada
+    validador, igual que un esquema con allOf
+    """
+
+    def __init__(self, validators):
+        self.validators = tuple(validators)
+
+    def iter_errors(self, instance):
+        for validator in self.validators:
+            yield from validator.iter_errors(instance)
+
+def all_of(validators):
+    """
+    Validacion rapida compuesta: la instancia es valida si cumple todas las funciones
+    """
+    validators = tuple(validators)
+    if len(validators) == 1:
+        return validators[0]
+
+    def validate(instance):
+        for validator in validators:
+            if not validator(instance):
+                return False
+        return True
+    return validate
+
+def build_request_validators(nemonic_config, compiler=None):
+    """
+    Compila una sola vez los validadores de jsonschema del request
+
+    Args:
+        nemonic_config (dict): catalogo de nemonicos
+        compiler (SchemaCompiler): compilador con los validadores reutilizables
+
+    Returns:
+        dict: validadores "all", "base" y "nemonics" (por nemonico)
+    """
+    compiler = compiler or SchemaCompiler(compile_jsonschema_validator)
+    schemas = build_request_schemas(nemonic_config)
+    base = compiler(schemas["base"])
+    conditionals = {nemonic: compiler(schema) for nemonic, schema in schemas["conditionals"].items()}
+    return {
+        "all": AllOfValidator([base, *conditionals.values()]) if conditionals else base,
+        "base": base,
+        "nemonics": {
+            nemonic: AllOfValidator([base, conditional])
+            for nemonic, conditional in conditionals.items()
+        },
+    }
+
+def build_fast_validators(nemonic_config, compiler=None):
+    """
+    Genera funciones de Python equivalentes a los esquemas del request.
+    Solo indican si el request es valido; el detalle de errores se sigue
+    obteniendo con jsonschema. Si el esquema no se puede generar se
+    retorna None y se valida siempre con jsonschema
+
+    Args:
+        nemonic_config (dict): catalogo de nemonicos
+        compiler (SchemaCompiler): compilador con las funciones reutilizables
+
+    Returns:
+        dict: funciones "all", "base" y "nemonics" (por nemonico), o None
+    """
+    compiler = compiler or SchemaCompiler(compile_fast_validator)
+    schemas = build_request_schemas(nemonic_config)
+    try:
+        base = compiler(schemas["base"])
+        conditionals = {nemonic: compiler(schema) for nemonic, schema in schemas["conditionals"].items()}
+    except UnsupportedSchemaError as e:
+        print(f"No se pudo generar la validacion rapida del request: {e}")
+        return None
+    return {
+        "all": all_of([base, *conditionals.values()]),
+        "base": base,
+        "nemonics": {
+            nemonic: all_of([base, conditional])
+            for nemonic, conditional in conditionals.items()
+        },
+    }
+
+def compile_validator(validator_class, schema):
+    """
+    Verifica el esquema y crea su validador
+    """
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+def compile_jsonschema_validator(schema):
+    """
+    Crea el validador de jsonschema de un esquema, importando jsonschema en el primer uso
+    """
+    from jsonschema.validators import validator_for
+
+    return compile_validator(validator_for(schema), schema)
+
+def select_validator(body, validators):
+    """
+    Selecciona el validador segun refService sin evaluar todas las condicionales.
+    Si el request no es un objeto o no trae refService, todas las condicionales
+    aplican (igual que en el esquema completo); si el nemonico no tiene
+    condicional no aplica ninguna.
+    """
+    if not isinstance(body, dict) or "refService" not in body:
+        return validators["all"]
+    ref_service = body["refService"]
+    if isinstance(ref_service, str) and ref_service in validators["nemonics"]:
+        return validators["nemonics"][ref_service]
+    return validators["base"]
+
+def validate_nemonic_config(nemonic_config):
+    """
+    Verifica la estructura del catalogo: un objeto por nemonico con
+    required_fields como lista de nombres de campo
+
+    Raises:
+        ValueError: si el catalogo no tiene la estructura esperada
+    """
+    if not isinstance(nemonic_config, dict) or not nemonic_config:
+        raise ValueError("El catalogo de nemonicos debe ser un objeto no vacio")
+    for nemonic, config in nemonic_config.items():
+        if not isinstance(config, dict):
+            raise ValueError(f"La configuracion del nemonico {nemonic} debe ser un objeto")
+        fields = config.get("required_fields", [])
+        if not isinstance(fields, list) or not all(isinstance(field, str) for field in fields):
+            raise ValueError(f"required_fields del nemonico {nemonic} debe ser una lista de textos")
+
+NEMONIC_CONFIG = load_nemonic_config()
+ALLOWED_NEMONICS = get_allowed_nemonics_from_config()
+
+request_schema = build_request_schema(NEMONIC_CONFIG)
+REQUEST_VALIDATORS = None
+_fast_compiler = SchemaCompiler(compile_fast_validator)
+REQUEST_FAST_VALIDATORS = build_fast_validators(NEMONIC_CONFIG, _fast_compiler)
+_validator_compiler = None
+# Serializa la publicacion de un catalogo; la validacion nunca toma el lock
+_catalog_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_catalog_cache = None
+_catalog_next_check = 0.0
+
+def get_request_validators():
+    """
+    Validadores de jsonschema, construidos en el primer uso. Con la validacion
+    rapida solo se necesitan para el detalle de errores de un request invalido,
+    asi el arranque en frio no paga la importacion de jsonschema ni la
+    verificacion de los esquemas. Tras recargar el catalogo solo se compilan
+    los esquemas que cambiaron
+    """
+    global REQUEST_VALIDATORS, _validator_compiler
+    validators = REQUEST_VALIDATORS
+    if validators is None:
+        nemonic_config = NEMONIC_CONFIG
+        compiler = SchemaCompiler(compile_jsonschema_validator, previous=_validator_compiler)
+        validators = build_request_validators(nemonic_config, compiler)
+        with _catalog_lock:
+            # Si el catalogo cambio mientras se compilaba, no se publican validadores viejos
+            if nemonic_config is NEMONIC_CONFIG:
+                REQUEST_VALIDATORS = validators
+                _validator_compiler = compiler
+    return validators
+
+def set_nemonic_config(nemonic_config):
+    """
+    Reemplaza el catalogo de nemonicos. Las funciones de validacion rapida se
+    construyen antes del reemplazo, reutilizando las de los nemonicos sin
+    cambios, y el catalogo nuevo se publica de una sola vez: un request en
+    curso termina con los validadores que ya obtuvo. Los validadores de
+    jsonschema se reconstruyen en su primer uso
+
+    Args:
+        nemonic_config (dict): catalogo con el formato de nemonic_config.json
+
+    Raises:
+        ValueError: si el catalogo no tiene la estructura esperada
+    """
+    global NEMONIC_CONFIG, ALLOWED_NEMONICS, request_schema, REQUEST_VALIDATORS, REQUEST_FAST_VALIDATORS, _fast_compiler
+    validate_nemonic_config(nemonic_config)
+    fast_compiler = SchemaCompiler(compile_fast_validator, previous=_fast_compiler)
+    fast_validators = build_fast_validators(nemonic_config, fast_compiler)
+    schema = build_request_schema(nemonic_config)
+    with _catalog_lock:
+        NEMONIC_CONFIG = nemonic_config
+        ALLOWED_NEMONICS = list(nemonic_config)
+        request_schema = schema
+        REQUEST_FAST_VALIDATORS = fast_validators
+        REQUEST_VALIDATORS = None
+        _fast_compiler = fast_compiler
+    print(f"Catalogo de nemonicos actualizado: {len(nemonic_config)} nemonicos, {fast_compiler.compiled_count} esquemas compilados")
+
+def refresh_nemonic_catalog(settings, default_bucket=None):
+    """
+    Revisa el catalogo de nemonicos en S3 como maximo una vez cada
+    ttl_seconds, segun la seccion nemonics del YAML (s3_key, bucket_name,
+    ttl_seconds). La revision es condicional por ETag, asi un catalogo sin
+    cambios no se descarga de nuevo. Sin s3_key se usa el catalogo del
+    paquete; si S3 falla o el catalogo es invalido se mantiene el actual.
+    Si otro hilo ya esta revisando, no se espera
+
+    Args:
+        settings (dict): seccion nemonics del archivo de configuracion
+        default_bucket (str): bucket si la seccion no indica bucket_name
+
+    Returns:
+        bool: True si el catalogo cambio
+    """
+    global _catalog_cache, _catalog_next_check
+    settings = settings or {}
+    key = settings.get("s3_key")
+    if not key or time.monotonic() < _catalog_next_check:
+        return False
+    if not _refresh_lock.acquire(blocking=False):
+        return False
+    try:
+        _catalog_next_check = time.monotonic() + float(settings.get("ttl_seconds", DEFAULT_CATALOG_TTL_SECONDS))
+        if _catalog_cache is None:
+            # El TTL se controla aqui; el cache solo aporta la revision por ETag
+            _catalog_cache = ConfigCache(ttl_seconds=0, loader=json_codec.loads, metric_name="NemonicCatalogLoadTime")
+        try:
+            nemonic_config = _catalog_cache.get(settings.get("bucket_name") or default_bucket, key)
+        except Exception as e:
+            print(f"No se pudo cargar el catalogo de nemonicos desde S3, se mantiene el actual: {e}")
+            return False
+        if nemonic_config == NEMONIC_CONFIG:
+            return False
+        try:
+            set_nemonic_config(nemonic_config)
+        except ValueError as e:
+            print(f"Catalogo de nemonicos invalido en S3, se mantiene el actual: {e}")
+            return False
+        return True
+    finally:
+        _refresh_lock.release()
+
+def parse_request(request):
+    """
+    Obtiene el body del evento recibido, decodificando el JSON si viene como texto
+    """
+    if 'body' in request:
+        if isinstance(request['body'],str):
+            return json_codec.loads(request["body"])
+        return request["body"]
+    return request
 
 def validate_request(request):
     """
     valida que el evento recibido cumpla con el esquema definido
     """
     try:
-        if 'body' in request:
-            if isinstance(request['body'],str):
-                body = json.loads(request["body"])
-            else:
-                body = request["body"]
-        else:
-            body = request
-        
-        validate(instance=body,schema=request_schema)
-        return None,body
-    
-    except ValidationError as e:
-        main_error = format_validation_error(e)
+        body = parse_request(request)
+    except json.JSONDecodeError as e:
+        return {
+            "error_type": "INVALID_FORMAT_ERROR",
+            "message": "Request con formato inválido",
+            "details": str(e)
+        }, None
+    except Exception as e:
+       return {
+            "error_type": "UNEXPECTED_ERROR",
+            "message": "Error inesperado durante la validación",
+            "details": str(e)
+        }, None
+    return validate_body(body)
+
+def validate_body(body):
+    """
+    valida que el body de una notificacion cumpla con el esquema definido
+    """
+    try:
+        fast_validators = REQUEST_FAST_VALIDATORS
+        if fast_validators is not None and select_validator(body, fast_validators)(body):
+            return None,body
+
+        from jsonschema.exceptions import best_match
+
+        error = best_match(select_validator(body, get_request_validators()).iter_errors(body))
+        if error is None:
+            return None,body
+        main_error = format_validation_error(error)
         all_errors = [main_error]
-        if hasattr(e,'context') and e.context:
-            for sub_error in e.context:
+        if hasattr(error,'context') and error.context:
+            for sub_error in error.context:
                 all_errors.append(format_validation_error(sub_error))
         return {
             "error_type": "VALIDATION_ERROR",
@@ -226,17 +558,9 @@ def validate_request(request):
             "total_errors": len(all_errors)
         }, None
 
-    except json.JSONDecodeError as e:
-        return {
-            "error_type": "INVALID_FORMAT_ERROR",
-            "message": "Request con formato inválido",
-            "details": str(e)
-        }, None
     except Exception as e:
        return {
             "error_type": "UNEXPECTED_ERROR",
             "message": "Error inesperado durante la validación",
             "details": str(e)
         }, None
-    
-        
\ No newline at end of file
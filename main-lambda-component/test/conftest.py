@@ -0,0 +1,170 @@
+import importlib.util
+import io
+import json
+import os
+import sys
+
+import botocore.exceptions
+import pytest
+import yaml
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+import lambda_function
+from request_validation import NEMONIC_CONFIG
+
+SQS_HANDLER_PATH = os.path.join(os.path.dirname(ROOT), "sqs-handler", "lambda_function.py")
+
+
+class FakeClock:
+    """
+    Reloj controlado por la prueba: devuelve now hasta que se avanza a mano
+    """
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeS3:
+    """
+    Cliente S3 en memoria. Los objetos guardados con put_object se leen por
+    bucket y llave; el resto de lecturas devuelve content (configuracion o
+    catalogo) y responden 304 cuando IfNoneMatch coincide con el ETag
+    """
+
+    def __init__(self, content=None, etag='"v1"', fail_put=False):
+        self.objects = {}
+        self.deleted = []
+        self.calls = []
+        self.error = None
+        self.fail_put = fail_put
+        self.content = None
+        if content is not None:
+            self.put(content, etag)
+
+    def put(self, content, etag=None):
+        self.content = content if isinstance(content, str) else json.dumps(content)
+        self.etag = etag or f'"v{len(self.calls)}-{hash(self.content)}"'
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        if self.fail_put:
+            raise RuntimeError("S3 no disponible")
+        self.objects[(Bucket, Key)] = Body
+
+    def get_object(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.error:
+            raise self.error
+        key = (kwargs.get("Bucket"), kwargs.get("Key"))
+        if key in self.objects:
+            return {"Body": io.BytesIO(self.objects[key])}
+        if self.content is None:
+            raise botocore.exceptions.ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        if kwargs.get("IfNoneMatch") == self.etag:
+            raise botocore.exceptions.ClientError(
+                {"Error": {"Code": "304", "Message": "Not Modified"},
+                 "ResponseMetadata": {"HTTPStatusCode": 304}},
+                "GetObject",
+            )
+        return {"Body": io.BytesIO(self.content.encode("utf-8")), "ETag": self.etag}
+
+    def delete_object(self, Bucket, Key):
+        self.deleted.append((Bucket, Key))
+        self.objects.pop((Bucket, Key), None)
+
+
+class FakeSQS:
+    """
+    Cola SQS en memoria para SendMessageBatch; failed_ids fallan una vez
+    """
+
+    def __init__(self, failed_ids=()):
+        self.batches = []
+        self.failed_ids = set(failed_ids)
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.batches.append(Entries)
+        successful = []
+        failed = []
+        for entry in Entries:
+            if entry["Id"] in self.failed_ids:
+                self.failed_ids.discard(entry["Id"])
+                failed.append({"Id": entry["Id"], "Code": "InternalError", "SenderFault": False})
+            else:
+                successful.append({"Id": entry["Id"], "MessageId": f"msg-{entry['Id']}"})
+        return {"Successful": successful, "Failed": failed}
+
+
+def valid_request():
+    nemonic, config = next(iter(NEMONIC_CONFIG.items()))
+    return {
+        "refService": nemonic,
+        "channels": "BMO",
+        "cod_ente": 123,
+        "data": {field: "valor" for field in config["required_fields"]},
+        "addresses": [{"className": "email", "type": "TO", "ref": "usuario@ejemplo.com"}],
+    }
+
+
+def load_json_file(filename):
+    filepath = os.path.join(os.path.dirname(__file__), filename)
+    with open(filepath, "r") as file:
+        return json.load(file)
+
+
+def load_config():
+    with open(os.path.join(ROOT, "config-dev.yml"), "r") as file:
+        return yaml.safe_load(file)
+
+
+def load_sqs_handler():
+    """
+    Carga una copia nueva del sqs-handler, que tambien se llama lambda_function
+    """
+    spec = importlib.util.spec_from_file_location("sqs_handler_lambda_function", SQS_HANDLER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def sqs_handler():
+    return load_sqs_handler()
+
+
+@pytest.fixture
+def entorno(monkeypatch):
+    """
+    Lambda de ingreso con la configuracion de dev, almacenes en memoria y
+    AWS, base de datos, OAuth y Latinia simulados
+    """
+    config = load_config()
+    config["latinia"]["circuit_breaker"] = {"store": "memory"}
+    config["lambda"]["ids"] = {"store": "random"}
+    config["sqs"]["claim_check"] = {"enabled": False}
+    config["latinia"]["rate_limit"] = {"enabled": False}
+    config["nemonics"] = {}
+    lambda_function._circuit_breakers.clear()
+    sqs = FakeSQS()
+    sent = []
+    tokens = []
+    monkeypatch.setattr(lambda_function, "load_yaml_file", lambda path: config)
+    monkeypatch.setattr(lambda_function, "get_client", lambda service_name: sqs)
+    monkeypatch.setattr(lambda_function, "get_secret", lambda *args, **kwargs: {
+        "username": "u", "password": "p", "host": "h", "port": "3306", "dbname": "db",
+    })
+    monkeypatch.setattr(lambda_function, "get_params_noti_as_dict", lambda *args: {
+        "NotiEmpresa": "BOLIVARIANO", "NotiRefMessageLabel": "Avisos24",
+    })
+
+    def fake_token(*args, **kwargs):
+        tokens.append(kwargs.get("force_refresh", False))
+        return "token"
+
+    monkeypatch.setattr(lambda_function, "get_oauth_token", fake_token)
+    monkeypatch.setattr(lambda_function, "send_notification_to_latinia", lambda url, body, *args, **kwargs: sent.append(body))
+    return {"config": config, "sqs": sqs, "sent": sent, "tokens": tokens}
@@ -0,0 +1,121 @@
+import json
+import os
+import sys
+
+import requests
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import lambda_function
+from conftest import load_json_file, valid_request
+
+
+def test_lote_comparte_token_y_envia_cada_notificacion(entorno):
+    valid = valid_request()
+    response = lambda_function.lambda_handler({"body": json.dumps([valid, valid, valid])}, None)
+    body = json.loads(response["body"])
+
+    assert response["statusCode"] == 200
+    assert body["total"] == 3
+    assert [result["codigoError"] for result in body["results"]] == [0, 0, 0]
+    assert len(entorno["sent"]) == 3
+    assert entorno["tokens"] == [False]
+
+
+def test_lote_con_items_invalidos_responde_207(entorno):
+    valid = valid_request()
+    invalid = load_json_file("invalid_request.json")
+    response = lambda_function.lambda_handler({"body": json.dumps([valid, invalid])}, None)
+    body = json.loads(response["body"])
+
+    assert response["statusCode"] == 207
+    assert [result["index"] for result in body["results"]] == [0, 1]
+    assert body["results"][1]["codigoError"] == 40001
+    assert len(entorno["sent"]) == 1
+
+
+def test_lote_en_mantenimiento_usa_send_message_batch(entorno):
+    entorno["config"]["latinia"]["mantenimiento"] = True
+    valid = valid_request()
+    response = lambda_function.lambda_handler({"body": json.dumps([valid] * 23)}, None)
+    body = json.loads(response["body"])
+
+    assert response["statusCode"] == 200
+    assert [len(batch) for batch in entorno["sqs"].batches] == [10, 10, 3]
+    assert {result["codigoError"] for result in body["results"]} == {10}
+    assert entorno["sent"] == []
+
+
+def test_fallo_de_latinia_encola_el_resto(entorno, monkeypatch):
+    calls = []
+
+    def fail_second(url, body, *args, **kwargs):
+        calls.append(body)
+        if len(calls) == 2:
+            raise requests.exceptions.ConnectionError("sin conexion")
+
+    monkeypatch.setattr(lambda_function, "send_notification_to_latinia", fail_second)
+    valid = valid_request()
+    response = lambda_function.lambda_handler({"body": json.dumps([valid] * 4)}, None)
+    body = json.loads(response["body"])
+
+    assert len(calls) == 2
+    assert [result["codigoError"] for result in body["results"]] == [0, 10, 10, 10]
+    assert len(entorno["sqs"].batches[0]) == 3
+
+
+def test_reintento_de_entradas_fallidas(entorno):
+    entorno["sqs"].failed_ids.add("1")
+    results = lambda_function.send_notifications_to_queue("url", [{"a": 1}, {"a": 2}], "2025-01-01 00:00:00")
+
+    assert results == [{"messageId": "msg-0"}, {"messageId": "msg-1"}]
+    assert [len(batch) for batch in entorno["sqs"].batches] == [2, 1]
+
+
+def test_lote_agrupado_por_tamano():
+    entries = [{"Id": str(i), **lambda_function.build_queue_message({"data": "x" * 100 * 1024}, "f")} for i in range(5)]
+    groups = list(lambda_function.split_queue_batches(entries))
+
+    assert [len(group) for group in groups] == [2, 2, 1]
+
+
+def test_lote_supera_maximo(entorno):
+    entorno["config"]["lambda"]["batch"] = {"max_items": 2}
+    response = lambda_function.lambda_handler({"body": json.dumps([{}, {}, {}])}, None)
+
+    assert response["statusCode"] == 400
+
+
+def test_circuito_abierto_encola_sin_llamar_a_latinia(entorno, monkeypatch):
+    entorno["config"]["latinia"]["circuit_breaker"] = {"store": "memory", "failure_threshold": 1, "open_seconds": 60}
+    calls = []
+
+    def fail(url, body, *args, **kwargs):
+        calls.append(body)
+        raise requests.exceptions.Timeout("sin respuesta")
+
+    monkeypatch.setattr(lambda_function, "send_notification_to_latinia", fail)
+    valid = valid_request()
+    lambda_function.lambda_handler({"body": json.dumps([valid])}, None)
+    response = lambda_function.lambda_handler({"body": json.dumps([valid, valid])}, None)
+    body = json.loads(response["body"])
+
+    assert len(calls) == 1
+    assert [result["codigoError"] for result in body["results"]] == [10, 10]
+
+
+def test_nemonico_del_lote_acotado_al_catalogo():
+    valid = valid_request()
+
+    assert lambda_function.get_batch_nemonic([valid, valid]) == valid["refService"]
+    assert lambda_function.get_batch_nemonic([valid, {"refService": "OTRO"}]) == "MIXED"
+    assert lambda_function.get_batch_nemonic([{"refService": ["A", "B"]}, {"refService": "OTRO"}]) == "NA"
+
+
+def test_lote_con_refservice_que_no_es_texto(entorno, capsys):
+    invalid = dict(valid_request(), refService=["A", "B"])
+    response = lambda_function.lambda_handler({"body": json.dumps([invalid, invalid])}, None)
+
+    assert response["statusCode"] < 500
+    documents = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith('{"_aws"')]
+    assert [document["Nemonic"] for document in documents if "InvocationTime" in document] == ["NA"]
@@ -0,0 +1,223 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.circuit_breaker import (
+    CLOSED,
+    DEFAULT_TABLE_NAME,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    DynamoDBStore,
+    MemoryStore,
+    SQLiteStore,
+    build_store,
+)
+
+
+class FakeDynamoDB:
+    """
+    Tabla de DynamoDB en memoria que evalua las condiciones de escritura
+    """
+
+    def __init__(self, conflicts=0):
+        self.items = {}
+        self.conflicts = conflicts
+        self.puts = []
+
+    def get_item(self, TableName, Key, ConsistentRead):
+        item = self.items.get(Key["name"]["S"])
+        return {"Item": item} if item else {}
+
+    def put_item(self, TableName, Item, ConditionExpression, ExpressionAttributeValues=None, ExpressionAttributeNames=None):
+        self.puts.append({"condition": ConditionExpression, "values": ExpressionAttributeValues, "version": Item["version"]["N"]})
+        stored = self.items.get(Item["name"]["S"])
+        if ConditionExpression == "attribute_not_exists(#n)":
+            accepted = stored is None
+        else:
+            accepted = stored is not None and stored["version"] == ExpressionAttributeValues[":version"]
+        if self.conflicts:
+            self.conflicts -= 1
+            accepted = False
+        if not accepted:
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem")
+        self.items[Item["name"]["S"]] = Item
+
+
+class FailingDynamoDB:
+    def get_item(self, **kwargs):
+        raise EndpointConnectionError(endpoint_url="https://dynamodb")
+
+    put_item = get_item
+
+
+@pytest.fixture(params=["memory", "sqlite", "dynamodb"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteStore(str(tmp_path / "breaker.db"))
+    if request.param == "dynamodb":
+        return DynamoDBStore("tabla", client=FakeDynamoDB())
+    return MemoryStore()
+
+
+def new_breaker(store, **kwargs):
+    options = {"failure_threshold": 2, "open_seconds": 0.1, "probe_timeout_seconds": 0.1, "refresh_seconds": 0}
+    options.update(kwargs)
+    return CircuitBreaker("latinia", store=store, **options)
+
+
+def test_se_abre_al_llegar_al_umbral(store):
+    breaker = new_breaker(store)
+
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow_request()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_exito_reinicia_los_fallos(store):
+    breaker = new_breaker(store)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == CLOSED
+
+
+def test_prueba_semiabierta_cierra_el_circuito(store):
+    breaker = new_breaker(store)
+    breaker.record_failure()
+    breaker.record_failure()
+    time.sleep(0.15)
+
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()
+    breaker.record_success()
+
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+
+def test_prueba_fallida_vuelve_a_abrir(store):
+    breaker = new_breaker(store)
+    breaker.record_failure()
+    breaker.record_failure()
+    time.sleep(0.15)
+
+    assert breaker.allow_request()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_estado_compartido_entre_contenedores(tmp_path):
+    path = str(tmp_path / "breaker.db")
+    first = new_breaker(SQLiteStore(path), open_seconds=30)
+    second = new_breaker(SQLiteStore(path), open_seconds=30)
+
+    first.record_failure()
+    second.record_failure()
+
+    assert first.state == OPEN
+    assert not second.allow_request()
+
+
+def test_una_sola_prueba_entre_contenedores(tmp_path):
+    path = str(tmp_path / "breaker.db")
+    breakers = [new_breaker(SQLiteStore(path), probe_timeout_seconds=30) for _ in range(8)]
+    breakers[0].record_failure()
+    breakers[0].record_failure()
+    time.sleep(0.15)
+    allowed = []
+    barrier = threading.Barrier(len(breakers))
+
+    def probe(breaker):
+        barrier.wait()
+        allowed.append(breaker.allow_request())
+
+    threads = [threading.Thread(target=probe, args=(breaker,)) for breaker in breakers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert allowed.count(True) == 1
+
+
+def test_almacen_no_soportado():
+    with pytest.raises(ValueError):
+        build_store({"store": "redis"})
+
+
+def test_almacen_por_defecto_es_dynamodb(capsys):
+    store = build_store({})
+
+    assert isinstance(store, DynamoDBStore)
+    assert store.table_name == DEFAULT_TABLE_NAME
+    assert "ADVERTENCIA" not in capsys.readouterr().out
+
+
+def test_almacen_local_se_advierte(tmp_path, capsys):
+    assert isinstance(build_store({"store": "sqlite", "path": str(tmp_path / "breaker.db")}), SQLiteStore)
+    assert isinstance(build_store({"store": "memory"}), MemoryStore)
+
+    assert capsys.readouterr().out.count("ADVERTENCIA") == 2
+
+
+def test_dynamodb_escribe_condicionado_a_la_version():
+    dynamodb = FakeDynamoDB()
+    store = DynamoDBStore("tabla", client=dynamodb)
+
+    store.update("latinia", lambda current: dict(current, failures=1))
+    store.update("latinia", lambda current: dict(current, failures=2))
+
+    assert [put["condition"] for put in dynamodb.puts] == ["attribute_not_exists(#n)", "version = :version"]
+    assert dynamodb.puts[1]["values"] == {":version": {"N": "1"}}
+    assert store.get("latinia")["failures"] == 2
+    assert store.get("latinia")["version"] == 2
+
+
+def test_dynamodb_reintenta_conflicto_de_version():
+    dynamodb = FakeDynamoDB()
+    store = DynamoDBStore("tabla", client=dynamodb)
+    store.update("latinia", lambda current: dict(current, failures=1))
+    dynamodb.conflicts = 1
+
+    state = store.update("latinia", lambda current: dict(current, failures=current["failures"] + 1))
+
+    assert len(dynamodb.puts) == 3
+    assert state["failures"] == 2
+    assert store.get("latinia")["version"] == 2
+
+
+def test_dynamodb_con_contencion_devuelve_el_estado_vigente():
+    dynamodb = FakeDynamoDB(conflicts=3)
+    store = DynamoDBStore("tabla", client=dynamodb, max_attempts=3)
+
+    state = store.update("latinia", lambda current: dict(current, failures=1))
+
+    assert len(dynamodb.puts) == 3
+    assert state["failures"] == 0 and state["version"] == 0
+
+
+def test_almacen_caido_usa_el_estado_local(capsys):
+    breaker = new_breaker(DynamoDBStore("tabla", client=FailingDynamoDB()))
+
+    breaker.record_failure()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    output = capsys.readouterr().out
+    assert "ADVERTENCIA" in output
+    assert '"CircuitBreakerStoreFallback"' in output
@@ -0,0 +1,138 @@
+import gzip
+import logging
+import os
+import sys
+
+import pytest
+from botocore.exceptions import ClientError
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import lambda_function
+from conftest import FakeS3
+from utils import claim_check, json_codec
+
+FECHA_PROCESO = "2025-01-02 12:34:56"
+
+
+def payload(size):
+    return {"refService": "TRANSFERENCIA", "contents": [{"value": "A" * size, "encoding": "base64"}]}
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    fake = FakeS3()
+    monkeypatch.setattr(claim_check, "get_client", lambda service_name: fake)
+    claim_check.configure_claim_check({"enabled": True, "threshold_bytes": 1024}, "bucket-config")
+    yield fake
+    claim_check.configure_claim_check(None)
+
+
+def test_payload_pequeno_viaja_en_el_mensaje(s3):
+    message = lambda_function.build_queue_message(payload(10), FECHA_PROCESO)
+    body = json_codec.loads(message["MessageBody"])
+    assert body["payload"] == payload(10)
+    assert "payload_ref" not in body
+    assert claim_check.CLAIM_CHECK_ATTRIBUTE not in message["MessageAttributes"]
+    assert s3.objects == {}
+
+
+def test_payload_grande_se_guarda_comprimido_en_s3(s3):
+    message = lambda_function.build_queue_message(payload(50000), FECHA_PROCESO)
+    body = json_codec.loads(message["MessageBody"])
+    ref = body["payload_ref"]
+    assert "payload" not in body
+    assert ref["bucket"] == "bucket-config"
+    assert ref["key"] == f"claim-check/2025/01/02/{body['messageId']}.json.gz"
+    stored = s3.objects[(ref["bucket"], ref["key"])]
+    assert len(stored) < ref["size"]
+    assert json_codec.loads(gzip.decompress(stored)) == payload(50000)
+    assert message["MessageAttributes"]["ClaimCheck"]["StringValue"] == f"s3://bucket-config/{ref['key']}"
+    assert len(message["MessageBody"]) < 1024
+
+
+def test_deshabilitado_no_usa_s3(s3):
+    claim_check.configure_claim_check({"enabled": False})
+    body = json_codec.loads(lambda_function.build_queue_message(payload(50000), FECHA_PROCESO)["MessageBody"])
+    assert body["payload"] == payload(50000)
+    assert s3.objects == {}
+
+
+def test_si_s3_falla_se_encola_completo_cuando_cabe(s3):
+    s3.fail_put = True
+    body = json_codec.loads(lambda_function.build_queue_message(payload(50000), FECHA_PROCESO)["MessageBody"])
+    assert body["payload"] == payload(50000)
+
+
+def test_si_s3_falla_y_no_cabe_en_sqs_se_propaga_el_error(s3):
+    s3.fail_put = True
+    with pytest.raises(RuntimeError):
+        lambda_function.build_queue_message(payload(300 * 1024), FECHA_PROCESO)
+
+
+def test_sqs_handler_rehidrata_y_elimina_el_payload(s3, sqs_handler, monkeypatch):
+    message = lambda_function.build_queue_message(payload(50000), FECHA_PROCESO)
+    sqs_message = {"MessageId": "m-1", "Body": message["MessageBody"], "MessageAttributes": message["MessageAttributes"]}
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: s3)
+    sent = []
+    monkeypatch.setattr(sqs_handler, "send_notification_to_latinia", lambda **kwargs: sent.append(kwargs["body"]))
+    logger = logging.getLogger("test_claim_check")
+
+    assert sqs_handler.process_message_and_send_to_latinia(sqs_message, "https://latinia", None, 5, logger, "secreto", "https://auth")
+    assert sent == [payload(50000)]
+
+    sqs_handler.delete_claim_check_payload(sqs_message, logger)
+    assert s3.objects == {}
+    assert len(s3.deleted) == 1
+
+
+def test_sqs_handler_sin_objeto_en_s3_no_confirma_el_mensaje(s3, sqs_handler, monkeypatch):
+    message = lambda_function.build_queue_message(payload(50000), FECHA_PROCESO)
+    s3.objects.clear()
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: s3)
+    sqs_message = {"MessageId": "m-1", "Body": message["MessageBody"], "MessageAttributes": message["MessageAttributes"]}
+    assert not sqs_handler.process_message_and_send_to_latinia(sqs_message, "https://latinia", None, 5, logging.getLogger(), "secreto", "https://auth")
+
+
+class FailingSQS:
+    def __init__(self, failed_ids=()):
+        self.failed_ids = set(failed_ids)
+
+    def send_message(self, QueueUrl, **kwargs):
+        raise ClientError({"Error": {"Code": "QueueDoesNotExist"}}, "SendMessage")
+
+    def send_message_batch(self, QueueUrl, Entries):
+        failed = [{"Id": entry["Id"], "Code": "InvalidParameterValue", "SenderFault": True} for entry in Entries if entry["Id"] in self.failed_ids]
+        successful = [{"Id": entry["Id"], "MessageId": f"msg-{entry['Id']}"} for entry in Entries if entry["Id"] not in self.failed_ids]
+        return {"Successful": successful, "Failed": failed}
+
+
+def test_envio_fallido_elimina_el_payload_de_s3(s3, monkeypatch):
+    monkeypatch.setattr(lambda_function, "get_client", lambda service_name: FailingSQS())
+
+    with pytest.raises(ClientError):
+        lambda_function.send_notification_to_queue("url", payload(50000), FECHA_PROCESO)
+
+    assert s3.objects == {}
+    assert len(s3.deleted) == 1
+
+
+def test_lote_elimina_solo_los_payloads_no_encolados(s3, monkeypatch):
+    monkeypatch.setattr(lambda_function, "get_client", lambda service_name: FailingSQS(failed_ids={"1"}))
+
+    results = lambda_function.send_notifications_to_queue("url", [payload(50000), payload(50000), payload(10)], FECHA_PROCESO)
+
+    assert [("error" in result) for result in results] == [False, True, False]
+    assert len(s3.deleted) == 1
+    assert len(s3.objects) == 1
+
+
+def test_payload_huerfano_que_no_se_puede_eliminar_no_oculta_el_error(s3, monkeypatch):
+    def fail_delete(Bucket, Key):
+        raise RuntimeError("S3 no disponible")
+
+    monkeypatch.setattr(s3, "delete_object", fail_delete)
+    monkeypatch.setattr(lambda_function, "get_client", lambda service_name: FailingSQS())
+
+    with pytest.raises(ClientError):
+        lambda_function.send_notification_to_queue("url", payload(50000), FECHA_PROCESO)
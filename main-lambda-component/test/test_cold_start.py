@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO = os.path.dirname(ROOT)
+
+DEPENDENCIAS_PESADAS = (
+    "boto3",
+    "botocore.client",
+    "botocore.exceptions",
+    "jsonschema",
+    "pymysql",
+    "pytz",
+    "requests",
+    "urllib3",
+    "yaml",
+)
+
+
+@pytest.mark.parametrize(
+    "directorio",
+    [ROOT, os.path.join(REPO, "sqs-handler"), os.path.join(REPO, "main-lambda-event-minsait")],
+    ids=["ingreso", "sqs-handler", "minsait"],
+)
+def test_importar_la_lambda_no_carga_dependencias_pesadas(directorio):
+    code = (
+        "import sys, lambda_function; "
+        f"print(sorted(m for m in {DEPENDENCIAS_PESADAS!r} if m in sys.modules))"
+    )
+    env = dict(os.environ, AWS_DEFAULT_REGION="us-east-1")
+    result = subprocess.run([sys.executable, "-c", code], cwd=directorio, env=env, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import botocore.exceptions
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from conftest import FakeS3
+from utils.config_cache import ConfigCache
+
+
+def test_cache_hit_dentro_del_ttl():
+    s3 = FakeS3("latinia:\n  mantenimiento: false\n")
+    cache = ConfigCache(s3, ttl_seconds=60)
+
+    first = cache.get("bucket", "config-dev.yml")
+    second = cache.get("bucket", "config-dev.yml")
+
+    assert first == second == {"latinia": {"mantenimiento": False}}
+    assert len(s3.calls) == 1
+
+
+def test_copia_no_contamina_el_cache():
+    s3 = FakeS3("latinia:\n  mantenimiento: false\n")
+    cache = ConfigCache(s3, ttl_seconds=60)
+
+    config = cache.get("bucket", "config-dev.yml")
+    config["latinia"]["mantenimiento"] = True
+
+    assert cache.get("bucket", "config-dev.yml")["latinia"]["mantenimiento"] is False
+
+
+def test_revalidacion_con_etag():
+    s3 = FakeS3("latinia:\n  mantenimiento: false\n")
+    cache = ConfigCache(s3, ttl_seconds=0)
+
+    cache.get("bucket", "config-dev.yml")
+    config = cache.get("bucket", "config-dev.yml")
+
+    assert s3.calls[1]["IfNoneMatch"] == '"v1"'
+    assert config == {"latinia": {"mantenimiento": False}}
+
+    s3.content, s3.etag = "latinia:\n  mantenimiento: true\n", '"v2"'
+    assert cache.get("bucket", "config-dev.yml")["latinia"]["mantenimiento"] is True
+
+
+def test_fallback_a_ultima_configuracion_valida():
+    s3 = FakeS3("latinia:\n  mantenimiento: false\n")
+    cache = ConfigCache(s3, ttl_seconds=0)
+    cache.get("bucket", "config-dev.yml")
+
+    s3.error = botocore.exceptions.EndpointConnectionError(endpoint_url="https://s3")
+    assert cache.get("bucket", "config-dev.yml") == {"latinia": {"mantenimiento": False}}
+
+
+def test_error_sin_configuracion_previa():
+    s3 = FakeS3("")
+    s3.error = botocore.exceptions.EndpointConnectionError(endpoint_url="https://s3")
+    cache = ConfigCache(s3, ttl_seconds=60)
+
+    with pytest.raises(botocore.exceptions.EndpointConnectionError):
+        cache.get("bucket", "config-dev.yml")
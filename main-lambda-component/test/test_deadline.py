@@ -0,0 +1,127 @@
+import logging
+import os
+import sys
+
+import pytest
+import requests
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import lambda_function
+from conftest import FakeClock
+from utils import utils
+from utils.deadline import BudgetExceeded, LatencyBudget
+
+
+class FakeContext:
+    def get_remaining_time_in_millis(self):
+        return 5000
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code}")
+
+
+class FakeSession:
+    """
+    Sesion que responde la secuencia indicada y avanza el reloj en cada intento
+    """
+
+    def __init__(self, clock, outcomes, elapsed=1.0):
+        self.clock = clock
+        self.outcomes = list(outcomes)
+        self.elapsed = elapsed
+        self.timeouts = []
+
+    def post(self, url, timeout, **kwargs):
+        self.timeouts.append(timeout)
+        self.clock.now += min(self.elapsed, timeout)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(outcome)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(100.0)
+    monkeypatch.setattr(utils.time, "sleep", lambda seconds: setattr(clock, "now", clock.now + seconds))
+    return clock
+
+
+def test_timeout_limitado_por_el_presupuesto(clock):
+    budget = LatencyBudget(4000, safety_margin_ms=0, fallback_reserve_ms=1000, clock=clock)
+
+    assert budget.timeout(10) == pytest.approx(3.0)
+    assert budget.timeout(2) == 2
+    clock.now += 2.95
+    with pytest.raises(BudgetExceeded):
+        budget.timeout(10)
+
+
+def test_presupuesto_desde_el_contexto():
+    budget = LatencyBudget.from_context(FakeContext(), {"lambda": {"budget": {"safety_margin_ms": 0, "fallback_reserve_ms": 0}}})
+    assert 4.9 < budget.remaining() <= 5.0
+
+    budget = LatencyBudget.from_context(None, {"lambda": {"timeout_seconds": 2}})
+    assert budget.remaining() <= 2.0
+
+
+def test_reintenta_mientras_alcance_el_presupuesto(clock):
+    budget = LatencyBudget(10000, safety_margin_ms=0, fallback_reserve_ms=1000, clock=clock)
+    session = FakeSession(clock, [503, 503, 200])
+
+    response = utils.post_with_budget(session, "http://latinia", budget, 5, reintentos=3, backoff_factor=0.5)
+
+    assert response.status_code == 200
+    assert len(session.timeouts) == 3
+
+
+def test_corta_reintentos_sin_presupuesto(clock):
+    budget = LatencyBudget(4000, safety_margin_ms=0, fallback_reserve_ms=1000, clock=clock)
+    session = FakeSession(clock, [503, 503, 503, 503], elapsed=1.5)
+
+    response = utils.post_with_budget(session, "http://latinia", budget, 5, reintentos=3, backoff_factor=0.5)
+
+    assert response.status_code == 503
+    assert len(session.timeouts) == 2
+    assert budget.remaining() >= 1.0
+
+
+def test_timeout_sin_presupuesto_se_propaga(clock):
+    budget = LatencyBudget(3000, safety_margin_ms=0, fallback_reserve_ms=1000, clock=clock)
+    session = FakeSession(clock, [requests.exceptions.ReadTimeout("lento")] * 4, elapsed=5)
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        utils.post_with_budget(session, "http://latinia", budget, 10, reintentos=3, backoff_factor=0.5)
+
+    assert session.timeouts == [pytest.approx(2.0)]
+
+
+def test_etapas_registradas(clock):
+    budget = LatencyBudget(5000, clock=clock)
+    with budget.stage("oauth"):
+        clock.now += 0.25
+
+    assert budget.summary()["stages_ms"] == {"oauth": 250.0}
+
+
+def test_oauth_reintenta_solo_con_presupuesto(clock, monkeypatch):
+    session = FakeSession(clock, [503, 503, 503], elapsed=1.0)
+    sessions = []
+    monkeypatch.setattr(lambda_function, "get_secret", lambda *args, **kwargs: {"client_id": "cliente-oauth", "client_secret": "s"})
+    monkeypatch.setattr(lambda_function, "get_session", lambda url, *args, **kwargs: sessions.append(args) or session)
+    budget = LatencyBudget(3000, safety_margin_ms=0, fallback_reserve_ms=1000, clock=clock)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        lambda_function.request_oauth_token("https://auth", "secreto-oauth", logging.getLogger(), budget)
+
+    # Sesion sin reintentos de urllib3: un solo reintento cabe en el presupuesto
+    assert sessions == [(0,)]
+    assert session.timeouts == [2.0, 0.5]
@@ -0,0 +1,98 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import request_validation
+from conftest import load_json_file
+from request_validation import NEMONIC_CONFIG, REQUEST_FAST_VALIDATORS, get_request_validators, validate_request
+from utils.schema_codegen import UnsupportedSchemaError, compile_fast_validator
+
+DATA_FIELDS = list(request_validation.request_schema["properties"]["data"]["properties"])
+VALUES = [None, "", "texto", 0, 1, -1, 1.0, 2.5, True, False, [], ["a"], {}, {"a": 1}]
+
+
+def random_value(rng):
+    return rng.choice(VALUES)
+
+
+def random_item(rng, fields):
+    item = {field: rng.choice(["valor", "valor", random_value(rng)]) for field in fields if rng.random() < 0.9}
+    return item if rng.random() < 0.95 else random_value(rng)
+
+
+def random_request(rng):
+    """
+    Genera requests con mezcla de campos validos, faltantes y de tipo incorrecto
+    """
+    nemonics = list(NEMONIC_CONFIG) + ["NOEXISTE"]
+    request = {}
+    if rng.random() < 0.9:
+        request["refService"] = rng.choice(nemonics) if rng.random() < 0.9 else random_value(rng)
+    if rng.random() < 0.5:
+        request["channels"] = rng.choice(["BMO", random_value(rng)])
+    if rng.random() < 0.5:
+        request["cod_ente"] = rng.choice([123, 0, -5, None, 1.0, "123", True])
+    if rng.random() < 0.95:
+        fields = rng.sample(DATA_FIELDS, rng.randint(0, len(DATA_FIELDS)))
+        data = {field: rng.choice(["valor", None, "valor", random_value(rng)]) for field in fields}
+        request["data"] = data if rng.random() < 0.95 else random_value(rng)
+    if rng.random() < 0.95:
+        addresses = [random_item(rng, ["className", "type", "ref"]) for _ in range(rng.randint(0, 3))]
+        request["addresses"] = addresses if rng.random() < 0.95 else random_value(rng)
+    if rng.random() < 0.5:
+        contents = [random_item(rng, ["value", "type", "encoding", "name"]) for _ in range(rng.randint(0, 2))]
+        request["contents"] = contents if rng.random() < 0.95 else random_value(rng)
+    return request if rng.random() < 0.98 else random_value(rng)
+
+
+def build_cases():
+    rng = random.Random(2025)
+    cases = [load_json_file("valid_request.json"), load_json_file("invalid_request.json")]
+    for nemonic, config in NEMONIC_CONFIG.items():
+        cases.append({
+            "refService": nemonic,
+            "data": {field: "valor" for field in config["required_fields"]},
+            "addresses": [{"className": "email", "type": "TO", "ref": "usuario@ejemplo.com"}],
+        })
+    cases.extend(random_request(rng) for _ in range(1500))
+    return cases
+
+
+CASES = build_cases()
+
+
+def schema_pairs():
+    validators = get_request_validators()
+    yield "all", REQUEST_FAST_VALIDATORS["all"], validators["all"]
+    yield "base", REQUEST_FAST_VALIDATORS["base"], validators["base"]
+    for nemonic, validator in validators["nemonics"].items():
+        yield nemonic, REQUEST_FAST_VALIDATORS["nemonics"][nemonic], validator
+
+
+@pytest.mark.parametrize("name,fast,validator", list(schema_pairs()), ids=lambda value: value if isinstance(value, str) else "")
+def test_paridad_fast_path_con_jsonschema(name, fast, validator):
+    for body in CASES:
+        expected = next(validator.iter_errors(body), None) is None
+        assert fast(body) is expected, body
+
+
+def test_casos_generados_cubren_validos_e_invalidos():
+    results = [validate_request(body)[0] is None for body in CASES]
+    assert any(results)
+    assert not all(results)
+
+
+def test_fallback_entrega_detalle_de_errores():
+    error, body = validate_request(load_json_file("invalid_request.json"))
+
+    assert body is None
+    assert error["error_type"] == "VALIDATION_ERROR"
+    assert error["errors"][0]["validator"] == "required"
+
+
+def test_palabra_clave_no_soportada():
+    with pytest.raises(UnsupportedSchemaError):
+        compile_fast_validator({"type": "string", "pattern": "^a"})
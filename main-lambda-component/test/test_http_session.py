@@ -0,0 +1,57 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import utils
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_sesion_compartida_por_host(server):
+    assert utils.get_session(f"{server}/a") is utils.get_session(f"{server}/b")
+    assert utils.get_session(f"{server}/a") is not utils.get_session(f"{server}/a", pool_maxsize=20)
+
+
+def test_contadores_de_reutilizacion(server):
+    session = utils.get_session(f"{server}/latinia", reintentos=0)
+    for _ in range(5):
+        session.post(f"{server}/latinia", json={"id": 1}, timeout=5).raise_for_status()
+
+    stats = utils.get_connection_stats()["127.0.0.1"]
+
+    assert stats["requests"] >= 5
+    assert stats["connections"] == 1
+    assert stats["reused"] == stats["requests"] - 1
+
+
+def test_pool_config_desde_yaml():
+    config = {"lambda": {"backoff": {"max_retries": 3, "pool_maxsize": "25"}}}
+    assert utils.get_pool_config(config) == {"pool_connections": 10, "pool_maxsize": 25}
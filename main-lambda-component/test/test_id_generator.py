@@ -0,0 +1,142 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from conftest import FakeClock
+from utils import id_generator as id_generator_module
+from utils.id_generator import (
+    DEFAULT_TABLE_NAME,
+    MAX_SEQUENCE,
+    WORKER_RETRY_SECONDS,
+    NotificationIdGenerator,
+    configure_id_generator,
+    lease_worker_id_dynamodb,
+)
+
+# 2025-05-07 10:00:00.123 en Guayaquil (UTC-5)
+BASE_NS = 1746630000123 * 1_000_000
+
+
+def test_formato_con_fecha_de_guayaquil():
+    generator = NotificationIdGenerator(worker_id=42, clock=FakeClock(BASE_NS))
+
+    assert generator.next_id("BMO") == "BMO20250507100000123" + "00042" + "000"
+    assert generator.next_id("EM") == "EM020250507100000123" + "00042" + "001"
+
+
+def test_fecha_actual_en_cada_id():
+    clock = FakeClock(BASE_NS)
+    generator = NotificationIdGenerator(worker_id=1, clock=clock)
+
+    first = generator.next_id()
+    clock.now += 61 * 1_000_000_000
+
+    assert generator.next_id()[3:17] != first[3:17]
+
+
+def test_secuencia_agotada_toma_el_milisegundo_siguiente():
+    generator = NotificationIdGenerator(worker_id=1, clock=FakeClock(BASE_NS))
+    ids = [generator.next_id() for _ in range(MAX_SEQUENCE + 1)]
+
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+    assert ids[-1][17:20] == "124"
+
+
+def test_reloj_que_retrocede_no_repite_ids():
+    clock = FakeClock(BASE_NS)
+    generator = NotificationIdGenerator(worker_id=1, clock=clock)
+    first = generator.next_id()
+    clock.now -= 5_000_000
+
+    assert generator.next_id() > first
+
+
+def test_unicos_entre_hilos_y_workers():
+    clock = FakeClock(BASE_NS)
+    generators = [NotificationIdGenerator(worker_id=worker, clock=clock) for worker in range(4)]
+    ids = []
+    lock = threading.Lock()
+
+    def generate(generator):
+        batch = [generator.next_id() for _ in range(2000)]
+        with lock:
+            ids.extend(batch)
+
+    threads = [threading.Thread(target=generate, args=(generator,)) for generator in generators for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(ids)) == len(ids) == 16000
+
+
+def test_worker_desde_contador_de_dynamodb():
+    class FakeDynamoDB:
+        def update_item(self, **kwargs):
+            assert kwargs["UpdateExpression"] == "ADD #counter :one"
+            return {"Attributes": {"counter": {"N": "100007"}}}
+
+    assert lease_worker_id_dynamodb("tabla", client=FakeDynamoDB()) == 7
+
+
+def test_sin_worker_no_genera_ids(capsys):
+    def failing():
+        raise RuntimeError("sin acceso")
+
+    generator = NotificationIdGenerator(worker_id_provider=failing, clock=FakeClock(BASE_NS))
+
+    with pytest.raises(RuntimeError):
+        generator.next_id()
+    assert capsys.readouterr().out.count('"IdWorkerLeaseFailed": 1') == 1
+
+
+def test_reintenta_el_worker_tras_fallar_el_almacen(capsys):
+    clock = FakeClock(BASE_NS)
+    leases = [RuntimeError("sin acceso"), RuntimeError("sin acceso"), 7]
+
+    def provider():
+        lease = leases.pop(0)
+        if isinstance(lease, Exception):
+            raise lease
+        return lease
+
+    generator = NotificationIdGenerator(worker_id_provider=provider, clock=clock)
+    with pytest.raises(RuntimeError):
+        generator.next_id()
+    # Dentro de la espera se falla sin consultar el almacen
+    clock.now += (WORKER_RETRY_SECONDS * 1_000_000_000) // 2
+    with pytest.raises(RuntimeError):
+        generator.next_id()
+    assert len(leases) == 2
+    clock.now += WORKER_RETRY_SECONDS * 1_000_000_000
+    with pytest.raises(RuntimeError):
+        generator.next_id()
+    clock.now += WORKER_RETRY_SECONDS * 1_000_000_000
+
+    assert generator.next_id()[20:25] == "00007"
+    assert leases == []
+    assert capsys.readouterr().out.count('"IdWorkerLeaseFailed": 1') == 2
+
+
+def test_origen_por_defecto_es_dynamodb(monkeypatch):
+    tables = []
+    monkeypatch.setattr(id_generator_module, "lease_worker_id_dynamodb", lambda table_name: tables.append(table_name) or 3)
+    monkeypatch.setattr(id_generator_module, "_configured_settings", None)
+    monkeypatch.setattr(id_generator_module, "id_generator", NotificationIdGenerator(clock=FakeClock(BASE_NS)))
+
+    configure_id_generator(None)
+
+    assert id_generator_module.id_generator.worker_id == 3
+    assert tables == [DEFAULT_TABLE_NAME]
+    with pytest.raises(ValueError):
+        configure_id_generator({"store": "redis"})
+
+
+def test_worker_fuera_de_rango():
+    with pytest.raises(ValueError):
+        NotificationIdGenerator(worker_id=100000)
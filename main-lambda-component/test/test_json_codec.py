@@ -0,0 +1,58 @@
+import datetime
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import json_codec
+
+PAYLOAD = {
+    "canal": "BMO",
+    "nemonico": "TRANSFERENCIA",
+    "cliente": {"nombre": "José Peña", "identificacion": "0912345678"},
+    "montos": [10.5, 0, -3],
+    "activo": True,
+    "referencia": None,
+}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(json_codec, "orjson", None)
+    elif json_codec.orjson is None:
+        pytest.skip("orjson no esta instalado")
+    return request.param
+
+
+def test_ida_y_vuelta_conserva_el_payload(backend):
+    assert json_codec.loads(json_codec.dumps(PAYLOAD)) == PAYLOAD
+    assert json_codec.loads(json_codec.dumps_bytes(PAYLOAD)) == PAYLOAD
+
+
+def test_salida_compacta_y_sin_escapar_no_ascii(backend):
+    text = json_codec.dumps({"nombre": "Peña", "a": 1})
+    assert text == '{"nombre":"Peña","a":1}'
+    assert json_codec.dumps_bytes({"nombre": "Peña"}) == '{"nombre":"Peña"}'.encode("utf-8")
+
+
+def test_salida_indentada(backend):
+    assert json.loads(json_codec.dumps(PAYLOAD, pretty=True)) == PAYLOAD
+    assert "\n  " in json_codec.dumps(PAYLOAD, pretty=True)
+
+
+def test_llaves_no_str_y_tipos_no_serializables(backend):
+    fecha = datetime.date(2025, 1, 2)
+    assert json.loads(json_codec.dumps({1: "uno"})) == {"1": "uno"}
+    assert json.loads(json_codec.dumps({"fecha": fecha, "valor": object}))["fecha"] == "2025-01-02"
+
+
+def test_enteros_grandes_usan_la_libreria_estandar(backend):
+    assert json_codec.loads(json_codec.dumps({"valor": 2 ** 70})) == {"valor": 2 ** 70}
+
+
+def test_json_invalido_lanza_jsondecodeerror(backend):
+    with pytest.raises(json.JSONDecodeError):
+        json_codec.loads("{no es json")
@@ -0,0 +1,82 @@
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import log_config
+from utils.log_config import PAYLOAD_OMITTED, LazyJson, config_logger, log_payload
+
+CONFIG = {"logging": {"level": "INFO", "format": "%(levelname)s - %(message)s", "payload_sample_rate": 1}}
+
+
+class Unserialized:
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return "valor"
+
+
+def stream_handlers(logger):
+    # pytest agrega sus propios handlers de captura al logger raiz
+    return [handler for handler in logger.handlers if type(handler) is logging.StreamHandler]
+
+
+@pytest.fixture(autouse=True)
+def root_logger():
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    level = root.level
+    root.handlers = []
+    log_config._configured = None
+    yield root
+    root.handlers = handlers
+    root.setLevel(level)
+    log_config._configured = None
+
+
+def test_configuracion_idempotente(root_logger):
+    config_logger(CONFIG)
+    handlers = list(root_logger.handlers)
+    for _ in range(5):
+        config_logger(CONFIG)
+
+    assert root_logger.handlers == handlers
+
+
+def test_reutiliza_handler_del_runtime(root_logger):
+    runtime_handler = logging.StreamHandler()
+    root_logger.addHandler(runtime_handler)
+
+    config_logger(CONFIG)
+    config_logger(CONFIG)
+
+    assert stream_handlers(root_logger) == [runtime_handler]
+    assert runtime_handler.formatter._fmt == CONFIG["logging"]["format"]
+
+
+def test_serializacion_diferida(root_logger):
+    config_logger({"logging": {**CONFIG["logging"], "level": "WARNING"}})
+    value = Unserialized()
+
+    root_logger.info("Payload: %s", LazyJson({"valor": value}))
+
+    assert value.calls == 0
+
+
+def test_payload_recortado():
+    text = str(LazyJson({"data": "x" * 100}, max_chars=20))
+
+    assert text.startswith('{"data":"xxxxxxxxxxx')
+    assert text.endswith("caracteres)")
+
+
+def test_muestreo_de_payloads():
+    config_logger({"logging": {**CONFIG["logging"], "payload_sample_rate": 0}})
+    assert log_payload({"a": 1}) == PAYLOAD_OMITTED
+
+    config_logger(CONFIG)
+    assert str(log_payload({"a": 1})) == '{"a":1}'
@@ -0,0 +1,86 @@
+import json
+import os
+import sys
+
+import yaml
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import lambda_function
+from conftest import FakeClock
+from utils.metrics import InvocationSpans, put_metrics, stage_metric_name
+
+
+def emf_documents(output):
+    return [json.loads(line) for line in output.splitlines() if line.startswith('{"_aws"')]
+
+
+def test_put_metrics_publica_un_documento_con_varias_metricas(capsys):
+    document = put_metrics({"ATime": 1.5, "BTime": 2}, "Milliseconds", {"Function": "f"})
+
+    assert emf_documents(capsys.readouterr().out) == [document]
+    directive = document["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Metrics"] == [{"Name": "ATime", "Unit": "Milliseconds"}, {"Name": "BTime", "Unit": "Milliseconds"}]
+    assert directive["Dimensions"] == [["Function"]]
+    assert document["ATime"] == 1.5 and document["Function"] == "f"
+
+
+def test_nombre_de_metrica_por_etapa():
+    assert stage_metric_name("db_params") == "DbParamsTime"
+    assert stage_metric_name("latinia") == "LatiniaTime"
+
+
+def test_spans_acumulan_etapas_y_se_publican_una_vez(capsys):
+    clock = FakeClock()
+    spans = InvocationSpans("ingreso", clock=clock)
+    for elapsed in (0.010, 0.005):
+        with spans.span("latinia"):
+            clock.now += elapsed
+    with spans.span("sqs"):
+        clock.now += 0.002
+    spans.set_nemonic("TRANSFERENCIA")
+
+    document = spans.emit("success")
+    assert spans.emit("success") == {}
+
+    assert emf_documents(capsys.readouterr().out) == [document]
+    assert round(document["LatiniaTime"], 3) == 15.0
+    assert round(document["SqsTime"], 3) == 2.0
+    assert round(document["InvocationTime"], 3) == 17.0
+    assert document["Nemonic"] == "TRANSFERENCIA"
+    assert document["Outcome"] == "success"
+    assert document["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["Function", "Outcome"], ["Function", "Nemonic", "Outcome"]]
+
+
+def test_outcome_explicito_tiene_prioridad(capsys):
+    spans = InvocationSpans("ingreso")
+    spans.outcome = "queued"
+    assert spans.emit("success")["Outcome"] == "queued"
+    assert spans.emit("success") == {}
+
+
+def test_resultado_segun_codigo_de_respuesta():
+    assert lambda_function.get_outcome({"statusCode": 200}) == "success"
+    assert lambda_function.get_outcome({"statusCode": 207}) == "partial"
+    assert lambda_function.get_outcome({"statusCode": 400}) == "invalid"
+    assert lambda_function.get_outcome({"statusCode": 500}) == "error"
+    assert lambda_function.get_outcome(None) == "error"
+
+
+def test_lambda_handler_publica_etapas_con_nemonico(capsys, monkeypatch):
+    filepath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config-dev.yml")
+    with open(filepath) as file:
+        config = yaml.safe_load(file)
+    config["lambda"]["ids"] = {"store": "random"}
+    config["nemonics"] = {}
+    monkeypatch.setattr(lambda_function, "load_yaml_file", lambda path: config)
+    event = {"body": json.dumps({"refService": "NEMONICO_INEXISTENTE", "channels": "BMO"})}
+
+    response = lambda_function.lambda_handler(event, None)
+
+    assert response["statusCode"] == 400
+    documents = [document for document in emf_documents(capsys.readouterr().out) if "InvocationTime" in document]
+    assert len(documents) == 1
+    assert documents[0]["Outcome"] == "invalid"
+    assert documents[0]["Nemonic"] == "NA"
+    assert {"ConfigTime", "ValidationTime"} <= set(documents[0])
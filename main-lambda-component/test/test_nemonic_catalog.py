@@ -0,0 +1,136 @@
+import copy
+import os
+import sys
+
+import botocore.exceptions
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import request_validation
+from conftest import FakeS3
+from request_validation import refresh_nemonic_catalog, set_nemonic_config, validate_body
+from utils import json_codec
+from utils.config_cache import ConfigCache
+
+CONIN = {
+    "description": "Consumo por internet",
+    "priority": "low",
+    "required_fields": ["tipotrj", "valor", "numtrj", "des_transaccion"],
+}
+
+
+@pytest.fixture
+def catalogo(monkeypatch):
+    """
+    Restaura el catalogo del paquete al terminar cada prueba
+    """
+    for name in (
+        "NEMONIC_CONFIG", "ALLOWED_NEMONICS", "request_schema", "REQUEST_VALIDATORS", "REQUEST_FAST_VALIDATORS",
+        "_fast_compiler", "_validator_compiler", "_catalog_cache", "_catalog_next_check",
+    ):
+        monkeypatch.setattr(request_validation, name, getattr(request_validation, name))
+    return copy.deepcopy(request_validation.NEMONIC_CONFIG)
+
+
+def conin_request(data=None):
+    return {
+        "refService": "CONIN",
+        "data": data if data is not None else {field: "valor" for field in CONIN["required_fields"]},
+        "addresses": [],
+    }
+
+
+def use_s3(monkeypatch, s3, now=None):
+    cache = ConfigCache(s3, ttl_seconds=0, loader=json_codec.loads)
+    monkeypatch.setattr(request_validation, "_catalog_cache", cache)
+    monkeypatch.setattr(request_validation, "_catalog_next_check", 0.0)
+    if now is not None:
+        monkeypatch.setattr(request_validation.time, "monotonic", lambda: now[0])
+
+
+def test_nuevo_nemonico_solo_compila_su_validador(catalogo):
+    catalogo["CONIN"] = CONIN
+
+    set_nemonic_config(catalogo)
+
+    # El esquema base cambia (lista de nemonicos) y se agrega la condicional de CONIN
+    assert request_validation._fast_compiler.compiled_count == 2
+    assert "CONIN" in request_validation.ALLOWED_NEMONICS
+    assert validate_body(conin_request())[0] is None
+    error, _ = validate_body(conin_request({"tipotrj": "Visa"}))
+    assert error["error_type"] == "VALIDATION_ERROR"
+    assert error["errors"][0]["missing_fields"] == CONIN["required_fields"]
+
+
+def test_cambio_de_campos_recompila_solo_el_nemonico(catalogo):
+    before = request_validation.get_request_validators()
+    catalogo["PAGTC"] = {**catalogo["PAGTC"], "required_fields": ["valor"]}
+
+    set_nemonic_config(catalogo)
+    after = request_validation.get_request_validators()
+
+    assert request_validation._fast_compiler.compiled_count == 1
+    assert request_validation._validator_compiler.compiled_count == 1
+    assert after["base"] is before["base"]
+    assert after["nemonics"]["BQTCT"].validators == before["nemonics"]["BQTCT"].validators
+    assert after["nemonics"]["PAGTC"].validators[1] is not before["nemonics"]["PAGTC"].validators[1]
+    assert validate_body({"refService": "PAGTC", "data": {"valor": "1"}, "addresses": []})[0] is None
+
+
+def test_request_en_curso_conserva_sus_validadores(catalogo):
+    in_flight = request_validation.REQUEST_FAST_VALIDATORS
+    catalogo["PAGTC"] = {**catalogo["PAGTC"], "required_fields": ["valor"]}
+
+    set_nemonic_config(catalogo)
+
+    body = {"refService": "PAGTC", "data": {"valor": "1"}, "addresses": []}
+    assert request_validation.select_validator(body, in_flight)(body) is False
+    assert request_validation.select_validator(body, request_validation.REQUEST_FAST_VALIDATORS)(body) is True
+
+
+def test_recarga_desde_s3_respeta_ttl_y_etag(catalogo, monkeypatch):
+    now = [100.0]
+    s3 = FakeS3(catalogo)
+    use_s3(monkeypatch, s3, now)
+    settings = {"s3_key": "nemonic_config.json", "ttl_seconds": 60}
+
+    assert refresh_nemonic_catalog(settings, "bucket") is False
+    assert refresh_nemonic_catalog(settings, "bucket") is False
+    assert len(s3.calls) == 1
+
+    s3.put({**catalogo, "CONIN": CONIN})
+    now[0] += 30
+    assert refresh_nemonic_catalog(settings, "bucket") is False
+    now[0] += 31
+    assert refresh_nemonic_catalog(settings, "bucket") is True
+    assert s3.calls[-1]["IfNoneMatch"] is not None
+    assert "CONIN" in request_validation.NEMONIC_CONFIG
+
+    now[0] += 61
+    assert refresh_nemonic_catalog(settings, "bucket") is False
+    assert len(s3.calls) == 3
+
+
+def test_catalogo_invalido_o_error_de_s3_mantiene_el_actual(catalogo, monkeypatch):
+    now = [100.0]
+    s3 = FakeS3({"CONIN": {"required_fields": "valor"}})
+    use_s3(monkeypatch, s3, now)
+    settings = {"s3_key": "nemonic_config.json", "ttl_seconds": 60}
+
+    assert refresh_nemonic_catalog(settings, "bucket") is False
+    assert request_validation.NEMONIC_CONFIG == catalogo
+
+    s3.put("{no es json")
+    now[0] += 61
+    assert refresh_nemonic_catalog(settings, "bucket") is False
+
+    s3.error = botocore.exceptions.EndpointConnectionError(endpoint_url="https://s3")
+    now[0] += 61
+    assert refresh_nemonic_catalog(settings, "bucket") is False
+    assert request_validation.NEMONIC_CONFIG == catalogo
+
+
+def test_sin_s3_key_se_usa_el_catalogo_del_paquete(catalogo):
+    assert refresh_nemonic_catalog({}, "bucket") is False
+    assert refresh_nemonic_catalog(None, "bucket") is False
+    assert request_validation.NEMONIC_CONFIG == catalogo
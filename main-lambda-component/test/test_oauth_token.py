@@ -0,0 +1,89 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.oauth_token import OAuthTokenCache
+
+
+class FakeTokenEndpoint:
+    """
+    Endpoint OAuth en memoria que entrega tokens numerados
+    """
+
+    def __init__(self, expires_in: float = 3600, delay: float = 0):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return {"access_token": f"token-{self.calls}", "expires_in": self.expires_in}
+
+
+def test_token_reutilizado_hasta_expirar():
+    endpoint = FakeTokenEndpoint()
+    cache = OAuthTokenCache(refresh_margin_seconds=60)
+
+    assert cache.get("latinia", endpoint) == "token-1"
+    assert cache.get("latinia", endpoint) == "token-1"
+    assert endpoint.calls == 1
+
+
+def test_token_renovado_dentro_del_margen():
+    endpoint = FakeTokenEndpoint(expires_in=0.2)
+    cache = OAuthTokenCache(refresh_margin_seconds=0.1)
+
+    assert cache.get("latinia", endpoint) == "token-1"
+    time.sleep(0.25)
+    assert cache.get("latinia", endpoint) == "token-2"
+
+
+def test_invalidacion_por_401():
+    endpoint = FakeTokenEndpoint()
+    cache = OAuthTokenCache()
+
+    token = cache.get("latinia", endpoint)
+    cache.invalidate("latinia", access_token=token)
+
+    assert cache.get("latinia", endpoint) == "token-2"
+    cache.invalidate("latinia", access_token=token)
+    assert cache.get("latinia", endpoint) == "token-2"
+
+
+def test_single_flight_bajo_concurrencia():
+    endpoint = FakeTokenEndpoint(delay=0.05)
+    cache = OAuthTokenCache()
+    tokens = []
+
+    threads = [threading.Thread(target=lambda: tokens.append(cache.get("latinia", endpoint))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tokens == ["token-1"] * 10
+    assert endpoint.calls == 1
+
+
+def test_force_refresh_concurrente_solicita_un_token():
+    endpoint = FakeTokenEndpoint(delay=0.05)
+    cache = OAuthTokenCache()
+    cache.get("latinia", endpoint)
+    barrier = threading.Barrier(5)
+    tokens = []
+
+    def refresh():
+        barrier.wait()
+        tokens.append(cache.get("latinia", endpoint, force_refresh=True))
+
+    threads = [threading.Thread(target=refresh) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tokens == ["token-2"] * 5
+    assert endpoint.calls == 2
@@ -0,0 +1,119 @@
+import os
+import sys
+
+import pymysql
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import utils
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def callproc(self, name):
+        self.connection.calls.append(name)
+
+    def fetchall(self):
+        # Sin autocommit la primera lectura abre un snapshot que ya no cambia
+        if self.connection.autocommit:
+            return list(DATABASE)
+        if self.connection.snapshot is None:
+            self.connection.snapshot = list(DATABASE)
+        return self.connection.snapshot
+
+
+DATABASE = []
+
+
+class FakeConnection:
+    def __init__(self, autocommit=False):
+        self.autocommit = autocommit
+        self.snapshot = None
+        self.calls = []
+        self.pings = 0
+        self.closed = False
+        self.ping_error = None
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def ping(self, reconnect=True):
+        self.pings += 1
+        if self.ping_error:
+            raise self.ping_error
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    created = []
+
+    def fake_connect(autocommit=False, **kwargs):
+        created.append(FakeConnection(autocommit))
+        return created[-1]
+
+    DATABASE[:] = [
+        {"pa_nombre": "NotiEmpresa", "pa_valor": "BOLIVARIANO"},
+        {"pa_nombre": "NotiRefMessageLabel", "pa_valor": "Avisos24"},
+    ]
+    monkeypatch.setattr(pymysql, "connect", fake_connect)
+    utils.invalidate_params_noti_cache()
+    utils.close_db_connection()
+    yield created
+    utils.invalidate_params_noti_cache()
+    utils.close_db_connection()
+
+
+def test_parametros_en_cache(connections):
+    first = utils.get_params_noti_as_dict("user", "pass", "host", 3306, "db")
+    second = utils.get_params_noti_as_dict("user", "pass", "host", 3306, "db")
+
+    assert first == second == {"NotiEmpresa": "BOLIVARIANO", "NotiRefMessageLabel": "Avisos24"}
+    assert len(connections) == 1
+    assert connections[0].calls == ["pa_tcr_obtener_param_noti"]
+
+
+def test_invalidacion_reutiliza_conexion(connections):
+    utils.get_params_noti_as_dict("user", "pass", "host", 3306, "db")
+    utils.invalidate_params_noti_cache()
+    utils.get_params_noti_as_dict("user", "pass", "host", 3306, "db")
+
+    assert len(connections) == 1
+    assert connections[0].pings == 1
+    assert len(connections[0].calls) == 2
+
+
+def test_reconexion_si_ping_falla(connections):
+    utils.get_params_noti_as_dict("user", "pass", "host", 3306, "db")
+    connections[0].ping_error = pymysql.err.OperationalError(2006, "MySQL server has gone away")
+    utils.invalidate_params_noti_cache()
+
+    utils.get_params_noti_as_dict("user", "pass", "host", 3306, "db")
+
+    assert len(connections) == 2
+    assert connections[0].closed is True
+
+
+def test_lectura_vigente_al_vencer_ttl(connections, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(utils.time, "monotonic", lambda: now[0])
+    utils.get_params_noti_as_dict("user", "pass", "host", 3306, "db")
+
+    DATABASE[0] = {"pa_nombre": "NotiEmpresa", "pa_valor": "BOLIVARIANO S.A."}
+    now[0] += utils.PARAMS_CACHE_TTL_SECONDS + 1
+    params = utils.get_params_noti_as_dict("user", "pass", "host", 3306, "db")
+
+    assert len(connections) == 1
+    assert connections[0].autocommit is True
+    assert params["NotiEmpresa"] == "BOLIVARIANO S.A."
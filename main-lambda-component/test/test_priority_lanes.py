@@ -0,0 +1,88 @@
+import json
+import os
+import sys
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import lambda_function
+from conftest import valid_request
+from request_validation import NEMONIC_CONFIG, PRIORITY_HIGH, PRIORITY_LOW, get_nemonic_priority
+
+
+def request_for(nemonic):
+    request = valid_request()
+    request["refService"] = nemonic
+    request["data"] = {field: "valor" for field in NEMONIC_CONFIG[nemonic]["required_fields"]}
+    return request
+
+
+class FakeLaneSQS:
+    """
+    Colas SQS en memoria: registra la URL de cada mensaje enviado
+    """
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, QueueUrl, **kwargs):
+        self.sent.append(QueueUrl)
+        return {"MessageId": f"msg-{len(self.sent)}"}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.sent.extend([QueueUrl] * len(Entries))
+        return {"Successful": [{"Id": entry["Id"], "MessageId": f"msg-{entry['Id']}"} for entry in Entries], "Failed": []}
+
+
+def lane_config():
+    return {
+        "queue_url": "url-baja",
+        "lanes": {
+            "low": {"queue_url": "url-baja", "weight": 1},
+            "high": {"queue_url": "url-alta", "weight": 2},
+        },
+    }
+
+
+def test_prioridad_por_nemonico():
+    assert get_nemonic_priority("BQTCT") == PRIORITY_HIGH
+    assert get_nemonic_priority("ERRTC") == PRIORITY_HIGH
+    assert get_nemonic_priority("PAGTC") == PRIORITY_LOW
+    assert get_nemonic_priority("NOEXISTE") == PRIORITY_LOW
+    assert get_nemonic_priority(None) == PRIORITY_LOW
+
+
+def test_cola_por_prioridad_y_respaldo_sin_carriles():
+    config = {"sqs": lane_config()}
+
+    assert lambda_function.get_queue_url(config, "LIMCA") == "url-alta"
+    assert lambda_function.get_queue_url(config, "PAGTC") == "url-baja"
+    assert lambda_function.get_queue_url({"sqs": {"queue_url": "url-unica"}}, "LIMCA") == "url-unica"
+
+
+def test_notificacion_urgente_se_encola_en_carril_alto(entorno, monkeypatch):
+    entorno["config"]["latinia"]["mantenimiento"] = True
+    entorno["config"]["sqs"].update(lane_config())
+    sqs = FakeLaneSQS()
+    monkeypatch.setattr(lambda_function, "get_client", lambda service_name: sqs)
+
+    for nemonic in ("BQTCT", "PAGTC"):
+        response = lambda_function.lambda_handler({"body": json.dumps(request_for(nemonic))}, None)
+        assert json.loads(response["body"])["codigoError"] == 10
+
+    assert sqs.sent == ["url-alta", "url-baja"]
+
+
+def test_lote_se_reparte_por_carril(entorno, monkeypatch):
+    entorno["config"]["latinia"]["mantenimiento"] = True
+    entorno["config"]["sqs"].update(lane_config())
+    sqs = FakeLaneSQS()
+    monkeypatch.setattr(lambda_function, "get_client", lambda service_name: sqs)
+    requests_ = [request_for("PAGTC"), request_for("ERRTC"), request_for("PAGTC"), request_for("LIMCA")]
+
+    response = lambda_function.lambda_handler({"body": json.dumps(requests_)}, None)
+    body = json.loads(response["body"])
+
+    assert response["statusCode"] == 200
+    assert [result["index"] for result in body["results"]] == [0, 1, 2, 3]
+    assert {result["codigoError"] for result in body["results"]} == {10}
+    assert sorted(sqs.sent) == ["url-alta", "url-alta", "url-baja", "url-baja"]
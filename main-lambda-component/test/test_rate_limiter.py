@@ -0,0 +1,231 @@
+import json
+import os
+import sys
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import lambda_function
+from conftest import FakeClock, load_sqs_handler, valid_request
+from utils import utils
+from utils.deadline import LatencyBudget
+from utils.rate_limiter import DynamoDBBucketStore, MemoryBucketStore, TokenBucket, build_rate_limiter
+
+
+class FakeDynamoDB:
+    """
+    Tabla de DynamoDB en memoria con escrituras condicionales sobre la version
+    """
+
+    def __init__(self, conflicts=0):
+        self.items = {}
+        self.conflicts = conflicts
+        self.puts = 0
+
+    def get_item(self, TableName, Key, ConsistentRead):
+        item = self.items.get(Key["name"]["S"])
+        return {"Item": item} if item else {}
+
+    def put_item(self, TableName, Item, ConditionExpression, **kwargs):
+        self.puts += 1
+        if self.conflicts:
+            self.conflicts -= 1
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem")
+        self.items[Item["name"]["S"]] = Item
+
+
+class FailingStore:
+    def update(self, *args, **kwargs):
+        raise EndpointConnectionError(endpoint_url="https://dynamodb")
+
+
+def test_burst_y_recarga():
+    clock = FakeClock(1000.0)
+    bucket = TokenBucket("latinia", rate_per_second=2, burst=3, clock=clock)
+
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    clock.now += 0.5
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    clock.now += 10
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+
+def test_lease_reduce_consultas_al_almacen():
+    clock = FakeClock(1000.0)
+    dynamodb = FakeDynamoDB()
+    bucket = TokenBucket("latinia", rate_per_second=10, burst=10, store=DynamoDBBucketStore("tabla", client=dynamodb), lease_size=5, clock=clock)
+
+    assert all(bucket.try_acquire() for _ in range(10))
+    assert not bucket.try_acquire()
+    assert dynamodb.puts == 3
+    assert float(dynamodb.items["latinia"]["tokens"]["N"]) == 0
+
+
+def test_estado_compartido_entre_contenedores():
+    clock = FakeClock(1000.0)
+    dynamodb = FakeDynamoDB()
+    first = TokenBucket("latinia", rate_per_second=1, burst=2, store=DynamoDBBucketStore("tabla", client=dynamodb), clock=clock)
+    second = TokenBucket("latinia", rate_per_second=1, burst=2, store=DynamoDBBucketStore("tabla", client=dynamodb), clock=clock)
+
+    assert first.try_acquire()
+    assert second.try_acquire()
+    assert not first.try_acquire()
+    assert not second.try_acquire()
+
+
+def test_conflicto_de_version_se_reintenta():
+    dynamodb = FakeDynamoDB(conflicts=2)
+    bucket = TokenBucket("latinia", rate_per_second=1, burst=1, store=DynamoDBBucketStore("tabla", client=dynamodb), clock=FakeClock(1000.0))
+
+    assert bucket.try_acquire()
+    assert dynamodb.puts == 3
+
+
+def test_almacen_caido_usa_bucket_local():
+    bucket = TokenBucket("latinia", rate_per_second=100, burst=2, store=FailingStore(), fallback_rate_per_second=1, clock=FakeClock(1000.0))
+
+    assert [bucket.try_acquire() for _ in range(3)] == [True, True, False]
+
+
+def test_acquire_espera_hasta_el_limite():
+    clock = FakeClock(1000.0)
+    bucket = TokenBucket("latinia", rate_per_second=2, burst=1, clock=clock)
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock.now += seconds
+
+    assert bucket.acquire(1, sleep=sleep)
+    assert bucket.acquire(1, sleep=sleep)
+    assert sleeps == [0.5]
+    assert not bucket.acquire(0, sleep=sleep)
+
+
+def test_configuracion():
+    assert build_rate_limiter("latinia", None) is None
+    assert build_rate_limiter("latinia", {"enabled": False, "rate_per_second": 5}) is None
+    limiter = build_rate_limiter("latinia", {"enabled": True, "rate_per_second": 5, "store": "memory"})
+    assert limiter.rate == 5 and limiter.burst == 5
+    assert isinstance(limiter.store, MemoryBucketStore)
+    with pytest.raises(ValueError):
+        build_rate_limiter("latinia", {"enabled": True, "store": "redis"})
+
+
+class BrokenStore:
+    def update(self, *args, **kwargs):
+        raise ValueError("error de programacion")
+
+
+def rate_limiter_modules(monkeypatch, dynamodb):
+    """
+    TokenBucket y DynamoDBBucketStore de utils/rate_limiter.py y de la copia
+    de sqs-handler, ambos sobre la misma tabla en memoria
+    """
+    from utils import rate_limiter
+
+    sqs_handler = load_sqs_handler()
+    monkeypatch.setattr(rate_limiter, "get_client", lambda service_name: dynamodb)
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name: dynamodb)
+    return [rate_limiter, sqs_handler]
+
+
+@pytest.mark.parametrize("implementacion", [0, 1], ids=["ingreso", "sqs-handler"])
+def test_copia_de_sqs_handler_equivale_al_limitador_compartido(monkeypatch, capsys, implementacion):
+    dynamodb = FakeDynamoDB(conflicts=2)
+    module = rate_limiter_modules(monkeypatch, dynamodb)[implementacion]
+    clock = FakeClock(1000.0)
+    bucket = module.TokenBucket("latinia", rate_per_second=1, burst=2, store=module.DynamoDBBucketStore("tabla"), clock=clock)
+
+    assert [bucket.try_acquire() for _ in range(3)] == [True, True, False]
+    assert dynamodb.puts == 5
+    rate_limited = [json.loads(line) for line in capsys.readouterr().out.splitlines() if '"RateLimited"' in line]
+    assert [(document["RateLimited"], document["Limiter"]) for document in rate_limited] == [(1, "latinia")]
+
+    caido = module.TokenBucket("latinia", rate_per_second=100, burst=2, store=FailingStore(), fallback_rate_per_second=1, clock=clock)
+    assert [caido.try_acquire() for _ in range(3)] == [True, True, False]
+
+    roto = module.TokenBucket("latinia", rate_per_second=1, burst=1, store=BrokenStore(), clock=clock)
+    with pytest.raises(ValueError):
+        roto.try_acquire()
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+
+def test_reintentos_consumen_tokens(monkeypatch):
+    monkeypatch.setattr(utils.time, "sleep", lambda seconds: None)
+    responses = [FakeResponse(503), FakeResponse(503), FakeResponse(200)]
+    calls = []
+
+    class Session:
+        def post(self, url, timeout, **kwargs):
+            calls.append(url)
+            return responses.pop(0)
+
+    limiter = TokenBucket("latinia", rate_per_second=1, burst=1, clock=FakeClock(1000.0))
+    budget = LatencyBudget(10000, safety_margin_ms=0, fallback_reserve_ms=0)
+
+    response = utils.post_with_budget(Session(), "http://latinia", budget, 5, reintentos=3, backoff_factor=0.1, rate_limiter=limiter)
+
+    assert response.status_code == 503
+    assert len(calls) == 2
+
+
+def test_ingreso_sin_tokens_envia_a_la_cola(entorno):
+    entorno["config"]["latinia"]["rate_limit"] = {"enabled": True, "rate_per_second": 0.001, "burst": 1, "store": "memory"}
+    lambda_function._rate_limiters.clear()
+    entorno["sqs"].messages = []
+    entorno["sqs"].send_message = lambda QueueUrl, **kwargs: entorno["sqs"].messages.append(kwargs) or {"MessageId": "m-1"}
+
+    first = lambda_function.lambda_handler({"body": json.dumps(valid_request())}, None)
+    second = lambda_function.lambda_handler({"body": json.dumps(valid_request())}, None)
+    lambda_function._rate_limiters.clear()
+
+    assert json.loads(first["body"])["codigoError"] == 0
+    assert second["statusCode"] == 200
+    assert json.loads(second["body"])["codigoError"] == 11
+    assert len(entorno["sent"]) == 1
+    assert len(entorno["sqs"].messages) == 1
+
+
+def test_circuito_abierto_no_consume_tokens(entorno, monkeypatch):
+    entorno["config"]["latinia"]["rate_limit"] = {"enabled": True, "rate_per_second": 0.001, "burst": 1, "store": "memory"}
+    lambda_function._rate_limiters.clear()
+    entorno["sqs"].send_message = lambda QueueUrl, **kwargs: {"MessageId": "m-1"}
+
+    class OpenCircuit:
+        state = "open"
+
+        def allow_request(self):
+            return False
+
+    with monkeypatch.context() as patch:
+        patch.setattr(lambda_function, "get_circuit_breaker", lambda config_file: OpenCircuit())
+        queued = lambda_function.lambda_handler({"body": json.dumps(valid_request())}, None)
+    sent = lambda_function.lambda_handler({"body": json.dumps(valid_request())}, None)
+    lambda_function._rate_limiters.clear()
+
+    assert json.loads(queued["body"])["codigoError"] == 10
+    # El token no se gasto mientras el circuito estaba abierto
+    assert json.loads(sent["body"])["codigoError"] == 0
+    assert len(entorno["sent"]) == 1
+
+
+def test_lote_sin_tokens_encola_el_resto(entorno):
+    entorno["config"]["latinia"]["rate_limit"] = {"enabled": True, "rate_per_second": 0.001, "burst": 2, "store": "memory"}
+    lambda_function._rate_limiters.clear()
+
+    response = lambda_function.lambda_handler({"body": json.dumps([valid_request()] * 5)}, None)
+    lambda_function._rate_limiters.clear()
+    body = json.loads(response["body"])
+
+    assert [result["codigoError"] for result in body["results"]] == [0, 0, 10, 10, 10]
+    assert len(entorno["sent"]) == 2
+    assert len(entorno["sqs"].batches[0]) == 3
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import request_validation
+from conftest import load_json_file
+from request_validation import NEMONIC_CONFIG, validate_request
+
+
+def reference_validate(body):
+    """
+    Resultado esperado evaluando siempre el esquema completo (allOf con todos los nemonicos)
+    """
+    original = request_validation.get_request_validators()
+    original_fast = request_validation.REQUEST_FAST_VALIDATORS
+    full = original["all"]
+    request_validation.REQUEST_VALIDATORS = {"all": full, "base": full, "nemonics": {}}
+    request_validation.REQUEST_FAST_VALIDATORS = None
+    try:
+        return validate_request(body)
+    finally:
+        request_validation.REQUEST_VALIDATORS = original
+        request_validation.REQUEST_FAST_VALIDATORS = original_fast
+
+
+def build_cases():
+    valid = load_json_file("valid_request.json")
+    invalid = load_json_file("invalid_request.json")
+    cases = [valid, invalid, [], "texto", {}, {"data": {}, "addresses": []}]
+    for nemonic, config in NEMONIC_CONFIG.items():
+        full_data = {field: "x" for field in config["required_fields"]}
+        cases.append({"refService": nemonic, "data": full_data, "addresses": []})
+        cases.append({"refService": nemonic, "data": dict(list(full_data.items())[:1]), "addresses": []})
+        cases.append({**valid, "refService": nemonic})
+    cases.append({"refService": "NOEXISTE", "data": {}, "addresses": []})
+    cases.append({"refService": 10, "data": {}, "addresses": []})
+    cases.append({"refService": "TCACT", "data": {"valor": 10}, "addresses": [{"className": 1}]})
+    cases.append({"refService": "TCACT", "cod_ente": -1, "channels": 5, "data": [], "addresses": {}})
+    return cases
+
+
+@pytest.mark.parametrize("body", build_cases())
+def test_paridad_con_esquema_completo(body):
+    assert validate_request(body) == reference_validate(body)
+
+
+def test_validadores_por_nemonico():
+    validators = request_validation.get_request_validators()
+    assert set(validators["nemonics"]) == {
+        nemonic for nemonic, config in NEMONIC_CONFIG.items() if config.get("required_fields")
+    }
+    assert request_validation.select_validator({"refService": "PAGTC"}, validators) is validators["nemonics"]["PAGTC"]
+    assert request_validation.select_validator({"refService": "NOEXISTE"}, validators) is validators["base"]
+    assert request_validation.select_validator({"data": {}}, validators) is validators["all"]
+
+
+def test_catalogo_vacio():
+    validators = request_validation.build_request_validators({})
+    assert validators["nemonics"] == {}
+    assert list(validators["all"].iter_errors({"data": {}, "addresses": []})) == []
@@ -0,0 +1,70 @@
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.secret_cache import SecretCache
+
+
+class FakeSecretsManager:
+    """
+    Cliente de secretsmanager en memoria que cuenta las llamadas
+    """
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.calls = 0
+        self.version = 1
+
+    def get_secret_value(self, SecretId):
+        self.calls += 1
+        time.sleep(self.delay)
+        return {"SecretString": json.dumps({"name": SecretId, "version": self.version})}
+
+
+def test_secreto_en_cache_dentro_del_ttl():
+    client = FakeSecretsManager()
+    cache = SecretCache(default_ttl=60, client=client, region_name="us-east-1")
+
+    assert cache.get("db") == cache.get("db")
+    assert client.calls == 1
+
+
+def test_ttl_por_secreto():
+    client = FakeSecretsManager()
+    cache = SecretCache(default_ttl=60, client=client, region_name="us-east-1")
+    cache.set_ttl("oauth", 0)
+
+    cache.get("oauth")
+    cache.get("oauth")
+    cache.get("db")
+    cache.get("db")
+
+    assert client.calls == 3
+
+
+def test_force_refresh_lee_nueva_version():
+    client = FakeSecretsManager()
+    cache = SecretCache(default_ttl=60, client=client, region_name="us-east-1")
+
+    assert cache.get("db")["version"] == 1
+    client.version = 2
+    assert cache.get("db")["version"] == 1
+    assert cache.get("db", force_refresh=True)["version"] == 2
+
+
+def test_single_flight_bajo_concurrencia():
+    client = FakeSecretsManager(delay=0.05)
+    cache = SecretCache(default_ttl=60, client=client, region_name="us-east-1")
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get("db"))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 10
+    assert client.calls == 1
@@ -0,0 +1,28 @@
+import threading
+from typing import Any, Dict
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(service_name: str):
+    """
+    Cliente de boto3 creado en el primer uso y reutilizado entre invocaciones.
+
+    boto3 se importa y el cliente se construye solo cuando una ruta lo
+    necesita (por ejemplo sqs solo cuando se encola), en lugar de hacerlo al
+    importar el modulo de la Lambda.
+
+    Args:
+        service_name (str): Servicio de AWS (s3, sqs, dynamodb, ...)
+    """
+    client = _clients.get(service_name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(service_name)
+            if client is None:
+                import boto3
+
+                client = boto3.client(service_name)
+                _clients[service_name] = client
+    return client
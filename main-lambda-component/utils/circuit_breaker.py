@@ -0,0 +1,356 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from utils.aws_clients import get_client
+from utils.metrics import put_metric
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_OPEN_SECONDS = 30
+DEFAULT_PROBE_TIMEOUT_SECONDS = 15
+DEFAULT_REFRESH_SECONDS = 1
+DEFAULT_SQLITE_PATH = os.path.join(os.getenv("TMPDIR", "/tmp"), "circuit_breaker.db")
+DEFAULT_STORE = "dynamodb"
+DEFAULT_TABLE_NAME = os.getenv("CIRCUIT_BREAKER_TABLE_NAME") or "bb-notificaciones-circuit-breaker"
+LOCAL_STORES = ("memory", "sqlite")
+
+
+def initial_state() -> dict:
+    return {"state": CLOSED, "failures": 0, "opened_at": 0.0, "probe_until": 0.0, "version": 0}
+
+
+class MemoryStore:
+    """
+    Almacen en memoria del proceso. Solo sirve para un contenedor y para pruebas.
+    """
+
+    def __init__(self):
+        self._states: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[dict]:
+        state = self._states.get(name)
+        return dict(state) if state else None
+
+    def update(self, name: str, mutate: Callable[[dict], Optional[dict]]) -> dict:
+        with self._lock:
+            current = self._states.get(name) or initial_state()
+            new_state = mutate(dict(current))
+            if new_state is None:
+                return dict(current)
+            new_state["version"] = current["version"] + 1
+            self._states[name] = new_state
+            return dict(new_state)
+
+
+class SQLiteStore:
+    """
+    Almacen en un archivo SQLite local. Comparte el estado entre procesos que
+    ven el mismo archivo (pruebas locales o un volumen compartido).
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        self.path = path
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS circuit_breaker (name TEXT PRIMARY KEY, state TEXT NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def get(self, name: str) -> Optional[dict]:
+        with self._connect() as connection:
+            row = connection.execute("SELECT state FROM circuit_breaker WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, name: str, mutate: Callable[[dict], Optional[dict]]) -> dict:
+        connection = self._connect()
+        try:
+            # BEGIN IMMEDIATE toma el bloqueo de escritura antes de leer
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute("SELECT state FROM circuit_breaker WHERE name = ?", (name,)).fetchone()
+            current = json.loads(row[0]) if row else initial_state()
+            new_state = mutate(dict(current))
+            if new_state is None:
+                connection.execute("COMMIT")
+                return current
+            new_state["version"] = current["version"] + 1
+            connection.execute(
+                "INSERT OR REPLACE INTO circuit_breaker (name, state) VALUES (?, ?)",
+                (name, json.dumps(new_state)),
+            )
+            connection.execute("COMMIT")
+            return new_state
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+
+class DynamoDBStore:
+    """
+    Almacen en una tabla de DynamoDB (llave de particion "name"), compartido
+    por todos los contenedores. Las escrituras usan una condicion sobre la
+    version para no pisar cambios concurrentes.
+    """
+
+    def __init__(self, table_name: str, client=None, max_attempts: int = 3):
+        self.table_name = table_name
+        self._client = client
+        self.max_attempts = max_attempts
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client("dynamodb")
+        return self._client
+
+    def get(self, name: str) -> Optional[dict]:
+        response = self.client.get_item(
+            TableName=self.table_name, Key={"name": {"S": name}}, ConsistentRead=True
+        )
+        item = response.get("Item")
+        if not item:
+            return None
+        return {
+            "state": item["state"]["S"],
+            "failures": int(item["failures"]["N"]),
+            "opened_at": float(item["opened_at"]["N"]),
+            "probe_until": float(item["probe_until"]["N"]),
+            "version": int(item["version"]["N"]),
+        }
+
+    def update(self, name: str, mutate: Callable[[dict], Optional[dict]]) -> dict:
+        from botocore.exceptions import ClientError
+
+        for attempt in range(self.max_attempts):
+            stored = self.get(name)
+            current = stored or initial_state()
+            new_state = mutate(dict(current))
+            if new_state is None:
+                return current
+            new_state["version"] = current["version"] + 1
+            condition = {"ConditionExpression": "attribute_not_exists(#n)", "ExpressionAttributeNames": {"#n": "name"}}
+            if stored is not None:
+                condition = {
+                    "ConditionExpression": "version = :version",
+                    "ExpressionAttributeValues": {":version": {"N": str(current["version"])}},
+                }
+            try:
+                self.client.put_item(
+                    TableName=self.table_name,
+                    Item={
+                        "name": {"S": name},
+                        "state": {"S": new_state["state"]},
+                        "failures": {"N": str(new_state["failures"])},
+                        "opened_at": {"N": repr(float(new_state["opened_at"]))},
+                        "probe_until": {"N": repr(float(new_state["probe_until"]))},
+                        "version": {"N": str(new_state["version"])},
+                    },
+                    **condition,
+                )
+                return new_state
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+        # Otro contenedor gano todas las carreras: se devuelve el estado vigente
+        return self.get(name) or initial_state()
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker con estados cerrado, abierto y semiabierto.
+
+    - Cerrado: las solicitudes pasan. Tras failure_threshold fallos
+      consecutivos se abre.
+    - Abierto: las solicitudes no pasan hasta que transcurre open_seconds.
+    - Semiabierto: un solo contenedor obtiene el permiso de prueba (por
+      probe_timeout_seconds). Si la prueba responde se cierra; si falla se
+      vuelve a abrir.
+
+    El estado vive en un almacen intercambiable para compartirlo entre
+    contenedores. La lectura se reutiliza durante refresh_seconds para no
+    consultar el almacen en cada invocacion. Si el almacen falla se continua
+    con el ultimo estado conocido en memoria y se publica la metrica
+    CircuitBreakerStoreFallback.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        store=None,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        open_seconds: float = DEFAULT_OPEN_SECONDS,
+        probe_timeout_seconds: float = DEFAULT_PROBE_TIMEOUT_SECONDS,
+        refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+    ):
+        self.name = name
+        self.store = store or MemoryStore()
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.open_seconds = float(open_seconds)
+        self.probe_timeout_seconds = float(probe_timeout_seconds)
+        self.refresh_seconds = float(refresh_seconds)
+        self._state = initial_state()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self._current()["state"]
+
+    def allow_request(self) -> bool:
+        """
+        Indica si la solicitud puede enviarse al servicio protegido.
+        En estado semiabierto solo el llamador que obtiene la prueba recibe True.
+        """
+        state = self._current()
+        now = time.time()
+        if state["state"] == CLOSED:
+            return True
+        if state["state"] == OPEN and now - state["opened_at"] < self.open_seconds:
+            return False
+        if state["state"] == HALF_OPEN and now < state["probe_until"]:
+            return False
+
+        claimed = {}
+
+        def claim_probe(current):
+            if current["state"] == CLOSED:
+                return None
+            if current["state"] == OPEN and now - current["opened_at"] < self.open_seconds:
+                return None
+            if current["state"] == HALF_OPEN and now < current["probe_until"]:
+                return None
+            claimed["probe"] = True
+            current.update(state=HALF_OPEN, probe_until=now + self.probe_timeout_seconds)
+            return current
+
+        new_state = self._update(claim_probe)
+        if claimed:
+            self._transition(state["state"], HALF_OPEN)
+            return True
+        return new_state["state"] == CLOSED
+
+    def record_success(self):
+        """
+        Registra una respuesta correcta. Cierra el circuito si estaba semiabierto.
+        """
+        state = self._current()
+        if state["state"] == CLOSED and state["failures"] == 0:
+            return
+
+        def close(current):
+            if current["state"] == CLOSED and current["failures"] == 0:
+                return None
+            current.update(state=CLOSED, failures=0, opened_at=0.0, probe_until=0.0)
+            return current
+
+        self._update(close)
+        if state["state"] != CLOSED:
+            self._transition(state["state"], CLOSED)
+
+    def record_failure(self):
+        """
+        Registra un fallo. Abre el circuito al llegar al umbral o si fallo la prueba.
+        """
+        now = time.time()
+        previous = {}
+
+        def fail(current):
+            previous["state"] = current["state"]
+            if current["state"] == OPEN:
+                return None
+            failures = current["failures"] + 1
+            if current["state"] == HALF_OPEN or failures >= self.failure_threshold:
+                current.update(state=OPEN, failures=failures, opened_at=now, probe_until=0.0)
+            else:
+                current.update(failures=failures)
+            return current
+
+        new_state = self._update(fail)
+        if new_state["state"] == OPEN and previous.get("state") != OPEN:
+            self._transition(previous.get("state", CLOSED), OPEN)
+
+    def _current(self) -> dict:
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < self.refresh_seconds:
+            return self._state
+        try:
+            state = self.store.get(self.name) or initial_state()
+        except (ClientError, BotoCoreError, sqlite3.Error) as e:
+            self._store_fallback("leer", e)
+            return self._state
+        with self._lock:
+            self._state = state
+            self._loaded_at = now
+        return state
+
+    def _update(self, mutate: Callable[[dict], Optional[dict]]) -> dict:
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        try:
+            state = self.store.update(self.name, mutate)
+        except (ClientError, BotoCoreError, sqlite3.Error) as e:
+            self._store_fallback("guardar", e)
+            with self._lock:
+                state = mutate(dict(self._state)) or self._state
+        with self._lock:
+            self._state = state
+            self._loaded_at = time.monotonic()
+        return state
+
+    def _store_fallback(self, action: str, error: Exception):
+        print(f"ADVERTENCIA: no se pudo {action} el estado del circuit breaker {self.name}, se usa el estado local del contenedor: {error}")
+        put_metric("CircuitBreakerStoreFallback", 1, "Count", {"Circuit": self.name})
+
+    def _transition(self, old: str, new: str):
+        print(f"Circuit breaker {self.name}: {old} -> {new}")
+        put_metric("CircuitBreakerTransition", 1, "Count", {"Circuit": self.name, "State": new})
+
+
+def build_store(settings: dict):
+    """
+    Crea el almacen del circuit breaker segun la configuracion. Por defecto
+    es la tabla compartida de DynamoDB; sqlite y memory guardan el estado
+    por contenedor y solo deben usarse en pruebas locales.
+
+    Args:
+        settings (dict): seccion circuit_breaker del archivo de configuracion
+            (store: dynamodb | sqlite | memory, table_name, path)
+    """
+    store = (settings.get("store") or DEFAULT_STORE).lower()
+    if store == "dynamodb":
+        return DynamoDBStore(settings.get("table_name") or DEFAULT_TABLE_NAME)
+    if store in LOCAL_STORES:
+        print(f"ADVERTENCIA: el circuit breaker usa el almacen local {store}; su estado no se comparte entre contenedores")
+    if store == "memory":
+        return MemoryStore()
+    if store == "sqlite":
+        return SQLiteStore(settings.get("path") or DEFAULT_SQLITE_PATH)
+    raise ValueError(f"Almacen de circuit breaker no soportado: {store}")
+
+
+def build_circuit_breaker(name: str, settings: dict) -> CircuitBreaker:
+    """
+    Crea un circuit breaker a partir de la seccion circuit_breaker del YAML
+    """
+    settings = settings or {}
+    return CircuitBreaker(
+        name,
+        store=build_store(settings),
+        failure_threshold=int(settings.get("failure_threshold", DEFAULT_FAILURE_THRESHOLD)),
+        open_seconds=float(settings.get("open_seconds", DEFAULT_OPEN_SECONDS)),
+        probe_timeout_seconds=float(settings.get("probe_timeout_seconds", DEFAULT_PROBE_TIMEOUT_SECONDS)),
+        refresh_seconds=float(settings.get("refresh_seconds", DEFAULT_REFRESH_SECONDS)),
+    )
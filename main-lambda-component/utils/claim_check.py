@@ -0,0 +1,89 @@
+import gzip
+from urllib.parse import urlparse
+
+from utils import json_codec
+from utils.aws_clients import get_client
+
+CLAIM_CHECK_ENCODING = "gzip"
+CLAIM_CHECK_ATTRIBUTE = "ClaimCheck"
+# Una solicitud de SQS se factura por cada bloque de 64 KB
+DEFAULT_THRESHOLD_BYTES = 64 * 1024
+DEFAULT_PREFIX = "claim-check/"
+DEFAULT_COMPRESSION_LEVEL = 6
+SQS_MAX_MESSAGE_BYTES = 256 * 1024
+
+_settings = {"enabled": False}
+
+
+def configure_claim_check(settings: dict, default_bucket: str = None):
+    """
+    Configura el claim-check segun la seccion opcional sqs.claim_check del YAML
+    (enabled, threshold_bytes, bucket_name, prefix, compression_level). Si no
+    se indica bucket_name se usa el bucket de configuracion.
+    """
+    settings = settings or {}
+    _settings.update(
+        enabled=bool(settings.get("enabled", False)),
+        threshold_bytes=int(settings.get("threshold_bytes", DEFAULT_THRESHOLD_BYTES)),
+        bucket_name=settings.get("bucket_name") or default_bucket,
+        prefix=settings.get("prefix", DEFAULT_PREFIX),
+        compression_level=int(settings.get("compression_level", DEFAULT_COMPRESSION_LEVEL)),
+    )
+
+
+def offload_payload(payload, message_id: str, fecha_proceso: str):
+    """
+    Guarda el payload comprimido en S3 si el claim-check esta habilitado y el
+    payload supera threshold_bytes (tipicamente por adjuntos en base64 dentro
+    de contents).
+
+    Si S3 falla y el payload cabe en un mensaje de SQS, se devuelve None para
+    encolarlo completo.
+
+    Returns:
+        dict: referencia al objeto (bucket, key, encoding, size) o None si el
+            payload viaja en el mensaje
+    """
+    if not _settings["enabled"]:
+        return None
+    data = json_codec.dumps_bytes(payload)
+    if len(data) <= _settings["threshold_bytes"]:
+        return None
+    key = f"{_settings['prefix']}{fecha_proceso[:10].replace('-', '/')}/{message_id}.json.gz"
+    compressed = gzip.compress(data, compresslevel=_settings["compression_level"])
+    try:
+        get_client("s3").put_object(
+            Bucket=_settings["bucket_name"],
+            Key=key,
+            Body=compressed,
+            ContentType="application/json",
+            ContentEncoding=CLAIM_CHECK_ENCODING,
+        )
+    except Exception as e:
+        if len(data) > SQS_MAX_MESSAGE_BYTES:
+            raise
+        print(f"No se pudo guardar el payload {message_id} en S3, se encola completo: {e}")
+        return None
+    print(f"Payload {message_id} guardado en s3://{_settings['bucket_name']}/{key} ({len(data)} -> {len(compressed)} bytes)")
+    return {"bucket": _settings["bucket_name"], "key": key, "encoding": CLAIM_CHECK_ENCODING, "size": len(data)}
+
+
+def delete_payload(message_attributes: dict):
+    """
+    Elimina de S3 el payload de un mensaje que no llego a la cola, para no
+    dejar el objeto huerfano. El sqs-handler lee y elimina los payloads de
+    los mensajes encolados. Un error al eliminar solo se registra: el envio
+    ya fallo y ese es el error que se propaga.
+
+    Args:
+        message_attributes (dict): atributos del mensaje armado con offload_payload
+    """
+    attribute = (message_attributes or {}).get(CLAIM_CHECK_ATTRIBUTE)
+    if not attribute:
+        return
+    location = urlparse(attribute["StringValue"])
+    try:
+        get_client("s3").delete_object(Bucket=location.netloc, Key=location.path.lstrip("/"))
+        print(f"Payload {attribute['StringValue']} eliminado de S3: el mensaje no se encolo")
+    except Exception as e:
+        print(f"No se pudo eliminar el payload huerfano {attribute['StringValue']}: {e}")
@@ -0,0 +1,131 @@
+import copy
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+from utils.aws_clients import get_client
+from utils.metrics import put_metric
+
+CONFIG_CACHE_TTL_SECONDS = float(os.getenv("CONFIG_CACHE_TTL_SECONDS") or 60)
+
+
+def load_yaml(text: str) -> Any:
+    """
+    yaml.safe_load, importando PyYAML en el primer uso. Un YAML invalido se
+    informa como ValueError
+    """
+    import yaml
+
+    try:
+        return yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        raise ValueError(f"YAML invalido: {e}") from e
+
+
+class ConfigCache:
+    """
+    Cache en memoria de los archivos de configuracion YAML almacenados en S3.
+    Con loader se pueden leer otros formatos (por ejemplo JSON).
+
+    Las entradas se guardan por (bucket, key) y sobreviven entre invocaciones
+    de un contenedor caliente. Al vencer el TTL se revalida con una peticion
+    condicional (IfNoneMatch + ETag); si S3 responde 304 se reutiliza la
+    configuracion en memoria. Si S3 falla y existe una version previa valida,
+    se devuelve esa version.
+    """
+
+    def __init__(
+        self,
+        s3_client=None,
+        ttl_seconds: float = CONFIG_CACHE_TTL_SECONDS,
+        loader: Callable[[str], Any] = None,
+        metric_name: str = "ConfigLoadTime",
+    ):
+        self._s3_client = s3_client
+        self.ttl_seconds = ttl_seconds
+        self.loader = loader or load_yaml
+        self.metric_name = metric_name
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def s3_client(self):
+        # Sin cliente explicito se usa el cliente compartido, creado en el primer uso
+        return self._s3_client if self._s3_client is not None else get_client("s3")
+
+    def get(self, bucket: str, key: str) -> dict:
+        """
+        Obtiene la configuracion de S3 o del cache.
+
+        Args:
+            bucket (str): Bucket donde se encuentra la configuracion
+            key (str): Llave del archivo YAML
+
+        Returns:
+            dict: Copia de la configuracion, el llamador puede modificarla
+        """
+        start = time.perf_counter()
+        config, resultado = self._get(bucket, key)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        put_metric(self.metric_name, round(elapsed_ms, 3), "Milliseconds", {"CacheResult": resultado})
+        return copy.deepcopy(config)
+
+    def invalidate(self, bucket: str = None, key: str = None):
+        """
+        Elimina entradas del cache. Sin argumentos limpia todo el cache.
+        """
+        with self._lock:
+            if bucket is None:
+                self._entries.clear()
+            else:
+                self._entries.pop((bucket, key), None)
+
+    def _get(self, bucket: str, key: str) -> Tuple[dict, str]:
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        entry = self._entries.get((bucket, key))
+        if entry and time.monotonic() - entry["checked_at"] < self.ttl_seconds:
+            return entry["config"], "hit"
+
+        with self._lock:
+            entry = self._entries.get((bucket, key))
+            if entry and time.monotonic() - entry["checked_at"] < self.ttl_seconds:
+                return entry["config"], "hit"
+
+            request = {"Bucket": bucket, "Key": key}
+            if entry and entry.get("etag"):
+                request["IfNoneMatch"] = entry["etag"]
+            try:
+                response = self.s3_client.get_object(**request)
+                config_data = response['Body'].read().decode('utf-8')
+                config = self.loader(config_data)
+            except ClientError as e:
+                if entry and _is_not_modified(e):
+                    entry["checked_at"] = time.monotonic()
+                    return entry["config"], "not_modified"
+                return self._fallback(bucket, key, entry, e), "stale"
+            except (BotoCoreError, ValueError) as e:
+                return self._fallback(bucket, key, entry, e), "stale"
+
+            print(f"Configuracion cargada desde S3: {bucket}/{key}")
+            self._entries[(bucket, key)] = {
+                "config": config,
+                "etag": response.get("ETag"),
+                "checked_at": time.monotonic(),
+            }
+            return config, "miss"
+
+    def _fallback(self, bucket: str, key: str, entry: dict, error: Exception) -> dict:
+        if entry is None:
+            print(f"Error al cargar el archivo de configuracion {bucket}/{key}: {error}")
+            raise error
+        print(f"Error al revalidar la configuracion {bucket}/{key}, se usa la ultima version valida: {error}")
+        entry["checked_at"] = time.monotonic()
+        return entry["config"]
+
+
+def _is_not_modified(error: "ClientError") -> bool:
+    status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    code = error.response.get("Error", {}).get("Code")
+    return status == 304 or code in ("304", "NotModified")
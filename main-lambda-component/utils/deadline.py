@@ -0,0 +1,134 @@
+import logging
+import time
+from contextlib import contextmanager
+import threading
+from typing import Dict
+
+DEFAULT_SAFETY_MARGIN_MS = 300
+DEFAULT_FALLBACK_RESERVE_MS = 1500
+MIN_ATTEMPT_SECONDS = 0.2
+
+logger = logging.getLogger(__name__)
+
+
+_budget_exceeded = None
+_budget_exceeded_lock = threading.Lock()
+
+
+def budget_exceeded_error() -> type:
+    """
+    Clase de BudgetExceeded. Hereda de requests.exceptions.Timeout y se crea
+    en el primer uso para no importar requests al cargar el modulo
+    """
+    global _budget_exceeded
+    if _budget_exceeded is None:
+        with _budget_exceeded_lock:
+            if _budget_exceeded is None:
+                import requests
+
+                class BudgetExceeded(requests.exceptions.Timeout):
+                    """No queda tiempo suficiente para otro intento sin comprometer el encolado"""
+                    pass
+
+                BudgetExceeded.__module__ = __name__
+                _budget_exceeded = BudgetExceeded
+    return _budget_exceeded
+
+
+def __getattr__(name: str):
+    # from utils.deadline import BudgetExceeded
+    if name == "BudgetExceeded":
+        return budget_exceeded_error()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class LatencyBudget:
+    """
+    Presupuesto de tiempo de una invocacion, calculado a partir del tiempo
+    restante de la Lambda.
+
+    Se descuenta un margen de seguridad y se reserva tiempo para el encolado
+    de respaldo en SQS; las etapas previas (OAuth, Latinia) solo pueden usar
+    el tiempo disponible fuera de esa reserva.
+    """
+
+    def __init__(
+        self,
+        remaining_ms: float,
+        safety_margin_ms: float = DEFAULT_SAFETY_MARGIN_MS,
+        fallback_reserve_ms: float = DEFAULT_FALLBACK_RESERVE_MS,
+        clock=time.monotonic,
+    ):
+        self.clock = clock
+        self.started = clock()
+        self.deadline = self.started + (remaining_ms - safety_margin_ms) / 1000
+        self.fallback_reserve = fallback_reserve_ms / 1000
+        self.stages: Dict[str, float] = {}
+
+    @classmethod
+    def from_context(cls, context, config_file: dict):
+        """
+        Crea el presupuesto desde el contexto de la Lambda. Sin contexto (pruebas
+        locales) se usa lambda.timeout_seconds del archivo de configuracion.
+
+        Args:
+            context: contexto de la invocacion
+            config_file (dict): archivo de configuracion, seccion opcional lambda.budget
+        """
+        settings = config_file["lambda"].get("budget") or {}
+        if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+            remaining_ms = context.get_remaining_time_in_millis()
+        else:
+            remaining_ms = float(config_file["lambda"].get("timeout_seconds", 30)) * 1000
+        return cls(
+            remaining_ms,
+            safety_margin_ms=float(settings.get("safety_margin_ms", DEFAULT_SAFETY_MARGIN_MS)),
+            fallback_reserve_ms=float(settings.get("fallback_reserve_ms", DEFAULT_FALLBACK_RESERVE_MS)),
+        )
+
+    def remaining(self) -> float:
+        """Segundos restantes hasta el limite, descontado el margen de seguridad"""
+        return max(0.0, self.deadline - self.clock())
+
+    def available(self) -> float:
+        """Segundos disponibles para etapas que no son el encolado de respaldo"""
+        return max(0.0, self.remaining() - self.fallback_reserve)
+
+    def timeout(self, cap: float, minimum: float = MIN_ATTEMPT_SECONDS) -> float:
+        """
+        Timeout para el siguiente intento, limitado por el tiempo disponible.
+
+        Raises:
+            BudgetExceeded: si no queda al menos minimum segundos
+        """
+        available = self.available()
+        if available < minimum:
+            raise budget_exceeded_error()(f"Presupuesto agotado: quedan {available * 1000:.0f} ms")
+        return min(float(cap), available)
+
+    def can_retry(self, delay: float, minimum: float = MIN_ATTEMPT_SECONDS) -> bool:
+        """Indica si alcanza el tiempo para esperar delay segundos y hacer otro intento"""
+        return self.available() >= delay + minimum
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Mide el tiempo de una etapa y lo registra en el log junto al tiempo restante
+        """
+        start = self.clock()
+        try:
+            yield self
+        finally:
+            elapsed_ms = (self.clock() - start) * 1000
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed_ms
+            logger.info(
+                f"Etapa {name}: {elapsed_ms:.1f} ms. Restante {self.remaining() * 1000:.0f} ms "
+                f"(disponible {self.available() * 1000:.0f} ms)"
+            )
+
+    def summary(self) -> dict:
+        return {
+            "stages_ms": {name: round(value, 1) for name, value in self.stages.items()},
+            "elapsed_ms": round((self.clock() - self.started) * 1000, 1),
+            "remaining_ms": round(self.remaining() * 1000),
+        }
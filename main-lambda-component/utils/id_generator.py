@@ -0,0 +1,201 @@
+import datetime
+import os
+import secrets
+import threading
+import time
+from typing import Callable, Optional
+
+from utils.aws_clients import get_client
+from utils.metrics import put_metric
+
+ECUADOR_TIMEZONE = "America/Guayaquil"
+WORKER_ID_DIGITS = 5
+SEQUENCE_DIGITS = 3
+MAX_WORKER_ID = 10 ** WORKER_ID_DIGITS
+MAX_SEQUENCE = 10 ** SEQUENCE_DIGITS
+WORKER_COUNTER_NAME = "notification-id-worker"
+DEFAULT_TABLE_NAME = os.getenv("ID_WORKER_TABLE_NAME") or "bb-notificaciones-circuit-breaker"
+# Tras fallar el almacen, durante cuanto tiempo se falla sin volver a consultarlo
+WORKER_RETRY_SECONDS = 1
+
+
+def random_worker_id() -> int:
+    """
+    Identificador de worker aleatorio. Dos contenedores pueden obtener el
+    mismo, por lo que solo sirve para pruebas locales (store: random)
+    """
+    return secrets.randbelow(MAX_WORKER_ID)
+
+
+def lease_worker_id_dynamodb(table_name: str, counter_name: str = WORKER_COUNTER_NAME, client=None) -> int:
+    """
+    Obtiene un identificador de worker unico incrementando un contador atomico
+    en DynamoDB (llave de particion "name"). Se llama una vez por contenedor;
+    el contador se recorre modulo MAX_WORKER_ID, por lo que dos contenedores
+    solo comparten worker si entre ambos arrancaron MAX_WORKER_ID contenedores.
+    """
+    client = client or get_client("dynamodb")
+    response = client.update_item(
+        TableName=table_name,
+        Key={"name": {"S": counter_name}},
+        UpdateExpression="ADD #counter :one",
+        ExpressionAttributeNames={"#counter": "counter"},
+        ExpressionAttributeValues={":one": {"N": "1"}},
+        ReturnValues="UPDATED_NEW",
+    )
+    return int(response["Attributes"]["counter"]["N"]) % MAX_WORKER_ID
+
+
+def lease_default_worker_id() -> int:
+    """Worker del contador de DEFAULT_TABLE_NAME, el origen por defecto"""
+    return lease_worker_id_dynamodb(DEFAULT_TABLE_NAME)
+
+
+class NotificationIdGenerator:
+    """
+    Generador de IDs de notificacion estilo Snowflake:
+
+        canal(3) + fecha Guayaquil yyyymmddHHMMSSfff(17) + worker(5) + secuencia(3)
+
+    La secuencia es por proceso y se reinicia en cada milisegundo. Si se
+    agotan las secuencias de un milisegundo, o el reloj retrocede, se toma
+    prestado el milisegundo siguiente en lugar de esperar; asi los IDs de un
+    proceso son siempre crecientes. El worker distingue a los contenedores
+    concurrentes y se resuelve en el primer ID generado; por defecto se
+    obtiene del contador de DynamoDB. Si el proveedor falla no se genera el
+    ID (un worker inventado podria repetir IDs de otro contenedor): se emite
+    la metrica IdWorkerLeaseFailed y se propaga el error. Durante
+    WORKER_RETRY_SECONDS se falla con el mismo error sin consultar de nuevo
+    el proveedor.
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[int] = None,
+        worker_id_provider: Optional[Callable[[], int]] = None,
+        clock: Callable[[], int] = time.time_ns,
+    ):
+        self.worker_id_provider = worker_id_provider or lease_default_worker_id
+        self.clock = clock
+        self._worker = None
+        self._retry_at_ns = None
+        self._lease_error = None
+        if worker_id is not None:
+            self._set_worker(worker_id)
+        self._last_ms = -1
+        self._sequence = 0
+        self._prefix_second = None
+        self._prefix = ""
+        self._timezone = None
+        self._lock = threading.Lock()
+
+    @property
+    def worker_id(self) -> int:
+        return int(self._ensure_worker())
+
+    def _ensure_worker(self) -> str:
+        worker = self._worker
+        if worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._set_worker(self._resolve_worker())
+                worker = self._worker
+        return worker
+
+    def _resolve_worker(self) -> int:
+        if self._retry_at_ns is not None and self.clock() < self._retry_at_ns:
+            raise self._lease_error
+        try:
+            worker_id = self.worker_id_provider()
+        except Exception as e:
+            print(f"ERROR: No se pudo obtener el worker del generador de IDs, no se generan IDs hasta obtenerlo: {e}")
+            put_metric("IdWorkerLeaseFailed", 1, "Count", {"Counter": WORKER_COUNTER_NAME})
+            self._retry_at_ns = self.clock() + WORKER_RETRY_SECONDS * 1_000_000_000
+            self._lease_error = e
+            raise
+        self._retry_at_ns = None
+        self._lease_error = None
+        return worker_id
+
+    def _set_worker(self, worker_id: int):
+        if not 0 <= worker_id < MAX_WORKER_ID:
+            raise ValueError(f"El worker debe estar entre 0 y {MAX_WORKER_ID - 1}")
+        self._worker = f"{worker_id:0{WORKER_ID_DIGITS}d}"
+
+    def next_id(self, canal: str = "BMO") -> str:
+        """
+        Genera el siguiente ID para el canal indicado
+
+        Args:
+            canal (str): Canal de la notificacion, se normaliza a 3 caracteres
+        """
+        canal = (canal or "BMO").ljust(3, '0')[:3]
+        worker = self._ensure_worker()
+        now_ms = self.clock() // 1_000_000
+        with self._lock:
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            else:
+                self._sequence += 1
+                if self._sequence >= MAX_SEQUENCE:
+                    self._last_ms += 1
+                    self._sequence = 0
+            millis = self._last_ms
+            sequence = self._sequence
+            second, ms = divmod(millis, 1000)
+            if second != self._prefix_second:
+                if self._timezone is None:
+                    import pytz
+
+                    self._timezone = pytz.timezone(ECUADOR_TIMEZONE)
+                fecha = datetime.datetime.fromtimestamp(second, self._timezone)
+                self._prefix = fecha.strftime("%Y%m%d%H%M%S")
+                self._prefix_second = second
+            prefix = self._prefix
+        return f"{canal}{prefix}{ms:03d}{worker}{sequence:0{SEQUENCE_DIGITS}d}"
+
+    def reset_worker(self, worker_id_provider: Optional[Callable[[], int]] = None):
+        """
+        Cambia el proveedor del worker; se resuelve de nuevo en el siguiente ID
+        """
+        with self._lock:
+            if worker_id_provider is not None:
+                self.worker_id_provider = worker_id_provider
+            self._worker = None
+            self._retry_at_ns = None
+            self._lease_error = None
+
+
+id_generator = NotificationIdGenerator()
+_configured_settings = None
+
+
+def configure_id_generator(settings: dict):
+    """
+    Configura el origen del worker segun la seccion opcional lambda.ids del
+    YAML (store: dynamodb con table_name, o random). Por defecto es el
+    contador de DynamoDB en DEFAULT_TABLE_NAME; random no garantiza IDs
+    unicos entre contenedores. Solo tiene efecto si la configuracion cambio.
+    """
+    global _configured_settings
+    settings = settings or {}
+    if settings == _configured_settings:
+        return
+    _configured_settings = dict(settings)
+    store = (settings.get("store") or "dynamodb").lower()
+    if store == "dynamodb":
+        table_name = settings.get("table_name") or DEFAULT_TABLE_NAME
+        id_generator.reset_worker(lambda: lease_worker_id_dynamodb(table_name))
+    elif store == "random":
+        print("ADVERTENCIA: el generador de IDs usa un worker aleatorio; los IDs pueden repetirse entre contenedores")
+        id_generator.reset_worker(random_worker_id)
+    else:
+        raise ValueError(f"Almacen de worker no soportado: {store}")
+
+
+def generate_notification_id(canal: str = "BMO") -> str:
+    """
+    Genera un ID de notificacion unico: canal + fecha de Guayaquil + worker + secuencia
+    """
+    return id_generator.next_id(canal)
@@ -0,0 +1,59 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del paquete desplegado
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+    _ORJSON_PRETTY_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2
+
+
+def dumps_bytes(value, pretty: bool = False) -> bytes:
+    """
+    Serializa a JSON en UTF-8. Usa orjson si esta instalado y json de la
+    libreria estandar en caso contrario, o si orjson no soporta el valor
+    (por ejemplo enteros de mas de 64 bits). Los tipos no serializables se
+    convierten con str.
+
+    Args:
+        value: valor a serializar
+        pretty (bool): indentar con 2 espacios
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=str, option=_ORJSON_PRETTY_OPTIONS if pretty else _ORJSON_OPTIONS)
+        except TypeError:
+            pass
+    return _stdlib_dumps(value, pretty).encode("utf-8")
+
+
+def dumps(value, pretty: bool = False) -> str:
+    """
+    Serializa a JSON como str, con caracteres no ASCII sin escapar
+    """
+    if orjson is not None:
+        return dumps_bytes(value, pretty).decode("utf-8")
+    return _stdlib_dumps(value, pretty)
+
+
+def loads(data):
+    """
+    Deserializa JSON desde str o bytes.
+
+    Raises:
+        json.JSONDecodeError: si el documento es invalido (orjson.JSONDecodeError
+            es subclase de json.JSONDecodeError)
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _stdlib_dumps(value, pretty: bool) -> str:
+    if pretty:
+        return json.dumps(value, ensure_ascii=False, default=str, indent=2)
+    return json.dumps(value, ensure_ascii=False, default=str, separators=(",", ":"))
@@ -0,0 +1,89 @@
+import logging
+import random
+
+from utils import json_codec
+
+DEFAULT_PAYLOAD_SAMPLE_RATE = 0.1
+DEFAULT_PAYLOAD_MAX_CHARS = 4096
+PAYLOAD_OMITTED = "<omitido por muestreo>"
+
+_configured = None
+_payload_settings = {"sample_rate": DEFAULT_PAYLOAD_SAMPLE_RATE, "max_chars": DEFAULT_PAYLOAD_MAX_CHARS}
+_payload_sampled = True
+
+
+class LazyJson:
+    """
+    Serializa el valor a JSON solo cuando el registro de log se emite.
+    Se usa como argumento de logger (logger.info("...: %s", LazyJson(valor)))
+    para no pagar la serializacion en registros filtrados por nivel. El texto se
+    recorta a max_chars.
+    """
+
+    __slots__ = ("value", "max_chars")
+
+    def __init__(self, value, max_chars: int = DEFAULT_PAYLOAD_MAX_CHARS):
+        self.value = value
+        self.max_chars = max_chars
+
+    def __str__(self):
+        text = json_codec.dumps(self.value)
+        if self.max_chars and len(text) > self.max_chars:
+            return f"{text[:self.max_chars]}...(+{len(text) - self.max_chars} caracteres)"
+        return text
+
+    __repr__ = __str__
+
+
+def config_logger(config_file: dict) -> logging.Logger:
+    """
+    Configura el logger raiz una sola vez por contenedor.
+
+    Invocaciones posteriores con el mismo formato y nivel no modifican los
+    handlers, y nunca se agrega mas de uno. En cada llamada se
+    decide si la invocacion registra payloads completos, segun
+    logging.payload_sample_rate.
+
+    Args:
+        config_file (dict): archivo de configuracion
+
+    Returns:
+        Logger: logger raiz configurado
+    """
+    global _configured, _payload_sampled
+    settings = config_file["logging"]
+    log_format = settings["format"]
+    level = logging.getLevelName(str(settings.get("level", "INFO")).upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+
+    logger = logging.getLogger()
+    if _configured != (log_format, level):
+        # El runtime de Lambda ya instala un handler en el logger raiz; se
+        # reutiliza para no duplicar cada linea en CloudWatch
+        if not logger.handlers:
+            logger.addHandler(logging.StreamHandler())
+        formatter = logging.Formatter(log_format)
+        for handler in logger.handlers:
+            handler.setFormatter(formatter)
+        logger.setLevel(level)
+        _configured = (log_format, level)
+        logger.info("Logger configurado correctamente")
+
+    _payload_settings["sample_rate"] = float(settings.get("payload_sample_rate", DEFAULT_PAYLOAD_SAMPLE_RATE))
+    _payload_settings["max_chars"] = int(settings.get("payload_max_chars", DEFAULT_PAYLOAD_MAX_CHARS))
+    _payload_sampled = random.random() < _payload_settings["sample_rate"]
+    return logger
+
+
+def log_payload(value):
+    """
+    Argumento de log para un payload: se serializa de forma diferida si la
+    invocacion fue muestreada y se omite en caso contrario.
+
+    Args:
+        value: payload a registrar
+    """
+    if not _payload_sampled:
+        return PAYLOAD_OMITTED
+    return LazyJson(value, _payload_settings["max_chars"])
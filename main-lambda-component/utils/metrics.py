@@ -0,0 +1,130 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE") or "NotificacionesColas"
+UNKNOWN_DIMENSION = "NA"
+
+
+def put_metric(name: str, value: float, unit: str = "Milliseconds", dimensions: Dict[str, str] = None) -> dict:
+    """
+    Publica una metrica en CloudWatch usando Embedded Metric Format (EMF).
+    La linea se escribe en stdout y CloudWatch Logs la convierte en metrica,
+    sin llamadas adicionales a la API de CloudWatch.
+
+    Args:
+        name (str): Nombre de la metrica
+        value (float): Valor de la metrica
+        unit (str): Unidad de CloudWatch (Milliseconds, Count, ...)
+        dimensions (dict): Dimensiones de la metrica
+
+    Returns:
+        dict: Documento EMF emitido
+    """
+    dimensions = {k: str(v) for k, v in (dimensions or {}).items()}
+    document = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [list(dimensions.keys())],
+                "Metrics": [{"Name": name, "Unit": unit}],
+            }],
+        },
+        name: value,
+        **dimensions,
+    }
+    print(json.dumps(document))
+    return document
+
+
+def put_metrics(metrics: Dict[str, float], unit: str = "Milliseconds", dimensions: Dict[str, str] = None, dimension_sets: List[List[str]] = None) -> dict:
+    """
+    Publica varias metricas con las mismas dimensiones en un solo documento EMF.
+
+    Args:
+        metrics (dict): Nombre -> valor de cada metrica
+        unit (str): Unidad de CloudWatch comun a todas las metricas
+        dimensions (dict): Dimensiones del documento
+        dimension_sets (list): Combinaciones de dimensiones a agregar en
+            CloudWatch; por defecto todas las dimensiones juntas
+
+    Returns:
+        dict: Documento EMF emitido
+    """
+    dimensions = {k: str(v) for k, v in (dimensions or {}).items()}
+    document = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": dimension_sets or [list(dimensions.keys())],
+                "Metrics": [{"Name": name, "Unit": unit} for name in metrics],
+            }],
+        },
+        **metrics,
+        **dimensions,
+    }
+    print(json.dumps(document))
+    return document
+
+
+def stage_metric_name(stage: str) -> str:
+    """Nombre de la metrica de una etapa: db_params -> DbParamsTime"""
+    return "".join(part[:1].upper() + part[1:] for part in stage.split("_")) + "Time"
+
+
+class InvocationSpans:
+    """
+    Tiempos por etapa de una invocacion, publicados al final como un solo
+    documento EMF con dimensiones Function, Nemonic y Outcome.
+
+    Cada etapa se mide con el context manager span; si una etapa se repite
+    en la invocacion (por ejemplo en un lote) los tiempos se suman. Ademas de
+    las etapas se publica InvocationTime con el tiempo total.
+    """
+
+    def __init__(self, function_name: str, clock: Callable[[], float] = time.perf_counter):
+        self.function_name = function_name
+        self.clock = clock
+        self.started = clock()
+        self.stages: Dict[str, float] = {}
+        self.nemonic = UNKNOWN_DIMENSION
+        self.outcome = None
+        self.emitted = False
+
+    @contextmanager
+    def span(self, stage: str):
+        start = self.clock()
+        try:
+            yield self
+        finally:
+            self.record(stage, (self.clock() - start) * 1000)
+
+    def record(self, stage: str, elapsed_ms: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed_ms
+
+    def set_nemonic(self, nemonic):
+        self.nemonic = str(nemonic) if nemonic else UNKNOWN_DIMENSION
+
+    def emit(self, outcome: str = None) -> dict:
+        """
+        Publica los tiempos. Solo se publica una vez por invocacion.
+
+        Args:
+            outcome (str): resultado de la invocacion; tiene prioridad el
+                definido antes en self.outcome
+        """
+        if self.emitted:
+            return {}
+        self.emitted = True
+        metrics = {stage_metric_name(stage): round(elapsed_ms, 3) for stage, elapsed_ms in self.stages.items()}
+        metrics["InvocationTime"] = round((self.clock() - self.started) * 1000, 3)
+        return put_metrics(
+            metrics,
+            "Milliseconds",
+            {"Function": self.function_name, "Nemonic": self.nemonic, "Outcome": self.outcome or outcome or UNKNOWN_DIMENSION},
+            dimension_sets=[["Function", "Outcome"], ["Function", "Nemonic", "Outcome"]],
+        )
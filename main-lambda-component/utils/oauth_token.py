@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+OAUTH_REFRESH_MARGIN_SECONDS = float(os.getenv("OAUTH_REFRESH_MARGIN_SECONDS") or 60)
+OAUTH_DEFAULT_EXPIRES_IN = 3600
+
+
+class OAuthTokenCache:
+    """
+    Cache de tokens de acceso OAuth (client credentials) por endpoint y secreto.
+
+    El token se reutiliza hasta refresh_margin_seconds antes de su expires_in.
+    Dentro de ese margen un solo hilo lo renueva mientras los demas siguen
+    usando el token vigente; si el token ya expiro, los demas esperan el
+    resultado del hilo que lo renueva (single-flight).
+    """
+
+    def __init__(self, refresh_margin_seconds: float = OAUTH_REFRESH_MARGIN_SECONDS):
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._entries: Dict[Any, Dict[str, Any]] = {}
+        self._locks: Dict[Any, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, fetch_token: Callable[[], dict], force_refresh: bool = False) -> str:
+        """
+        Obtiene un token vigente, solicitandolo solo cuando es necesario.
+
+        Args:
+            key: Identificador del token, por ejemplo (url_auth, secret_id)
+            fetch_token (Callable): Funcion que solicita un token nuevo y retorna
+                la respuesta de OAuth con access_token y expires_in
+            force_refresh (bool): Descarta el token actual
+
+        Returns:
+            str: access_token
+        """
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry and not force_refresh:
+            if now < entry["refresh_at"]:
+                return entry["access_token"]
+            if now < entry["expires_at"]:
+                lock = self._key_lock(key)
+                if not lock.acquire(blocking=False):
+                    return entry["access_token"]
+                try:
+                    return self._refresh(key, fetch_token)
+                finally:
+                    lock.release()
+
+        requested_at = now
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry and entry["loaded_at"] >= requested_at:
+                return entry["access_token"]
+            if entry and not force_refresh and time.monotonic() < entry["refresh_at"]:
+                return entry["access_token"]
+            return self._refresh(key, fetch_token)
+
+    def invalidate(self, key=None, access_token: str = None):
+        """
+        Descarta un token, por ejemplo cuando el servicio responde 401.
+        Si se indica access_token solo se descarta si sigue siendo el vigente.
+        """
+        if key is None:
+            self._entries.clear()
+            return
+        entry = self._entries.get(key)
+        if entry and (access_token is None or entry["access_token"] == access_token):
+            self._entries.pop(key, None)
+
+    def _refresh(self, key, fetch_token: Callable[[], dict]) -> str:
+        token_data = fetch_token()
+        access_token = token_data.get("access_token")
+        if not access_token:
+            raise ValueError("No se pudo obtener el access_token de la respuesta de OAuth")
+        expires_in = float(token_data.get("expires_in") or OAUTH_DEFAULT_EXPIRES_IN)
+        loaded_at = time.monotonic()
+        margin = min(self.refresh_margin_seconds, expires_in / 2)
+        self._entries[key] = {
+            "access_token": access_token,
+            "loaded_at": loaded_at,
+            "refresh_at": loaded_at + expires_in - margin,
+            "expires_at": loaded_at + expires_in,
+        }
+        return access_token
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
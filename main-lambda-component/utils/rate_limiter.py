@@ -0,0 +1,216 @@
+import math
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from utils.aws_clients import get_client
+from utils.metrics import put_metric
+
+DEFAULT_RATE_PER_SECOND = 50.0
+DEFAULT_BURST = 50
+DEFAULT_LEASE_SIZE = 1
+
+
+def initial_bucket(burst: float, now: float) -> dict:
+    return {"tokens": float(burst), "updated_at": now, "version": 0}
+
+
+class MemoryBucketStore:
+    """
+    Almacen en memoria del proceso. Es el respaldo local cuando el almacen
+    compartido no responde, y sirve para pruebas.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def update(self, name: str, burst: float, now: float, mutate: Callable[[dict], dict]) -> dict:
+        with self._lock:
+            current = self._buckets.get(name) or initial_bucket(burst, now)
+            new_state = mutate(dict(current))
+            new_state["version"] = current["version"] + 1
+            self._buckets[name] = new_state
+            return dict(new_state)
+
+
+class DynamoDBBucketStore:
+    """
+    Almacen en una tabla de DynamoDB (llave de particion "name"), compartido
+    por todos los contenedores. Las escrituras usan una condicion sobre la
+    version para no pisar cambios concurrentes.
+    """
+
+    def __init__(self, table_name: str, client=None, max_attempts: int = 5):
+        self.table_name = table_name
+        self._client = client
+        self.max_attempts = max_attempts
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client("dynamodb")
+        return self._client
+
+    def update(self, name: str, burst: float, now: float, mutate: Callable[[dict], dict]) -> dict:
+        from botocore.exceptions import ClientError
+
+        for attempt in range(self.max_attempts):
+            item = self.client.get_item(
+                TableName=self.table_name, Key={"name": {"S": name}}, ConsistentRead=True
+            ).get("Item")
+            if item:
+                current = {
+                    "tokens": float(item["tokens"]["N"]),
+                    "updated_at": float(item["updated_at"]["N"]),
+                    "version": int(item["version"]["N"]),
+                }
+                condition = {
+                    "ConditionExpression": "version = :version",
+                    "ExpressionAttributeValues": {":version": {"N": str(current["version"])}},
+                }
+            else:
+                current = initial_bucket(burst, now)
+                condition = {"ConditionExpression": "attribute_not_exists(#n)", "ExpressionAttributeNames": {"#n": "name"}}
+            new_state = mutate(dict(current))
+            new_state["version"] = current["version"] + 1
+            try:
+                self.client.put_item(
+                    TableName=self.table_name,
+                    Item={
+                        "name": {"S": name},
+                        "tokens": {"N": repr(float(new_state["tokens"]))},
+                        "updated_at": {"N": repr(float(new_state["updated_at"]))},
+                        "version": {"N": str(new_state["version"])},
+                    },
+                    **condition,
+                )
+                return new_state
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+        # Demasiada contencion: se niegan los tokens en lugar de esperar
+        return None
+
+
+class TokenBucket:
+    """
+    Limitador de tasa token bucket: rate_per_second tokens por segundo con
+    un maximo acumulado de burst.
+
+    El estado vive en un almacen intercambiable para repartir el limite entre
+    contenedores. Para no consultar el almacen en cada solicitud se pueden
+    tomar lease_size tokens a la vez y consumirlos localmente. Si el almacen
+    falla se usa un bucket local con fallback_rate_per_second.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate_per_second: float = DEFAULT_RATE_PER_SECOND,
+        burst: float = DEFAULT_BURST,
+        store=None,
+        lease_size: int = DEFAULT_LEASE_SIZE,
+        fallback_rate_per_second: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.name = name
+        self.rate = float(rate_per_second)
+        self.burst = max(1.0, float(burst))
+        self.store = store or MemoryBucketStore()
+        self.lease_size = max(1, int(lease_size))
+        self.fallback_rate = float(fallback_rate_per_second if fallback_rate_per_second is not None else rate_per_second)
+        self.clock = clock
+        self._fallback_store = MemoryBucketStore()
+        self._leased = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """
+        Toma un token si hay disponible. Nunca espera.
+        """
+        with self._lock:
+            if self._leased > 0:
+                self._leased -= 1
+                return True
+        granted = self._take(self.lease_size)
+        if not granted:
+            put_metric("RateLimited", 1, "Count", {"Limiter": self.name})
+            return False
+        if granted > 1:
+            with self._lock:
+                self._leased += granted - 1
+        return True
+
+    def acquire(self, timeout_seconds: float, sleep: Callable[[float], None] = time.sleep) -> bool:
+        """
+        Toma un token esperando como maximo timeout_seconds
+        """
+        deadline = time.monotonic() + max(0.0, timeout_seconds)
+        while True:
+            if self.try_acquire():
+                return True
+            wait = min(1.0 / self.rate if self.rate > 0 else 1.0, deadline - time.monotonic())
+            if wait <= 0:
+                return False
+            sleep(wait)
+
+    def _take(self, count: int) -> int:
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        now = self.clock()
+        try:
+            return self._take_from(self.store, self.rate, count, now)
+        except (ClientError, BotoCoreError) as e:
+            print(f"No se pudo usar el almacen del limitador {self.name}, se usa el bucket local: {e}")
+            return self._take_from(self._fallback_store, self.fallback_rate, count, now)
+
+    def _take_from(self, store, rate: float, count: int, now: float) -> int:
+        result = {}
+
+        def take(current):
+            elapsed = max(0.0, now - current["updated_at"])
+            tokens = min(self.burst, current["tokens"] + elapsed * rate)
+            granted = min(count, math.floor(tokens))
+            result["granted"] = granted
+            current.update(tokens=tokens - granted, updated_at=now)
+            return current
+
+        if store.update(self.name, self.burst, now, take) is None:
+            return 0
+        return result["granted"]
+
+
+def build_bucket_store(settings: dict):
+    """
+    Crea el almacen del limitador segun la configuracion.
+
+    Args:
+        settings (dict): seccion rate_limit del archivo de configuracion
+            (store: dynamodb | memory, table_name)
+    """
+    store = (settings.get("store") or "memory").lower()
+    if store == "dynamodb":
+        return DynamoDBBucketStore(settings["table_name"])
+    if store == "memory":
+        return MemoryBucketStore()
+    raise ValueError(f"Almacen de limitador no soportado: {store}")
+
+
+def build_rate_limiter(name: str, settings: dict) -> Optional[TokenBucket]:
+    """
+    Crea un limitador a partir de la seccion rate_limit del YAML. Devuelve
+    None si la seccion no existe o enabled es falso.
+    """
+    settings = settings or {}
+    if not settings.get("enabled", False):
+        return None
+    rate = float(settings.get("rate_per_second", DEFAULT_RATE_PER_SECOND))
+    return TokenBucket(
+        name,
+        rate_per_second=rate,
+        burst=float(settings.get("burst", rate)),
+        store=build_bucket_store(settings),
+        lease_size=int(settings.get("lease_size", DEFAULT_LEASE_SIZE)),
+        fallback_rate_per_second=settings.get("fallback_rate_per_second"),
+    )
@@ -0,0 +1,160 @@
+import json
+from typing import Any, Callable, Dict, List
+
+TYPE_CHECKS = {
+    "object": "isinstance(v, dict)",
+    "array": "isinstance(v, list)",
+    "string": "isinstance(v, str)",
+    "integer": "(isinstance(v, int) and not isinstance(v, bool)) or (isinstance(v, float) and v.is_integer())",
+    "number": "(isinstance(v, (int, float)) and not isinstance(v, bool))",
+    "boolean": "isinstance(v, bool)",
+    "null": "v is None",
+}
+SUPPORTED_KEYWORDS = {
+    "type", "enum", "minimum", "required", "properties", "items", "allOf", "if", "then", "else",
+}
+ANNOTATION_KEYWORDS = {"description", "title", "$comment", "default", "examples"}
+
+
+class UnsupportedSchemaError(Exception):
+    """El esquema usa palabras clave que el generador no soporta"""
+    pass
+
+
+class _ValidatorGenerator:
+    """
+    Traduce un esquema JSON Schema a funciones de Python que solo responden
+    si la instancia es valida. Soporta el subconjunto de palabras clave que
+    usa el request de notificaciones.
+    """
+
+    def __init__(self):
+        self.functions: List[str] = []
+        self.constants: List[str] = []
+        self.generated: Dict[str, str] = {}
+        self.counter = 0
+
+    def node(self, schema) -> str:
+        if schema is True or schema == {}:
+            return "_always"
+        if schema is False:
+            return "_never"
+        if not isinstance(schema, dict):
+            raise UnsupportedSchemaError(f"Esquema invalido: {schema!r}")
+        unsupported = set(schema) - SUPPORTED_KEYWORDS - ANNOTATION_KEYWORDS
+        if unsupported:
+            raise UnsupportedSchemaError(f"Palabras clave no soportadas: {sorted(unsupported)}")
+        # Subesquemas identicos comparten la misma funcion
+        schema_key = json.dumps(schema, sort_keys=True, default=str)
+        if schema_key in self.generated:
+            return self.generated[schema_key]
+
+        name = f"_v{self.counter}"
+        self.counter += 1
+        body: List[str] = []
+
+        types = schema.get("type")
+        if types is not None:
+            types = [types] if isinstance(types, str) else list(types)
+            if any(t not in TYPE_CHECKS for t in types):
+                raise UnsupportedSchemaError(f"Tipo no soportado: {types}")
+            body.append(f"if not ({' or '.join(TYPE_CHECKS[t] for t in types)}): return False")
+
+        if "enum" in schema:
+            values = schema["enum"]
+            if not all(isinstance(value, str) for value in values):
+                raise UnsupportedSchemaError("Solo se soportan enum de strings")
+            constant = f"_c{len(self.constants)}"
+            self.constants.append(f"{constant} = frozenset({sorted(set(values))!r})")
+            body.append(f"if not (isinstance(v, str) and v in {constant}): return False")
+
+        if "minimum" in schema:
+            body.append(
+                f"if {TYPE_CHECKS['number']} and not v >= {schema['minimum']!r}: return False"
+            )
+
+        object_checks = self.object_checks(schema)
+        if object_checks:
+            body.extend(self.guard(types, "object", object_checks))
+
+        if "items" in schema:
+            item_function = self.node(schema["items"])
+            array_checks = [f"for item in v:", f"    if not {item_function}(item): return False"]
+            body.extend(self.guard(types, "array", array_checks))
+
+        for subschema in schema.get("allOf", []):
+            body.append(f"if not {self.node(subschema)}(v): return False")
+
+        if "if" in schema and ("then" in schema or "else" in schema):
+            condition = self.node(schema["if"])
+            if "then" in schema:
+                body.append(f"if {condition}(v) and not {self.node(schema['then'])}(v): return False")
+            if "else" in schema:
+                body.append(f"if not {condition}(v) and not {self.node(schema['else'])}(v): return False")
+
+        body.append("return True")
+        self.functions.append("\n".join([f"def {name}(v):"] + [f"    {line}" for line in body]))
+        self.generated[schema_key] = name
+        return name
+
+    def object_checks(self, schema) -> List[str]:
+        checks = []
+        required = schema.get("required", [])
+        if required:
+            condition = " and ".join(f"{key!r} in v" for key in required)
+            checks.append(f"if not ({condition}): return False")
+        for key, subschema in schema.get("properties", {}).items():
+            function = self.node(subschema)
+            if function == "_always":
+                continue
+            checks.append(f"if {key!r} in v and not {function}(v[{key!r}]): return False")
+        return checks
+
+    @staticmethod
+    def guard(types, expected: str, checks: List[str]) -> List[str]:
+        # Si el tipo ya fue verificado no hace falta volver a comprobarlo
+        if types == [expected]:
+            return checks
+        return [f"if {TYPE_CHECKS[expected]}:"] + [f"    {line}" for line in checks]
+
+
+def generate_validator_source(schema, name: str = "validate") -> str:
+    """
+    Genera el codigo fuente de una funcion name(instance) -> bool equivalente
+    a validar la instancia contra el esquema.
+
+    Args:
+        schema (dict): Esquema JSON Schema
+        name (str): Nombre de la funcion generada
+
+    Returns:
+        str: Codigo fuente de Python
+
+    Raises:
+        UnsupportedSchemaError: Si el esquema usa palabras clave no soportadas
+    """
+    generator = _ValidatorGenerator()
+    root = generator.node(schema)
+    parts = [
+        "def _always(v):\n    return True",
+        "def _never(v):\n    return False",
+        *generator.constants,
+        *generator.functions,
+        f"{name} = {root}",
+    ]
+    return "\n\n".join(parts) + "\n"
+
+
+def compile_fast_validator(schema, name: str = "validate") -> Callable[[Any], bool]:
+    """
+    Compila el esquema a una funcion de Python que retorna True si la instancia es valida
+
+    Args:
+        schema (dict): Esquema JSON Schema
+
+    Returns:
+        Callable: Funcion de validacion
+    """
+    namespace: dict = {}
+    exec(compile(generate_validator_source(schema, name), f"<schema_codegen:{name}>", "exec"), namespace)
+    return namespace[name]
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+SECRET_CACHE_TTL_SECONDS = float(os.getenv("SECRET_CACHE_TTL_SECONDS") or 300)
+DEFAULT_REGION = os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION") or "us-east-1"
+
+
+class SecretCache:
+    """
+    Cache en memoria de secretos de AWS Secrets Manager.
+
+    Cada secreto tiene su propio TTL. Cuando vence, solo un hilo consulta
+    Secrets Manager y el resto espera su resultado (single-flight). Los
+    clientes de secretsmanager se crean una sola vez por region.
+
+    Este modulo no depende del resto de utils para que los jobs de Glue
+    puedan cargarlo con --extra-py-files.
+    """
+
+    def __init__(self, default_ttl: float = SECRET_CACHE_TTL_SECONDS, client=None, region_name: str = DEFAULT_REGION):
+        self.default_ttl = default_ttl
+        self._clients = {}
+        if client is not None:
+            self._clients[region_name] = client
+        self._ttls: Dict[str, float] = {}
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def client(self, region_name: str = DEFAULT_REGION):
+        """
+        Cliente de secretsmanager reutilizado para la region indicada
+        """
+        client = self._clients.get(region_name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(region_name)
+                if client is None:
+                    import boto3
+
+                    client = boto3.client(service_name='secretsmanager', region_name=region_name)
+                    self._clients[region_name] = client
+        return client
+
+    def set_ttl(self, secret_name: str, ttl_seconds: float):
+        """
+        Define un TTL especifico para un secreto
+        """
+        self._ttls[secret_name] = ttl_seconds
+
+    def get(self, secret_name: str, region_name: str = DEFAULT_REGION, force_refresh: bool = False) -> dict:
+        """
+        Obtiene un secreto desde el cache o desde Secrets Manager.
+
+        Args:
+            secret_name (str): Nombre del secreto
+            region_name (str): Region de AWS del secreto
+            force_refresh (bool): Ignora el cache, usar cuando las credenciales
+                fueron rechazadas (rotacion del secreto)
+
+        Returns:
+            dict: Contenido del secreto
+        """
+        cache_key = (region_name, secret_name)
+        entry = self._entries.get(cache_key)
+        if entry and not force_refresh and not self._expired(secret_name, entry):
+            return entry["value"]
+
+        requested_at = time.monotonic()
+        with self._key_lock(cache_key):
+            entry = self._entries.get(cache_key)
+            if entry:
+                # Otro hilo refresco el secreto mientras se esperaba el lock
+                refreshed = entry["loaded_at"] >= requested_at
+                if refreshed or (not force_refresh and not self._expired(secret_name, entry)):
+                    return entry["value"]
+
+            response = self.client(region_name).get_secret_value(SecretId=secret_name)
+            value = json.loads(response['SecretString'])
+            self._entries[cache_key] = {"value": value, "loaded_at": time.monotonic()}
+            return value
+
+    def invalidate(self, secret_name: str = None, region_name: str = DEFAULT_REGION):
+        """
+        Elimina un secreto del cache. Sin argumentos limpia todo el cache.
+        """
+        if secret_name is None:
+            self._entries.clear()
+        else:
+            self._entries.pop((region_name, secret_name), None)
+
+    def _expired(self, secret_name: str, entry: dict) -> bool:
+        ttl = self._ttls.get(secret_name, self.default_ttl)
+        return time.monotonic() - entry["loaded_at"] >= ttl
+
+    def _key_lock(self, cache_key: Tuple[str, str]) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(cache_key)
+            if lock is None:
+                lock = self._locks[cache_key] = threading.Lock()
+            return lock
+
+
+secret_cache = SecretCache()
@@ -1,46 +1,50 @@
-from requests.adapters import HTTPAdapter
-from urllib3.util import Retry
-import pytz
-import requests
 from logging import Logger
-import pymysql
 from typing import Dict, Any, List, Tuple
 import json
-import uuid
-import boto3
 import datetime
-
-def get_secret(secret_name: str, region_name: str = "us-east-1") -> dict:
+import os
+import threading
+import time
+from urllib.parse import urlparse
+from utils.secret_cache import secret_cache
+from utils.log_config import LazyJson
+from utils.id_generator import generate_notification_id
+
+def get_secret(secret_name: str, region_name: str = "us-east-1", force_refresh: bool = False) -> dict:
     """
     Obtiene un secreto de AWS Secrets Manager.
+    El secreto se mantiene en cache del contenedor hasta que vence su TTL.
     
     Args:
         secret_name (str): Nombre del secreto a obtener.
         region_name (str): Región de AWS donde se encuentra el secreto.
+        force_refresh (bool): Fuerza la lectura desde Secrets Manager,
+            por ejemplo cuando las credenciales fueron rechazadas.
         
     Returns:
         dict: Contenido del secreto como un diccionario.
     """
-    session = boto3.session.Session()
-    client = session.client(service_name='secretsmanager', region_name=region_name)
-    
     try:
-        get_secret_value_response = client.get_secret_value(SecretId=secret_name)
-        secret = get_secret_value_response['SecretString']
-        return json.loads(secret)
+        return secret_cache.get(secret_name, region_name=region_name, force_refresh=force_refresh)
     except Exception as e:
         print(f"Error al obtener el secreto: {e}")
         raise
 
 
-def create_session(reintentos:int = 3,backoff_factor:float = 0.5,):
+def create_session(reintentos:int = 3,backoff_factor:float = 0.5,pool_connections:int = 10,pool_maxsize:int = 10):
     """
     crear una sesion de requests con reintentos
     y manejo de errores para las peticiones HTTP.
     Args:
         reintentos (int): cantidad de reintentos
         backoff_factor (float): factor de retroceso para los reintentos
+        pool_connections (int): cantidad de pools de conexiones (hosts) a mantener
+        pool_maxsize (int): conexiones keep-alive maximas por host
     """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import Retry
+
     session = requests.Session()
     retry_reintentos = Retry(
         total=reintentos,
@@ -50,7 +54,7 @@ def create_session(reintentos:int = 3,backoff_factor:float = 0.5,):
         allowed_methods=["POST"],
         respect_retry_after_header=True
     )
-    adapter = HTTPAdapter(max_retries=retry_reintentos)
+    adapter = HTTPAdapter(max_retries=retry_reintentos,pool_connections=pool_connections,pool_maxsize=pool_maxsize)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     session.headers.update({
@@ -62,6 +66,121 @@ def create_session(reintentos:int = 3,backoff_factor:float = 0.5,):
     return session
 
 
+_sessions: Dict[Tuple, "requests.Session"] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(url: str, reintentos: int = 3, backoff_factor: float = 0.5, pool_connections: int = 10, pool_maxsize: int = 10):
+    """
+    Obtiene la sesion de requests del host de la url, reutilizada entre
+    invocaciones para conservar las conexiones keep-alive (TLS) abiertas.
+    Args:
+        url (str): url a la que se enviaran las peticiones
+        reintentos (int): cantidad de reintentos
+        backoff_factor (float): factor de retroceso para los reintentos
+        pool_connections (int): cantidad de pools de conexiones a mantener
+        pool_maxsize (int): conexiones keep-alive maximas por host
+    """
+    host = urlparse(url).netloc
+    session_key = (host, reintentos, backoff_factor, pool_connections, pool_maxsize)
+    session = _sessions.get(session_key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(session_key)
+            if session is None:
+                session = create_session(reintentos, backoff_factor, pool_connections, pool_maxsize)
+                _sessions[session_key] = session
+    return session
+
+
+def get_pool_config(config_file: dict) -> Dict[str, int]:
+    """
+    Obtiene el tamaño de los pools de conexiones desde lambda.backoff
+    Args:
+        config_file (dict): archivo de configuracion
+    """
+    backoff = config_file["lambda"]["backoff"]
+    return {
+        "pool_connections": int(backoff.get("pool_connections", 10)),
+        "pool_maxsize": int(backoff.get("pool_maxsize", 10)),
+    }
+
+
+RETRY_STATUS = (500, 502, 503, 504)
+
+
+def post_with_budget(session: "requests.Session", url: str, budget, timeout_seconds: float, reintentos: int = 3, backoff_factor: float = 0.5, rate_limiter=None, **kwargs) -> "requests.Response":
+    """
+    POST con reintentos controlados por el presupuesto de tiempo de la invocacion.
+    Cada intento usa como timeout el menor entre timeout_seconds y el tiempo
+    disponible, y solo se reintenta si alcanza para la espera y otro intento
+    sin consumir la reserva del encolado de respaldo. La sesion debe crearse
+    sin reintentos de urllib3.
+    Args:
+        session (Session): sesion de requests
+        url (str): url destino
+        budget (LatencyBudget): presupuesto de la invocacion
+        timeout_seconds (float): timeout maximo por intento
+        reintentos (int): cantidad maxima de reintentos
+        backoff_factor (float): factor de retroceso entre reintentos
+        rate_limiter (TokenBucket): si se indica, cada reintento consume un
+            token y sin tokens no se reintenta
+    """
+    import requests
+
+    attempt = 0
+    while True:
+        timeout = budget.timeout(timeout_seconds)
+        delay = backoff_factor * (2 ** attempt)
+        error = None
+        try:
+            response = session.post(url, timeout=timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt >= reintentos or not budget.can_retry(delay):
+                raise
+            error = e
+        else:
+            if response.status_code not in RETRY_STATUS or attempt >= reintentos:
+                return response
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            if not budget.can_retry(delay):
+                print(f"Sin presupuesto para reintentar {url} tras {response.status_code}")
+                return response
+        if rate_limiter is not None and not rate_limiter.try_acquire():
+            print(f"Sin tokens del limitador para reintentar {url}")
+            if error is not None:
+                raise error
+            return response
+        attempt += 1
+        time.sleep(delay)
+
+
+def get_connection_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Contadores de reutilizacion de conexiones por host de las sesiones compartidas.
+    requests son las peticiones enviadas, connections las conexiones nuevas
+    abiertas y reused las peticiones que usaron una conexion existente
+    """
+    stats: Dict[str, Dict[str, Any]] = {}
+    for session in list(_sessions.values()):
+        adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for pool_key in list(pools.keys()):
+                pool = pools.get(pool_key)
+                if pool is None:
+                    continue
+                host_stats = stats.setdefault(pool.host, {"requests": 0, "connections": 0})
+                host_stats["requests"] += pool.num_requests
+                host_stats["connections"] += pool.num_connections
+    for host_stats in stats.values():
+        host_stats["reused"] = max(host_stats["requests"] - host_stats["connections"], 0)
+        host_stats["reuse_ratio"] = round(host_stats["reused"] / host_stats["requests"], 4) if host_stats["requests"] else 0.0
+    return stats
+
+
 
 
 
@@ -73,6 +192,8 @@ def get_proccess_date():
     """
     Obtener la fecha y hora actual
     """
+    import pytz
+
     ecuador_timezone = pytz.timezone("America/Guayaquil")
     return datetime.datetime.now(ecuador_timezone)
 #.strftime('%Y-%m-%d %H:%M:%S')
@@ -80,20 +201,6 @@ def get_proccess_date():
 
 
 
-def generate_simple_sequential_id(canal: str = "BMO",fecha_proceso:datetime=get_proccess_date()) -> str:
-    """
-    Genera un ID único usando timestamp + UUID truncado
-    """
-    canal = canal.ljust(3, '0')[:3]
-    now = fecha_proceso
-    timestamp = now.strftime("%Y%m%d%H%M%S")
-    
-    # Usar últimos 6 dígitos del UUID (hex a decimal)
-    uuid_suffix = str(abs(hash(str(uuid.uuid4()))))[-6:].zfill(6)
-    
-    return f"{canal}{timestamp}{uuid_suffix}"
-
-
 def validate_config(config):
     required_structure = {
         'lambda': ['timeout_seconds', 'env', 'backoff'],
@@ -148,6 +255,89 @@ def validate_config(config):
 
 
 
+PARAMS_CACHE_TTL_SECONDS = float(os.getenv("PARAMS_CACHE_TTL_SECONDS") or 300)
+
+_db_connection = None
+_db_connection_key = None
+_db_lock = threading.Lock()
+_params_cache: Dict[Tuple[str, int, str], Dict[str, Any]] = {}
+_params_lock = threading.Lock()
+
+
+def get_db_connection(user: str, password: str, host: str, port: int, db: str):
+    """
+    Obtiene la conexion a la base de datos reutilizada entre invocaciones.
+    Antes de entregarla se valida con ping y se reconecta si fue cerrada.
+    Se abre con autocommit para que cada consulta lea datos vigentes y no
+    quede una transaccion (y su snapshot REPEATABLE READ) abierta durante
+    la vida del contenedor.
+
+    Args:
+        user (str): Usuario de la base de datos
+        password (str): Contraseña de la base de datos
+        host (str): Host de la base de datos
+        port (int): Puerto de la base de datos
+        db (str): Nombre de la base de datos
+
+    Returns:
+        Connection: Conexion de pymysql abierta
+    """
+    global _db_connection, _db_connection_key
+    import pymysql
+
+    connection_key = (host, port, user, password, db)
+    with _db_lock:
+        if _db_connection is not None and _db_connection_key == connection_key:
+            try:
+                _db_connection.ping(reconnect=True)
+                return _db_connection
+            except pymysql.Error as e:
+                print(f"Conexion a la base de datos no disponible, se crea una nueva: {e}")
+        _close_db_connection()
+        _db_connection = pymysql.connect(
+            host=host,
+            user=user,
+            password=password,
+            port=port,
+            db=db,
+            charset='utf8mb4',
+            autocommit=True,
+            cursorclass=pymysql.cursors.DictCursor  # Para obtener resultados como diccionario
+        )
+        _db_connection_key = connection_key
+        return _db_connection
+
+
+def close_db_connection():
+    """
+    Cierra la conexion reutilizada a la base de datos
+    """
+    with _db_lock:
+        _close_db_connection()
+
+
+def _close_db_connection():
+    global _db_connection, _db_connection_key
+    if _db_connection is not None:
+        import pymysql
+
+        try:
+            _db_connection.close()
+        except pymysql.Error:
+            pass
+    _db_connection = None
+    _db_connection_key = None
+
+
+def invalidate_params_noti_cache():
+    """
+    Elimina los parametros de notificacion en cache.
+    La siguiente llamada a get_params_noti_as_dict consulta la base de datos
+    """
+    with _params_lock:
+        _params_cache.clear()
+
+
 def get_params_noti(user: str, password: str, host: str, port: int, db: str) -> List[Dict[str, Any]]:
     """
     Obtiene los parametros de notificaciones desde DB_TC_ODS
@@ -163,15 +353,9 @@ def get_params_noti(user: str, password: str, host: str, port: int, db: str) ->
     Returns:
         List[Dict[str, Any]]: Lista de parámetros con nombre, valor y descripción
     """
-    connection = pymysql.connect(
-        host=host, 
-        user=user, 
-        password=password, 
-        port=port, 
-        db=db,
-        charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor  # Para obtener resultados como diccionario
-    )
+    import pymysql
+
+    connection = get_db_connection(user, password, host, port, db)
     
     try:
         with connection.cursor() as cursor:
@@ -186,16 +370,18 @@ def get_params_noti(user: str, password: str, host: str, port: int, db: str) ->
             
     except pymysql.Error as e:
         print(f"Error al ejecutar el procedimiento almacenado: {e}")
+        # La conexion puede quedar en estado invalido, se descarta
+        close_db_connection()
         raise
     except Exception as e:
         print(f"Error inesperado: {e}")
         raise
-    finally:
-        connection.close()
 
 def get_params_noti_as_dict(user: str, password: str, host: str, port: int, db: str) -> Dict[str, str]:
     """
-    Obtiene los parametros de notificaciones como diccionario clave-valor
+    Obtiene los parametros de notificaciones como diccionario clave-valor.
+    Los parametros se mantienen en cache del contenedor durante
+    PARAMS_CACHE_TTL_SECONDS
     
     Args:
         user (str): Usuario de la base de datos
@@ -207,13 +393,25 @@ def get_params_noti_as_dict(user: str, password: str, host: str, port: int, db:
     Returns:
         Dict[str, str]: Diccionario con pa_nombre como clave y pa_valor como valor
     """
-    params_list = get_params_noti(user, password, host, port, db)
-    params_dict = {
-        param['pa_nombre']: param['pa_valor'] 
-        for param in params_list
-    }
+    cache_key = (host, port, db)
+    entry = _params_cache.get(cache_key)
+    if entry and time.monotonic() - entry["loaded_at"] < PARAMS_CACHE_TTL_SECONDS:
+        return dict(entry["params"])
+
+    with _params_lock:
+        entry = _params_cache.get(cache_key)
+        if entry and time.monotonic() - entry["loaded_at"] < PARAMS_CACHE_TTL_SECONDS:
+            return dict(entry["params"])
+
+        params_list = get_params_noti(user, password, host, port, db)
+        params_dict = {
+            param['pa_nombre']: param['pa_valor'] 
+            for param in params_list
+        }
+        if params_dict:
+            _params_cache[cache_key] = {"params": params_dict, "loaded_at": time.monotonic()}
     
-    return params_dict
+    return dict(params_dict)
 
 def get_specific_param(user: str, password: str, host: str, port: int, db: str, param_name: str) -> str:
     """
@@ -259,7 +457,7 @@ def build_latinia_payload(request_data: dict, db_params: dict, logger=None) -> d
     try:
         # Generar ID único basado en el canal
         canal = request_data.get("channels", "BMO")
-        unique_id = generate_simple_sequential_id(canal)
+        unique_id = generate_notification_id(canal)
         
         ref_service = request_data.get("refService", "DEFAULT")
         cod_ente = str(request_data.get("cod_ente", "000000"))
@@ -290,7 +488,7 @@ def build_latinia_payload(request_data: dict, db_params: dict, logger=None) -> d
         
         if logger:
             logger.info(f"Payload construido para Latinia con ID: {unique_id}")
-            logger.debug(f"Payload completo: {json.dumps(latinia_payload, indent=2, ensure_ascii=False)}")
+            logger.debug("Payload completo: %s", LazyJson(latinia_payload))
         
         return latinia_payload
         
@@ -1,21 +1,129 @@
-import boto3
 import json
-import yaml
-from dotenv import load_dotenv
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
 import os
-import requests
 import uuid
 import logging
 from utils import validate_request
 import datetime
-import pytz
-sqs = boto3.client('sqs')
-ssm = boto3.client('ssm') 
-s3_client = boto3.client('s3')
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 BUCKET_NAME = "bb-emisor-eventos-noti"
 BUCKET_PREFIX = "eventos.json"
-load_dotenv()
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE") or "NotificacionesColas"
+FUNCTION_NAME = os.getenv("AWS_LAMBDA_FUNCTION_NAME") or "main-lambda-event-minsait"
+UNKNOWN_DIMENSION = "NA"
+if os.path.exists(".env"):
+    # Solo para ejecucion local; en Lambda no existe y se evita importar dotenv
+    from dotenv import load_dotenv
+    load_dotenv()
+_clients = {}
+_clients_lock = threading.Lock()
+_logger_configured = None
+
+def json_dumps(value) -> str:
+    """
+    Serializa a JSON con orjson si esta instalado, o con json si no lo esta
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(value, ensure_ascii=False, default=str, separators=(",", ":"))
+
+def json_loads(data):
+    """
+    Deserializa JSON desde str o bytes; los errores son json.JSONDecodeError
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def put_metrics(metrics: Dict[str, float], unit: str = "Milliseconds", dimensions: Dict[str, str] = None, dimension_sets: List[List[str]] = None) -> dict:
+    """
+    Publica varias metricas con las mismas dimensiones en un solo documento
+    EMF (Embedded Metric Format) escrito en stdout
+    """
+    dimensions = {k: str(v) for k, v in (dimensions or {}).items()}
+    document = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": dimension_sets or [list(dimensions.keys())],
+                "Metrics": [{"Name": name, "Unit": unit} for name in metrics],
+            }],
+        },
+        **metrics,
+        **dimensions,
+    }
+    print(json_dumps(document))
+    return document
+
+def stage_metric_name(stage: str) -> str:
+    """Nombre de la metrica de una etapa: s3_put -> S3PutTime"""
+    return "".join(part[:1].upper() + part[1:] for part in stage.split("_")) + "Time"
+
+class InvocationSpans:
+    """
+    Tiempos por etapa de una invocacion, publicados al final como un solo
+    documento EMF con dimensiones Function, Nemonic y Outcome. Los tiempos
+    de una etapa repetida se suman.
+    """
+
+    def __init__(self, function_name: str = FUNCTION_NAME, clock: Callable[[], float] = time.perf_counter):
+        self.function_name = function_name
+        self.clock = clock
+        self.started = clock()
+        self.stages: Dict[str, float] = {}
+        self.nemonic = UNKNOWN_DIMENSION
+        self.outcome = None
+        self.emitted = False
+
+    @contextmanager
+    def span(self, stage: str):
+        start = self.clock()
+        try:
+            yield self
+        finally:
+            self.record(stage, (self.clock() - start) * 1000)
+
+    def record(self, stage: str, elapsed_ms: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed_ms
+
+    def set_nemonic(self, nemonic):
+        self.nemonic = str(nemonic) if nemonic else UNKNOWN_DIMENSION
+
+    def emit(self, outcome: str = None) -> dict:
+        if self.emitted:
+            return {}
+        self.emitted = True
+        metrics = {stage_metric_name(stage): round(elapsed_ms, 3) for stage, elapsed_ms in self.stages.items()}
+        metrics["InvocationTime"] = round((self.clock() - self.started) * 1000, 3)
+        return put_metrics(
+            metrics,
+            "Milliseconds",
+            {"Function": self.function_name, "Nemonic": self.nemonic, "Outcome": self.outcome or outcome or UNKNOWN_DIMENSION},
+            dimension_sets=[["Function", "Outcome"], ["Function", "Nemonic", "Outcome"]],
+        )
+
+def get_outcome(response):
+    """
+    Resultado de la invocacion para la dimension Outcome de las metricas
+    """
+    status_code = (response or {}).get("statusCode", 500)
+    if status_code < 300:
+        return "success"
+    if status_code < 500:
+        return "invalid"
+    return "error"
 
 def validate_config(config):
     required_structure = {
@@ -55,6 +163,7 @@ def load_yaml_file(config_path):
     """
     Carga del archivo yaml de configuracion
     """
+    import yaml
 
     try:
         with open(config_path,'r') as file:
@@ -68,56 +177,92 @@ def load_yaml_file(config_path):
 
 def  config_logger(config_file:dict):
     """
-    configuracion del logger de la aplicacion lambda
+    configuracion del logger de la aplicacion lambda, una sola vez por contenedor
     Args:
         config_file (dict): archivo de configuracion
     """
+    global _logger_configured
+    log_format = config_file["logging"]["format"]
     logger = logging.getLogger()
+    if _logger_configured == log_format:
+        return logger
+    # Se reutiliza el handler del runtime de Lambda para no duplicar lineas
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler())
+    formatter = logging.Formatter(log_format)
+    for handler in logger.handlers:
+        handler.setFormatter(formatter)
     logger.setLevel(logging.INFO)
-    formatter = logging.Formatter(config_file["logging"]["format"])
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
-    error_handler = logging.StreamHandler()
-    error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(formatter)
-    logger.addHandler(error_handler)
-    warn_handler = logging.StreamHandler()
-    warn_handler.setLevel(logging.WARNING)
-    warn_handler.setFormatter(formatter)
-    logger.addHandler(warn_handler)
+    _logger_configured = log_format
     logger.info("Logger configurado correctamente")
 
     return logger
 
 
 
+def get_client(service_name:str):
+    """
+    Cliente de boto3 creado en el primer uso y reutilizado entre invocaciones.
+    boto3 se importa solo cuando se sube la notificacion a S3, no al importar
+    el modulo de la Lambda
+    Args:
+        service_name (str): Servicio de AWS
+    """
+    client = _clients.get(service_name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(service_name)
+            if client is None:
+                import boto3
+
+                client = boto3.client(service_name)
+                _clients[service_name] = client
+    return client
+
 def get_process_date():
     """
     Obtener la fecha y hora actual
     """
+    import pytz
+
     ecuador_timezone = pytz.timezone("America/Guayaquil")
     return datetime.datetime.now(ecuador_timezone).strftime('%Y-%m-%d %H:%M:%S')
 
 def lambda_handler(event,context):
+    """
+    Punto de entrada de la Lambda. Al terminar publica los tiempos por etapa
+    de la invocacion como metricas EMF
+    """
+    spans = InvocationSpans()
+    response = None
+    try:
+        response = handle_event(event, context, spans)
+        return response
+    finally:
+        spans.emit(get_outcome(response))
+
+def handle_event(event, context, spans):
+    import requests
+
     fecha_proceso = get_process_date()
     print("Fecha de proceso:", fecha_proceso)
     if 'body' in event:
-        if isinstance(event['body'], str):
-            body = json.loads(event["body"])
-        else:
-            body = event["body"]
+        with spans.span("validation"):
+            if isinstance(event['body'], str):
+                body = json_loads(event["body"])
+            else:
+                body = event["body"]
 
-        result = validate_request(body)
+            result = validate_request(body)
 
-        print("Resultado de validación:", result)
+        print("Resultado de validación:", {"valid": result["valid"], "errors": result.get("errors")})
         if not result["valid"]:
             return {
                 "statusCode": 400,
                 "headers": {
                     "Content-Type": "application/json"
                 },
-                'body':json.dumps({
+                'body':json_dumps({
                     'error':'Error en la validacion de datos',
                     'message':result["errors"]
                 })
@@ -126,7 +271,8 @@ def lambda_handler(event,context):
         
         enviroment = os.getenv("ENV")
         enviroment = "dev" if enviroment is None else enviroment
-        config_file = load_yaml_file(f"config-{enviroment}.yml")
+        with spans.span("config"):
+            config_file = load_yaml_file(f"config-{enviroment}.yml")
 
 
         if config_file is None:
@@ -136,7 +282,7 @@ def lambda_handler(event,context):
                 "   Content-Type":"application/json",
                 
                 },
-            '   body':json.dumps({
+            '   body':json_dumps({
                     'codigoError':7011,
                     'message':'Error al cargar el archivo de configuracion',
                     'messageId':'',
@@ -152,12 +298,13 @@ def lambda_handler(event,context):
             unique_id = str(uuid.uuid4())
             timestamp = datetime.datetime.utcnow().isoformat()
             s3_key:str = f"{BUCKET_PREFIX}/message_{timestamp}_{unique_id}.json"
-            s3_client.put_object(
-                Bucket=BUCKET_NAME,
-                Key=s3_key,
-                Body=json.dumps(data),
-                ContentType='application/json'
-            )
+            with spans.span("s3_put"):
+                get_client('s3').put_object(
+                    Bucket=BUCKET_NAME,
+                    Key=s3_key,
+                    Body=json_dumps(data),
+                    ContentType='application/json'
+                )
             s3_path = f"s3://{BUCKET_NAME}/{s3_key}"
             logger.info(f"Notificación enviada a S3: {s3_path}")  
             return {
@@ -166,7 +313,7 @@ def lambda_handler(event,context):
                 "Content-Type":"application/json",
                 
                 },
-                'body':json.dumps({
+                'body':json_dumps({
                     'codigoError':0,
                     'message':'Notificacion enviada correctamente',
                     'messageId':unique_id,
@@ -179,7 +326,7 @@ def lambda_handler(event,context):
                 "headers":{
                     "Content-Type":"application/json",          
                 },
-                'body':json.dumps({
+                'body':json_dumps({
                 'codigoError':69,
                 'message':'Hubo un error al enviar la notificacion, vuelva a intentarlo mas tarde',
                 'messageId':'',
@@ -1,7 +1,3 @@
-from jsonschema import validate, ValidationError
-from jsonschema.exceptions import SchemaError
-from jsonschema import Draft7Validator
-
 # Esquema JSON Schema generado a partir del ejemplo
 event_schema = {
     "type": "object",
@@ -120,7 +116,10 @@ def validate_request(event):
     """
     Valida la estructura del evento recibido.
     Retorna el JSON validado y una lista de errores (si hay).
+    jsonschema se importa en la primera validacion, no al cargar la Lambda.
     """
+    from jsonschema import Draft7Validator
+
     validator = Draft7Validator(event_schema)
     errors = sorted(validator.iter_errors(event), key=lambda e: e.path)
 
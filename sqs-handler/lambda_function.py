@@ -1,20 +1,180 @@
+import importlib.util
 import json
 import os
-import boto3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
 import logging
-import yaml
+import math
+import random
 import datetime
-import requests
-import pytz
-from requests.adapters import HTTPAdapter
-from urllib3.util import Retry
+import gzip
 
-
-sqs = boto3.client('sqs')
-s3 = boto3.client('s3')
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 BUCKET_NAME = os.getenv("CONFIG_BUCKET_NAME") or "bb-emisormdp-config"
+OAUTH_REFRESH_MARGIN_SECONDS = float(os.getenv("OAUTH_REFRESH_MARGIN_SECONDS") or 60)
+OAUTH_DEFAULT_EXPIRES_IN = 3600
+CLAIM_CHECK_ENCODING = "gzip"
+CLAIM_CHECK_ATTRIBUTE = "ClaimCheck"
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE") or "NotificacionesColas"
+FUNCTION_NAME = os.getenv("AWS_LAMBDA_FUNCTION_NAME") or "sqs-handler"
+UNKNOWN_DIMENSION = "NA"
+# Nombre del bucket en el almacen compartido; la tabla es la misma del circuit breaker
+RATE_LIMITER_NAME = "latinia-rate-limit"
+DEFAULT_RATE_PER_SECOND = 50.0
+DEFAULT_RATE_LIMIT_MAX_WAIT_MS = 2000
+DEFAULT_LANE = "default"
+DEFAULT_DRAIN_CONCURRENCY = 1
+DRAIN_ENGINE_THREADS = "threads"
+DRAIN_ENGINE_ASYNCIO = "asyncio"
+DRAIN_ENGINES = (DRAIN_ENGINE_THREADS, DRAIN_ENGINE_ASYNCIO)
+LATINIA_RETRY_STATUSES = (500, 502, 503, 504)
+LATINIA_SESSION_HEADERS = {
+    'User-Agent': 'Lambda-Notification-Service/1.0',
+    'Accept': 'application/json',
+}
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS") or 50)
+RECEIVE_MAX_MESSAGES = 10
+RECEIVE_WAIT_SECONDS = 5
+ACK_BATCH_SIZE = 10
+SQS_EVENT_SOURCE = "aws:sqs"
+DEFAULT_DRAIN_SAFETY_MARGIN_MS = 15000
+# Tiempo que se reserva al final de la invocacion para eliminar y liberar mensajes
+DRAIN_CLOSE_RESERVE_MS = 2000
+MIN_REQUEST_SECONDS = 0.2
+DEFAULT_VISIBILITY_TIMEOUT_SECONDS = 30
+VISIBILITY_CHECK_INTERVAL_SECONDS = 1.0
+DEFAULT_ACK_FLUSH_INTERVAL_MS = 500
+ACK_MAX_ATTEMPTS = 3
+ACK_RETRY_BACKOFF_SECONDS = 0.1
+
+
+class OAuthTokenCache:
+    """
+    Cache de tokens de acceso OAuth (client credentials) por endpoint y secreto.
+
+    El token se reutiliza hasta refresh_margin_seconds antes de su expires_in.
+    Dentro de ese margen un solo hilo lo renueva mientras los demas siguen
+    usando el token vigente; si el token ya expiro, los demas esperan el
+    resultado del hilo que lo renueva (single-flight).
+    """
+
+    def __init__(self, refresh_margin_seconds: float = OAUTH_REFRESH_MARGIN_SECONDS):
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._entries: Dict[Any, Dict[str, Any]] = {}
+        self._locks: Dict[Any, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, fetch_token: Callable[[], dict], force_refresh: bool = False) -> str:
+        """
+        Obtiene un token vigente, solicitandolo solo cuando es necesario.
+
+        Args:
+            key: Identificador del token, por ejemplo (url_auth, secret_id)
+            fetch_token (Callable): Funcion que solicita un token nuevo y retorna
+                la respuesta de OAuth con access_token y expires_in
+            force_refresh (bool): Descarta el token actual
+
+        Returns:
+            str: access_token
+        """
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry and not force_refresh:
+            if now < entry["refresh_at"]:
+                return entry["access_token"]
+            if now < entry["expires_at"]:
+                lock = self._key_lock(key)
+                if not lock.acquire(blocking=False):
+                    return entry["access_token"]
+                try:
+                    return self._refresh(key, fetch_token)
+                finally:
+                    lock.release()
+
+        requested_at = now
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry and entry["loaded_at"] >= requested_at:
+                return entry["access_token"]
+            if entry and not force_refresh and time.monotonic() < entry["refresh_at"]:
+                return entry["access_token"]
+            return self._refresh(key, fetch_token)
+
+    def invalidate(self, key=None, access_token: str = None):
+        """
+        Descarta un token, por ejemplo cuando el servicio responde 401.
+        Si se indica access_token solo se descarta si sigue siendo el vigente.
+        """
+        if key is None:
+            self._entries.clear()
+            return
+        entry = self._entries.get(key)
+        if entry and (access_token is None or entry["access_token"] == access_token):
+            self._entries.pop(key, None)
+
+    def _refresh(self, key, fetch_token: Callable[[], dict]) -> str:
+        token_data = fetch_token()
+        access_token = token_data.get("access_token")
+        if not access_token:
+            raise ValueError("No se pudo obtener el access_token de la respuesta de OAuth")
+        expires_in = float(token_data.get("expires_in") or OAUTH_DEFAULT_EXPIRES_IN)
+        loaded_at = time.monotonic()
+        margin = min(self.refresh_margin_seconds, expires_in / 2)
+        self._entries[key] = {
+            "access_token": access_token,
+            "loaded_at": loaded_at,
+            "refresh_at": loaded_at + expires_in - margin,
+            "expires_at": loaded_at + expires_in,
+        }
+        return access_token
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+
+oauth_token_cache = OAuthTokenCache()
+
+
+_clients: Dict[Tuple[str, Any], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(service_name: str, region_name: str = None):
+    """
+    Cliente de boto3 creado en el primer uso y reutilizado entre invocaciones.
+    boto3 se importa solo cuando alguna ruta necesita un cliente, no al
+    importar el modulo de la Lambda.
+
+    Args:
+        service_name (str): Servicio de AWS (s3, sqs, secretsmanager, ...)
+        region_name (str): Region del cliente; por defecto la de la Lambda
+    """
+    key = (service_name, region_name)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                import boto3
+                from botocore.config import Config
+
+                # Los hilos del drenado comparten el cliente (delete_message)
+                client = boto3.client(service_name, region_name=region_name, config=Config(max_pool_connections=AWS_MAX_POOL_CONNECTIONS))
+                _clients[key] = client
+    return client
 
 
 def get_secret(secret_name: str, region_name: str = "us-east-1") -> dict:
@@ -28,8 +188,7 @@ def get_secret(secret_name: str, region_name: str = "us-east-1") -> dict:
     Returns:
         dict: Contenido del secreto como un diccionario.
     """
-    session = boto3.session.Session()
-    client = session.client(service_name='secretsmanager', region_name=region_name)
+    client = get_client('secretsmanager', region_name)
     
     try:
         get_secret_value_response = client.get_secret_value(SecretId=secret_name)
@@ -40,39 +199,107 @@ def get_secret(secret_name: str, region_name: str = "us-east-1") -> dict:
         raise
 
 
-def create_session(reintentos:int = 3,backoff_factor:float = 0.5,):
+def create_session(reintentos:int = 3,backoff_factor:float = 0.5,pool_connections:int = 10,pool_maxsize:int = 10):
     """
     crear una sesion de requests con reintentos
     y manejo de errores para las peticiones HTTP.
     Args:
         reintentos (int): cantidad de reintentos
         backoff_factor (float): factor de retroceso para los reintentos
+        pool_connections (int): cantidad de pools de conexiones (hosts) a mantener
+        pool_maxsize (int): conexiones keep-alive maximas por host
     """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import Retry
+
     session = requests.Session()
     retry_reintentos = Retry(
         total=reintentos,
         backoff_factor=backoff_factor,
-        status_forcelist=[500, 502, 503, 504],
+        status_forcelist=list(LATINIA_RETRY_STATUSES),
         raise_on_status=False,
         allowed_methods=["POST"],
         respect_retry_after_header=True
     )
-    adapter = HTTPAdapter(max_retries=retry_reintentos)
+    adapter = HTTPAdapter(max_retries=retry_reintentos,pool_connections=pool_connections,pool_maxsize=pool_maxsize)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
-    session.headers.update({
-        'User-Agent': 'Lambda-Notification-Service/1.0',
-        'Accept': 'application/json',
-        'Content-Type': 'application/json'
-    })
+    session.headers.update({**LATINIA_SESSION_HEADERS, 'Content-Type': 'application/json'})
     session.timeout = (10,10)
     return session
 
+
+_sessions: Dict[Tuple, "requests.Session"] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(url: str, reintentos: int = 3, backoff_factor: float = 0.5, pool_connections: int = 10, pool_maxsize: int = 10):
+    """
+    Obtiene la sesion de requests del host de la url, reutilizada entre
+    invocaciones para conservar las conexiones keep-alive (TLS) abiertas.
+    Args:
+        url (str): url a la que se enviaran las peticiones
+        reintentos (int): cantidad de reintentos
+        backoff_factor (float): factor de retroceso para los reintentos
+        pool_connections (int): cantidad de pools de conexiones a mantener
+        pool_maxsize (int): conexiones keep-alive maximas por host
+    """
+    host = urlparse(url).netloc
+    session_key = (host, reintentos, backoff_factor, pool_connections, pool_maxsize)
+    session = _sessions.get(session_key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(session_key)
+            if session is None:
+                session = create_session(reintentos, backoff_factor, pool_connections, pool_maxsize)
+                _sessions[session_key] = session
+    return session
+
+
+def get_pool_config(config_file: dict) -> Dict[str, int]:
+    """
+    Obtiene el tamaño de los pools de conexiones desde lambda.backoff
+    Args:
+        config_file (dict): archivo de configuracion
+    """
+    backoff = config_file["lambda"]["backoff"]
+    return {
+        "pool_connections": int(backoff.get("pool_connections", 10)),
+        "pool_maxsize": int(backoff.get("pool_maxsize", 10)),
+    }
+
+
+def get_connection_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Contadores de reutilizacion de conexiones por host de las sesiones compartidas.
+    requests son las peticiones enviadas, connections las conexiones nuevas
+    abiertas y reused las peticiones que usaron una conexion existente
+    """
+    stats: Dict[str, Dict[str, Any]] = {}
+    for session in list(_sessions.values()):
+        adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for pool_key in list(pools.keys()):
+                pool = pools.get(pool_key)
+                if pool is None:
+                    continue
+                host_stats = stats.setdefault(pool.host, {"requests": 0, "connections": 0})
+                host_stats["requests"] += pool.num_requests
+                host_stats["connections"] += pool.num_connections
+    for host_stats in stats.values():
+        host_stats["reused"] = max(host_stats["requests"] - host_stats["connections"], 0)
+        host_stats["reuse_ratio"] = round(host_stats["reused"] / host_stats["requests"], 4) if host_stats["requests"] else 0.0
+    return stats
+
 def load_yaml_file(config_path):
     """
     Carga del archivo yaml de configuracion
     """
-    response = s3.get_object(Bucket=BUCKET_NAME, Key=config_path)
+    import yaml
+
+    response = get_client('s3').get_object(Bucket=BUCKET_NAME, Key=config_path)
     config_data = response['Body'].read().decode('utf-8')
     print(f"Configuracion cargada desde S3: {BUCKET_NAME}/{config_path}")
     try:
@@ -84,47 +311,400 @@ def load_yaml_file(config_path):
         print(f"Error al cargar el archivo de configuracion: {e}")
         raise
 
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def json_dumps_bytes(value, pretty: bool = False) -> bytes:
+    """
+    Serializa a JSON en UTF-8 con orjson si esta instalado, o con json de la
+    libreria estandar si no lo esta o si orjson no soporta el valor
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        try:
+            return orjson.dumps(value, default=str, option=option)
+        except TypeError:
+            pass
+    return _stdlib_json_dumps(value, pretty).encode("utf-8")
+
+
+def json_dumps(value, pretty: bool = False) -> str:
+    """
+    Serializa a JSON como str, con caracteres no ASCII sin escapar
+    """
+    if orjson is not None:
+        return json_dumps_bytes(value, pretty).decode("utf-8")
+    return _stdlib_json_dumps(value, pretty)
+
+
+def json_loads(data):
+    """
+    Deserializa JSON desde str o bytes. Los errores son json.JSONDecodeError
+    (orjson.JSONDecodeError hereda de esa clase)
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _stdlib_json_dumps(value, pretty: bool) -> str:
+    if pretty:
+        return json.dumps(value, ensure_ascii=False, default=str, indent=2)
+    return json.dumps(value, ensure_ascii=False, default=str, separators=(",", ":"))
+
+
+def put_metrics(metrics: Dict[str, float], unit: str = "Milliseconds", dimensions: Dict[str, str] = None, dimension_sets: List[List[str]] = None) -> dict:
+    """
+    Publica varias metricas con las mismas dimensiones en un solo documento
+    EMF (Embedded Metric Format) escrito en stdout
+    """
+    dimensions = {k: str(v) for k, v in (dimensions or {}).items()}
+    document = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": dimension_sets or [list(dimensions.keys())],
+                "Metrics": [{"Name": name, "Unit": unit} for name in metrics],
+            }],
+        },
+        **metrics,
+        **dimensions,
+    }
+    print(json_dumps(document))
+    return document
+
+
+def stage_metric_name(stage: str) -> str:
+    """Nombre de la metrica de una etapa: claim_check -> ClaimCheckTime"""
+    return "".join(part[:1].upper() + part[1:] for part in stage.split("_")) + "Time"
+
+
+class InvocationSpans:
+    """
+    Tiempos por etapa de un mensaje (o de un drenado de la cola), publicados
+    al final como un solo documento EMF con dimensiones Function, Nemonic y
+    Outcome. Los tiempos de una etapa repetida se suman.
+    """
+
+    def __init__(self, function_name: str = FUNCTION_NAME, clock: Callable[[], float] = time.perf_counter):
+        self.function_name = function_name
+        self.clock = clock
+        self.started = clock()
+        self.stages: Dict[str, float] = {}
+        self.nemonic = UNKNOWN_DIMENSION
+        self.outcome = None
+        self.emitted = False
+
+    @contextmanager
+    def span(self, stage: str):
+        start = self.clock()
+        try:
+            yield self
+        finally:
+            self.record(stage, (self.clock() - start) * 1000)
+
+    def record(self, stage: str, elapsed_ms: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed_ms
+
+    def set_nemonic(self, nemonic):
+        self.nemonic = str(nemonic) if nemonic else UNKNOWN_DIMENSION
+
+    def emit(self, outcome: str = None) -> dict:
+        if self.emitted:
+            return {}
+        self.emitted = True
+        metrics = {stage_metric_name(stage): round(elapsed_ms, 3) for stage, elapsed_ms in self.stages.items()}
+        metrics["InvocationTime"] = round((self.clock() - self.started) * 1000, 3)
+        return put_metrics(
+            metrics,
+            "Milliseconds",
+            {"Function": self.function_name, "Nemonic": self.nemonic, "Outcome": self.outcome or outcome or UNKNOWN_DIMENSION},
+            dimension_sets=[["Function", "Outcome"], ["Function", "Nemonic", "Outcome"]],
+        )
+
+
+class MemoryBucketStore:
+    """
+    Almacen en memoria del limitador. Es el respaldo local cuando el almacen
+    compartido no responde.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def update(self, name: str, burst: float, now: float, mutate: Callable[[dict], dict]) -> dict:
+        with self._lock:
+            current = self._buckets.get(name) or {"tokens": float(burst), "updated_at": now, "version": 0}
+            new_state = mutate(dict(current))
+            new_state["version"] = current["version"] + 1
+            self._buckets[name] = new_state
+            return dict(new_state)
+
+
+class DynamoDBBucketStore:
+    """
+    Almacen del limitador en DynamoDB (llave de particion "name"), compartido
+    con la Lambda de ingreso. Las escrituras usan una condicion sobre la version.
+    """
+
+    def __init__(self, table_name: str, max_attempts: int = 5):
+        self.table_name = table_name
+        self.max_attempts = max_attempts
+
+    def update(self, name: str, burst: float, now: float, mutate: Callable[[dict], dict]) -> dict:
+        from botocore.exceptions import ClientError
+
+        client = get_client('dynamodb')
+        for attempt in range(self.max_attempts):
+            item = client.get_item(TableName=self.table_name, Key={"name": {"S": name}}, ConsistentRead=True).get("Item")
+            if item:
+                current = {
+                    "tokens": float(item["tokens"]["N"]),
+                    "updated_at": float(item["updated_at"]["N"]),
+                    "version": int(item["version"]["N"]),
+                }
+                condition = {
+                    "ConditionExpression": "version = :version",
+                    "ExpressionAttributeValues": {":version": {"N": str(current["version"])}},
+                }
+            else:
+                current = {"tokens": float(burst), "updated_at": now, "version": 0}
+                condition = {"ConditionExpression": "attribute_not_exists(#n)", "ExpressionAttributeNames": {"#n": "name"}}
+            new_state = mutate(dict(current))
+            new_state["version"] = current["version"] + 1
+            try:
+                client.put_item(
+                    TableName=self.table_name,
+                    Item={
+                        "name": {"S": name},
+                        "tokens": {"N": repr(float(new_state["tokens"]))},
+                        "updated_at": {"N": repr(float(new_state["updated_at"]))},
+                        "version": {"N": str(new_state["version"])},
+                    },
+                    **condition,
+                )
+                return new_state
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+        # Demasiada contencion: se niegan los tokens en lugar de esperar
+        return None
+
+
+class TokenBucket:
+    """
+    Limitador de tasa token bucket hacia Latinia (misma logica que
+    utils/rate_limiter.py de la Lambda de ingreso). Si el almacen compartido
+    falla se usa un bucket local con fallback_rate_per_second.
+    """
+
+    def __init__(self, name: str, rate_per_second: float, burst: float, store=None, lease_size: int = 1,
+                 fallback_rate_per_second: float = None, clock: Callable[[], float] = time.time):
+        self.name = name
+        self.rate = float(rate_per_second)
+        self.burst = max(1.0, float(burst))
+        self.store = store or MemoryBucketStore()
+        self.lease_size = max(1, int(lease_size))
+        self.fallback_rate = float(fallback_rate_per_second if fallback_rate_per_second is not None else rate_per_second)
+        self.clock = clock
+        self._fallback_store = MemoryBucketStore()
+        self._leased = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._leased > 0:
+                self._leased -= 1
+                return True
+        granted = self._take(self.lease_size)
+        if not granted:
+            put_metrics({"RateLimited": 1}, "Count", {"Limiter": self.name})
+            return False
+        if granted > 1:
+            with self._lock:
+                self._leased += granted - 1
+        return True
+
+    def acquire(self, timeout_seconds: float, sleep: Callable[[float], None] = time.sleep) -> bool:
+        """
+        Toma un token esperando como maximo timeout_seconds
+        """
+        deadline = time.monotonic() + max(0.0, timeout_seconds)
+        while True:
+            if self.try_acquire():
+                return True
+            wait = min(1.0 / self.rate if self.rate > 0 else 1.0, deadline - time.monotonic())
+            if wait <= 0:
+                return False
+            sleep(wait)
+
+    def _take(self, count: int) -> int:
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        now = self.clock()
+        try:
+            return self._take_from(self.store, self.rate, count, now)
+        except (ClientError, BotoCoreError) as e:
+            print(f"No se pudo usar el almacen del limitador {self.name}, se usa el bucket local: {e}")
+            return self._take_from(self._fallback_store, self.fallback_rate, count, now)
+
+    def _take_from(self, store, rate: float, count: int, now: float) -> int:
+        result = {}
+
+        def take(current):
+            tokens = min(self.burst, current["tokens"] + max(0.0, now - current["updated_at"]) * rate)
+            result["granted"] = min(count, math.floor(tokens))
+            current.update(tokens=tokens - result["granted"], updated_at=now)
+            return current
+
+        if store.update(self.name, self.burst, now, take) is None:
+            return 0
+        return result["granted"]
+
+
+_rate_limiters = {}
+
+
+def get_rate_limiter(config_file: dict):
+    """
+    Limitador hacia Latinia segun la seccion opcional latinia.rate_limit del
+    YAML (la misma que usa la Lambda de ingreso). None si no esta habilitado
+    """
+    settings = config_file["latinia"].get("rate_limit") or {}
+    if not settings.get("enabled", False):
+        return None
+    key = json.dumps(settings, sort_keys=True, default=str)
+    if key not in _rate_limiters:
+        store = (settings.get("store") or "memory").lower()
+        if store not in ("dynamodb", "memory"):
+            raise ValueError(f"Almacen de limitador no soportado: {store}")
+        rate = float(settings.get("rate_per_second", DEFAULT_RATE_PER_SECOND))
+        _rate_limiters[key] = TokenBucket(
+            RATE_LIMITER_NAME,
+            rate_per_second=rate,
+            burst=float(settings.get("burst", rate)),
+            store=DynamoDBBucketStore(settings["table_name"]) if store == "dynamodb" else MemoryBucketStore(),
+            lease_size=int(settings.get("lease_size", 1)),
+            fallback_rate_per_second=settings.get("fallback_rate_per_second"),
+        )
+    return _rate_limiters[key]
+
+
+DEFAULT_PAYLOAD_SAMPLE_RATE = 0.1
+DEFAULT_PAYLOAD_MAX_CHARS = 4096
+PAYLOAD_OMITTED = "<omitido por muestreo>"
+
+_logger_configured = None
+_payload_settings = {"sample_rate": DEFAULT_PAYLOAD_SAMPLE_RATE, "max_chars": DEFAULT_PAYLOAD_MAX_CHARS}
+_payload_sampled = True
+
+
+class LazyJson:
+    """
+    Serializa el valor a JSON solo cuando el registro de log se emite.
+    Se usa como argumento de logger (logger.info("...: %s", LazyJson(valor)))
+    para no pagar la serializacion en registros filtrados por nivel. El texto se
+    recorta a max_chars.
+    """
+
+    __slots__ = ("value", "max_chars")
+
+    def __init__(self, value, max_chars: int = DEFAULT_PAYLOAD_MAX_CHARS):
+        self.value = value
+        self.max_chars = max_chars
+
+    def __str__(self):
+        text = json_dumps(self.value)
+        if self.max_chars and len(text) > self.max_chars:
+            return f"{text[:self.max_chars]}...(+{len(text) - self.max_chars} caracteres)"
+        return text
+
+    __repr__ = __str__
+
+
 def config_logger(config_file:dict):
     """
-    configuracion del logger de la aplicacion lambda
+    configuracion del logger de la aplicacion lambda, una sola vez por contenedor.
+    Se reutiliza el handler del runtime de Lambda para no duplicar lineas y en
+    cada invocacion se decide si se registran payloads (logging.payload_sample_rate)
     Args:
         config_file (dict): archivo de configuracion
     """
+    global _logger_configured, _payload_sampled
+    settings = config_file["logging"]
+    log_format = settings["format"]
+    level = logging.getLevelName(str(settings.get("level", "INFO")).upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+
     logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    formatter = logging.Formatter(config_file["logging"]["format"])
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
-    error_handler = logging.StreamHandler()
-    error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(formatter)
-    logger.addHandler(error_handler)
-    warn_handler = logging.StreamHandler()
-    warn_handler.setLevel(logging.WARNING)
-    warn_handler.setFormatter(formatter)
-    logger.addHandler(warn_handler)
-    logger.info("Logger configurado correctamente")
+    if _logger_configured != (log_format, level):
+        if not logger.handlers:
+            logger.addHandler(logging.StreamHandler())
+        formatter = logging.Formatter(log_format)
+        for handler in logger.handlers:
+            handler.setFormatter(formatter)
+        logger.setLevel(level)
+        _logger_configured = (log_format, level)
+        logger.info("Logger configurado correctamente")
+
+    _payload_settings["sample_rate"] = float(settings.get("payload_sample_rate", DEFAULT_PAYLOAD_SAMPLE_RATE))
+    _payload_settings["max_chars"] = int(settings.get("payload_max_chars", DEFAULT_PAYLOAD_MAX_CHARS))
+    _payload_sampled = random.random() < _payload_settings["sample_rate"]
     return logger
 
+def log_payload(value):
+    """
+    Argumento de log para un payload: se serializa de forma diferida si la
+    invocacion fue muestreada y se omite en caso contrario
+    """
+    if not _payload_sampled:
+        return PAYLOAD_OMITTED
+    return LazyJson(value, _payload_settings["max_chars"])
+
 def get_proccess_date():
 
     """
     Obtener la fecha y hora actual
     """
+    import pytz
+
     ecuador_timezone = pytz.timezone("America/Guayaquil")
     return datetime.datetime.now(ecuador_timezone).strftime('%Y-%m-%d %H:%M:%S')
 
-def get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger):
+def get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger, force_refresh=False, deadline=None):
     """
-    Obtiene el token de autenticación de Latinia
+    Obtiene el token de autenticación de Latinia.
+    El token se reutiliza entre mensajes hasta poco antes de su expiracion
     Args:
         latinia_url_auth (str): URL de autenticación de Latinia
         latinia_secret_id_oauth (str): ID del secreto de OAuth en AWS Secrets Manager
         logger (Logger): Logger configurado para la aplicación
+        force_refresh (bool): descarta el token en cache, por ejemplo ante un 401
+        deadline (DrainDeadline): limita el timeout de la solicitud de un token nuevo
     Returns:
         str: Token de autenticación
     """
+    return oauth_token_cache.get(
+        (latinia_url_auth, latinia_secret_id_oauth),
+        lambda: request_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger, deadline),
+        force_refresh=force_refresh,
+    )
+
+def request_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger, deadline=None):
+    """
+    Solicita un token nuevo al endpoint de OAuth de Latinia
+    Args:
+        latinia_url_auth (str): URL de autenticación de Latinia
+        latinia_secret_id_oauth (str): ID del secreto de OAuth en AWS Secrets Manager
+        logger (Logger): Logger configurado para la aplicación
+        deadline (DrainDeadline): con limite de tiempo la solicitud no se
+            reintenta y su timeout se acota al tiempo restante de la invocacion
+    Returns:
+        dict: Respuesta de OAuth con access_token y expires_in
+    """
 
     try:
         logger.info("Obteniendo token de OAuth para Latinia")
@@ -136,7 +716,7 @@ def get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger):
         
         logger.info(f"Secreto de OAuth obtenido: {latinia_secret_id_oauth}")
 
-        session = create_session()
+        session = get_session(latinia_url_auth, 0) if deadline is not None else get_session(latinia_url_auth)
 
 
         auth_data = {
@@ -161,7 +741,7 @@ def get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger):
             data=auth_data,
             headers=headers,
             auth=(secret.get("client_id"), secret.get("client_secret")),
-            timeout=30
+            timeout=request_timeout(30, deadline)
         )
         logger.info(f"Respuesta de autenticación OAuth: {response.status_code}")
         response.raise_for_status()
@@ -173,57 +753,89 @@ def get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger):
             raise ValueError("No se pudo obtener el access_token de la respuesta de OAuth")
         
 
-        return access_token
+        return token_data
     except Exception as e:
         logger.error(f"Error al obtener el token de OAuth: {e}", exc_info=True)
         raise
 
 
 def lambda_handler(event,context):
+    """
+    Dos modos de entrada: con un evento del trigger de SQS (Records) envia
+    esos mensajes y responde batchItemFailures; con cualquier otro evento
+    (drenado programado) lee los carriles hasta vaciarlos
+    """
     fecha_proceso = get_proccess_date()
     print(f"Fecha de proceso: {fecha_proceso}")
     enviroment = os.getenv("ENV")
     enviroment = "dev" if enviroment is None else enviroment
     config_file = load_yaml_file(f"config-{enviroment}.yml")
     logger = config_logger(config_file)
+    records = get_sqs_records(event)
     if config_file is None:
         logger.error("No se pudo cargar el archivo de configuracion")
+        if records:
+            # Todo el lote vuelve a la cola
+            raise RuntimeError("No se pudo cargar el archivo de configuracion")
         return {
             "statusCode": 500,
             "headers": {
                 'Content-Type': 'application/json'
             },
-            'body': json.dumps({
+            'body': json_dumps({
                 'codigoError': 60001,
                 'message': 'Error al cargar el archivo de configuracion',
                 'timestamp': get_proccess_date(),
             })
         }
-    logger.info(f"Evento recibido: {event}")
+    logger.info("Evento recibido: %s", log_payload(event))
     queue_url = config_file["sqs"]["queue_url"]
+    lanes = get_lanes(config_file)
     parametro_mantenimiento = config_file["latinia"]["mantenimiento"]
     latinia_url = config_file["latinia"]["url"]
     reintentos = int(config_file["lambda"]["backoff"]["max_retries"])
     backoff_factor = float(config_file["lambda"]["backoff"]["backoff_factor"])
     latinia_secret_id_oauth = config_file["latinia"]["secret_name_oauth"]
     latinia_url_auth = config_file["latinia"]["auth"]
+    deadline = get_drain_deadline(config_file, context)
 
     try:
         if parametro_mantenimiento is True:
             logger.info("El servicio de Latinia esta en mantenimiento, no se procesaran mensajes")
+            if records:
+                return batch_item_failures([record.get('messageId') for record in records])
             return {
                 "statusCode": 503,
                 "headers": {'Content-Type': 'application/json'},
-                'body': json.dumps({
+                'body': json_dumps({
                     'codigoError': 60003,
                     'message': 'El servicio de Latinia está en mantenimiento, no se procesarán mensajes',
                     'timestamp': get_proccess_date(),
                 })
             }
-        get_queue_attributes(queue_url, logger)
-
+        if records:
+            drain_config = get_drain_config(config_file)
+            return process_sqs_records(
+                records,
+                lanes=lanes,
+                latinia_url=latinia_url,
+                reintentos=reintentos,
+                backoff_factor=backoff_factor,
+                timeout_seconds=config_file["lambda"]["timeout_seconds"],
+                logger=logger,
+                latinia_secret_id_oauth=latinia_secret_id_oauth,
+                latinia_url_auth=latinia_url_auth,
+                rate_limiter=get_rate_limiter(config_file),
+                rate_limit_max_wait_ms=float((config_file["latinia"].get("rate_limit") or {}).get("max_wait_ms", DEFAULT_RATE_LIMIT_MAX_WAIT_MS)),
+                concurrency=drain_config["concurrency"],
+                engine=drain_config["engine"],
+                visibility_timeout_seconds=drain_config["visibility_timeout_seconds"],
+                deadline=deadline,
+                **get_pool_config(config_file),
+            )
         stats = process_all_messages_and_send_to_latinia(
             queue_url=queue_url,
+            lanes=lanes,
             latinia_url=latinia_url,
             reintentos=reintentos,
             backoff_factor=backoff_factor,
@@ -231,11 +843,16 @@ def lambda_handler(event,context):
             logger=logger,
             latinia_secret_id_oauth=latinia_secret_id_oauth,
             latinia_url_auth=latinia_url_auth,
+            rate_limiter=get_rate_limiter(config_file),
+            rate_limit_max_wait_ms=float((config_file["latinia"].get("rate_limit") or {}).get("max_wait_ms", DEFAULT_RATE_LIMIT_MAX_WAIT_MS)),
+            deadline=deadline,
+            **get_pool_config(config_file),
+            **get_drain_config(config_file),
         )
         return {
             "statusCode": 200,
             "headers": {'Content-Type': 'application/json'},
-            'body': json.dumps({
+            'body': json_dumps({
                 'codigoError': 0,
                 'message': f'Procesamiento completado: {stats["successful_sends"]} exitosos, {stats["failed_sends"]} fallidos',
                 'stats': stats,
@@ -244,19 +861,21 @@ def lambda_handler(event,context):
         }
     except Exception as e:
         logger.error(f"Error al procesar los mensajes de la cola: {e}", exc_info=True)
+        if records:
+            return batch_item_failures([record.get('messageId') for record in records])
         return {
             "statusCode": 500,
             "headers": {
                 'Content-Type': 'application/json'
             },
-            'body': json.dumps({
+            'body': json_dumps({
                 'codigoError': 60002,
                 'message': 'Error al procesar los mensajes de la cola',
                 'timestamp': get_proccess_date(),
             })
         }
 
-def send_notification_to_latinia(latinia_url, body, session, timeout_seconds, logger, latinia_secret_id_oauth, latinia_url_auth):
+def send_notification_to_latinia(latinia_url, body, session, timeout_seconds, logger, latinia_secret_id_oauth, latinia_url_auth, deadline=None, rate_limiter=None):
     """
     Envio de notificacion a latinia
     Args:
@@ -265,31 +884,42 @@ def send_notification_to_latinia(latinia_url, body, session, timeout_seconds, lo
         session (Session): sesion de requests con configuracion de reintentos
         timeout_seconds (int): timeout en segundos
         logger: logger configurado
+        deadline (DrainDeadline): acota el timeout de cada solicitud al tiempo
+            restante de la invocacion
+        rate_limiter (TokenBucket): limitador de Latinia; el primer envio ya
+            tomo su token y el reenvio tras un 401 toma otro. Sin token no se
+            reenvia
     """
-    
+    import requests
+
     req_session = session
     try:
         logger.info(f"Enviando notificación a Latinia: {latinia_url}")
-        logger.info(f"Payload a enviar: {json.dumps(body, indent=2, ensure_ascii=False)}")
-        oauth_token = get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger)
+        logger.info("Payload a enviar: %s", log_payload(body))
+        oauth_token = get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger, deadline=deadline)
+        # El body se serializa una sola vez y se reutiliza si hay que reintentar
+        data = json_dumps_bytes(body)
         
         response = req_session.post(
             url=latinia_url,
-            json=body,
-            timeout=timeout_seconds,
-            headers={"Authorization": f"Bearer {oauth_token}"}
+            data=data,
+            timeout=request_timeout(timeout_seconds, deadline),
+            headers={"Authorization": f"Bearer {oauth_token}", "Content-Type": "application/json"}
         )
         
-        logger.info(f"Respuesta de Latinia: {response.status_code} - {response.text}")
+        logger.info("Respuesta de Latinia: %s - %s", response.status_code, log_payload(response.text))
+        if response.status_code == 401 and (rate_limiter is None or rate_limiter.try_acquire()):
+            logger.warning("Latinia rechazo el token de OAuth. Se solicita un token nuevo")
+            oauth_token = get_oauth_token(latinia_url_auth, latinia_secret_id_oauth, logger, force_refresh=True, deadline=deadline)
+            response = req_session.post(
+                url=latinia_url,
+                data=data,
+                timeout=request_timeout(timeout_seconds, deadline),
+                headers={"Authorization": f"Bearer {oauth_token}", "Content-Type": "application/json"}
+            )
+            logger.info("Respuesta de Latinia: %s - %s", response.status_code, log_payload(response.text))
         response.raise_for_status()
         
-        # Log de respuesta exitosa
-        try:
-            response_data = response.json()
-            logger.info(f"Respuesta JSON de Latinia: {json.dumps(response_data, indent=2, ensure_ascii=False)}")
-        except json.JSONDecodeError:
-            logger.info(f"Respuesta de Latinia (texto plano): {response.text}")
-            
         return response
         
     except requests.exceptions.ConnectionError as e:
@@ -305,6 +935,341 @@ def send_notification_to_latinia(latinia_url, body, session, timeout_seconds, lo
         logger.error("Error general al comunicarse con Latinia", exc_info=True, stack_info=True)
         raise
 
+def load_claim_check_payload(payload_ref: dict):
+    """
+    Lee y descomprime de S3 un payload encolado con claim-check
+
+    Args:
+        payload_ref (dict): referencia del mensaje (bucket, key, encoding)
+    """
+    response = get_client('s3').get_object(Bucket=payload_ref["bucket"], Key=payload_ref["key"])
+    data = response["Body"].read()
+    if payload_ref.get("encoding") == CLAIM_CHECK_ENCODING:
+        data = gzip.decompress(data)
+    return json_loads(data)
+
+
+def delete_claim_check_payload(message, logger):
+    """
+    Elimina de S3 el payload de un mensaje con claim-check ya entregado. Se
+    llama despues de borrar el mensaje de la cola: si el borrado del mensaje
+    falla, el reintento todavia encuentra el payload
+    """
+    attribute = message.get('MessageAttributes', {}).get(CLAIM_CHECK_ATTRIBUTE)
+    if not attribute:
+        return
+    location = urlparse(attribute['StringValue'])
+    try:
+        get_client('s3').delete_object(Bucket=location.netloc, Key=location.path.lstrip('/'))
+        logger.info(f"Payload {attribute['StringValue']} eliminado de S3")
+    except Exception as e:
+        logger.error(f"Error al eliminar el payload {attribute['StringValue']} de S3: {e}")
+
+
+class AckBuffer:
+    """
+    Confirmaciones (eliminaciones) pendientes de los mensajes enviados. Se
+    acumulan por cola y se eliminan con DeleteMessageBatch en grupos de
+    ACK_BATCH_SIZE, cuando la mas antigua supera flush_interval_seconds o al
+    cerrar el buffer. Las entradas que fallan se reintentan hasta
+    max_attempts veces; si aun asi fallan, el mensaje vuelve a la cola al
+    vencer su visibilidad.
+    """
+
+    def __init__(self, logger, flush_interval_seconds: float = DEFAULT_ACK_FLUSH_INTERVAL_MS / 1000, max_attempts: int = ACK_MAX_ATTEMPTS, clock: Callable[[], float] = time.monotonic):
+        self.logger = logger
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_attempts = max(1, int(max_attempts))
+        self.clock = clock
+        self.stats = {'deleted': 0, 'failed': 0, 'batches': 0}
+        self.elapsed_ms = 0.0
+        self._pending: Dict[str, List[Tuple[dict, float]]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Inicia el hilo que elimina las confirmaciones pendientes por tiempo
+        """
+        self._thread = threading.Thread(target=self._run, name="ack-flush", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """
+        Detiene el hilo y elimina todas las confirmaciones pendientes
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def add(self, queue_url: str, message: dict):
+        """
+        Registra un mensaje enviado. Si la cola completa un grupo, se elimina
+        en el hilo que llama
+        """
+        with self._lock:
+            pending = self._pending.setdefault(queue_url, [])
+            pending.append((message, self.clock()))
+            ready = None
+            if len(pending) >= ACK_BATCH_SIZE:
+                ready = [item for item, _ in pending[:ACK_BATCH_SIZE]]
+                del pending[:ACK_BATCH_SIZE]
+        if ready:
+            self._delete(queue_url, ready)
+
+    def flush(self, older_than: float = None):
+        """
+        Elimina las confirmaciones pendientes; con older_than solo las de las
+        colas cuya confirmacion mas antigua supera esos segundos
+        """
+        now = self.clock()
+        with self._lock:
+            ready = {}
+            for queue_url, pending in self._pending.items():
+                if pending and (older_than is None or now - pending[0][1] >= older_than):
+                    ready[queue_url] = [item for item, _ in pending]
+                    pending.clear()
+        for queue_url, messages in ready.items():
+            for start in range(0, len(messages), ACK_BATCH_SIZE):
+                self._delete(queue_url, messages[start:start + ACK_BATCH_SIZE])
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval_seconds / 2):
+            self.flush(older_than=self.flush_interval_seconds)
+
+    def _delete(self, queue_url: str, messages: List[dict]):
+        start = time.perf_counter()
+        entries = {str(index): message for index, message in enumerate(messages)}
+        deleted = failed = batches = 0
+        for attempt in range(self.max_attempts):
+            batches += 1
+            try:
+                response = get_client('sqs').delete_message_batch(
+                    QueueUrl=queue_url,
+                    Entries=[{'Id': entry_id, 'ReceiptHandle': message.get('ReceiptHandle')} for entry_id, message in entries.items()],
+                )
+            except Exception as e:
+                self.logger.error(f"Error al eliminar {len(entries)} mensajes de la cola {queue_url}: {e}")
+                response = {'Failed': [{'Id': entry_id, 'Code': type(e).__name__, 'SenderFault': False} for entry_id in entries]}
+            for item in response.get('Successful', []):
+                message = entries.pop(item['Id'])
+                self.logger.info(f"Mensaje {message.get('MessageId', 'N/A')} eliminado de la cola")
+                delete_claim_check_payload(message, self.logger)
+                deleted += 1
+            retry = {}
+            for item in response.get('Failed', []):
+                message = entries.pop(item['Id'])
+                if item.get('SenderFault'):
+                    # Receipt handle invalido o vencido: reintentar no sirve
+                    self.logger.error(f"No se pudo eliminar el mensaje {message.get('MessageId', 'N/A')}: {item.get('Code')} - {item.get('Message', '')}")
+                    failed += 1
+                else:
+                    retry[item['Id']] = message
+            entries = retry
+            if not entries:
+                break
+            if attempt + 1 < self.max_attempts:
+                time.sleep(ACK_RETRY_BACKOFF_SECONDS * (2 ** attempt))
+        for message in entries.values():
+            self.logger.error(f"No se pudo eliminar el mensaje {message.get('MessageId', 'N/A')} tras {self.max_attempts} intentos; vuelve a la cola al vencer su visibilidad")
+            failed += 1
+        with self._lock:
+            self.stats['deleted'] += deleted
+            self.stats['failed'] += failed
+            self.stats['batches'] += batches
+            self.elapsed_ms += (time.perf_counter() - start) * 1000
+
+
+class DrainDeadline:
+    """
+    Limite de tiempo del drenado: el tiempo restante de la invocacion menos
+    un margen para terminar los envios en curso y las confirmaciones
+    pendientes antes de que Lambda corte la ejecucion. Las solicitudes HTTP
+    de los envios en curso se acotan al fin de la invocacion menos
+    DRAIN_CLOSE_RESERVE_MS, aunque el margen no alcance para su timeout
+    """
+
+    def __init__(self, remaining_ms: float, safety_margin_ms: float = DEFAULT_DRAIN_SAFETY_MARGIN_MS, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        now = clock()
+        self.deadline = now + (remaining_ms - safety_margin_ms) / 1000
+        self.end = now + (remaining_ms - DRAIN_CLOSE_RESERVE_MS) / 1000
+
+    def remaining_seconds(self) -> float:
+        return self.deadline - self.clock()
+
+    def expired(self) -> bool:
+        return self.remaining_seconds() <= 0
+
+    def request_timeout(self, cap: float) -> float:
+        """
+        Timeout de la siguiente solicitud HTTP: cap, limitado al tiempo que
+        queda hasta el fin de la invocacion
+
+        Raises:
+            requests.exceptions.Timeout: si no queda al menos MIN_REQUEST_SECONDS
+        """
+        available = self.end - self.clock()
+        if available < MIN_REQUEST_SECONDS:
+            import requests
+
+            raise requests.exceptions.Timeout(f"Sin tiempo para la solicitud: quedan {available * 1000:.0f} ms de la invocacion")
+        return min(float(cap), available)
+
+
+def request_timeout(timeout_seconds: float, deadline: Optional[DrainDeadline] = None) -> float:
+    """
+    Timeout de una solicitud del envio a Latinia; con deadline se limita al
+    tiempo restante de la invocacion
+    """
+    if deadline is None:
+        return timeout_seconds
+    return deadline.request_timeout(timeout_seconds)
+
+
+def get_drain_deadline(config_file: dict, context) -> Optional[DrainDeadline]:
+    """
+    Limite del drenado a partir del contexto de la Lambda y de
+    sqs.drain.safety_margin_ms. Sin margen configurado se usa el necesario
+    para un envio a Latinia y su reintento tras un 401
+    (2 x lambda.timeout_seconds) mas el cierre del drenado, con un minimo de
+    DEFAULT_DRAIN_SAFETY_MARGIN_MS. Sin contexto (pruebas locales) no hay limite
+    """
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return None
+    drain = config_file["sqs"].get("drain") or {}
+    safety_margin_ms = drain.get("safety_margin_ms")
+    if safety_margin_ms is None:
+        timeout_seconds = float((config_file.get("lambda") or {}).get("timeout_seconds", 0))
+        safety_margin_ms = max(DEFAULT_DRAIN_SAFETY_MARGIN_MS, 2 * timeout_seconds * 1000 + DRAIN_CLOSE_RESERVE_MS)
+    return DrainDeadline(context.get_remaining_time_in_millis(), float(safety_margin_ms))
+
+
+class VisibilityManager:
+    """
+    Visibilidad de los mensajes recibidos que aun no terminan de enviarse.
+    Un hilo extiende con ChangeMessageVisibilityBatch la de los que siguen en
+    curso cuando ha pasado la mitad de visibility_timeout_seconds, y la de
+    todos en cuanto vence el limite del drenado, para que no reaparezcan en
+    la cola mientras se envian. release pone en 0 la de los que no se
+    llegaron a enviar para que otro consumidor los tome de inmediato.
+    """
+
+    def __init__(self, logger, visibility_timeout_seconds: int = DEFAULT_VISIBILITY_TIMEOUT_SECONDS, deadline: DrainDeadline = None, clock: Callable[[], float] = time.monotonic):
+        self.logger = logger
+        self.visibility_timeout_seconds = int(visibility_timeout_seconds)
+        self.deadline = deadline
+        self.clock = clock
+        self.stats = {'extended': 0, 'released': 0, 'failed': 0}
+        self._tracked: Dict[str, Tuple[dict, dict, float]] = {}
+        self._deadline_extended = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="visibility", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def track_batches(self, batches):
+        """
+        Registra los mensajes de cada lote en cuanto se reciben
+        """
+        for lane, messages in batches:
+            now = self.clock()
+            if lane.get('queue_url'):
+                with self._lock:
+                    for message in messages:
+                        self._tracked[message.get('ReceiptHandle')] = (lane, message, now)
+            yield lane, messages
+
+    def done(self, message: dict):
+        """
+        El envio del mensaje termino (exitoso o no)
+        """
+        with self._lock:
+            self._tracked.pop(message.get('ReceiptHandle'), None)
+
+    def forget(self, messages: List[dict]):
+        """
+        Deja de extender la visibilidad de mensajes que no se enviaron: quedan
+        invisibles hasta que venza su visibilidad actual
+        """
+        with self._lock:
+            for message in messages:
+                self._tracked.pop(message.get('ReceiptHandle'), None)
+
+    def release(self, lane: dict, messages: List[dict]):
+        """
+        Devuelve a la cola, con visibilidad 0, mensajes recibidos que no se enviaron
+        """
+        self.forget(messages)
+        if not messages or not lane.get('queue_url'):
+            return
+        released = self._change(lane['queue_url'], messages, 0)
+        self.logger.info(f"{released} mensajes sin enviar devueltos a la cola {lane['queue_url']}")
+        with self._lock:
+            self.stats['released'] += released
+
+    def extend_due(self, force: bool = False):
+        """
+        Extiende la visibilidad de los mensajes en curso que llevan al menos
+        la mitad de su visibilidad sin extender; con force, la de todos
+        """
+        now = self.clock()
+        due: Dict[str, List[dict]] = {}
+        with self._lock:
+            for receipt_handle, (lane, message, last) in self._tracked.items():
+                if force or now - last >= self.visibility_timeout_seconds / 2:
+                    due.setdefault(lane['queue_url'], []).append(message)
+                    self._tracked[receipt_handle] = (lane, message, now)
+        for queue_url, messages in due.items():
+            extended = self._change(queue_url, messages, self.visibility_timeout_seconds)
+            with self._lock:
+                self.stats['extended'] += extended
+
+    def _run(self):
+        while not self._stop.wait(min(VISIBILITY_CHECK_INTERVAL_SECONDS, self.visibility_timeout_seconds / 4)):
+            force = False
+            if self.deadline is not None and self.deadline.expired() and not self._deadline_extended:
+                self.logger.warning("Limite de tiempo del drenado alcanzado: se extiende la visibilidad de los mensajes en curso")
+                self._deadline_extended = force = True
+            self.extend_due(force=force)
+
+    def _change(self, queue_url: str, messages: List[dict], visibility_timeout: int) -> int:
+        changed = 0
+        for start in range(0, len(messages), RECEIVE_MAX_MESSAGES):
+            group = messages[start:start + RECEIVE_MAX_MESSAGES]
+            try:
+                response = get_client('sqs').change_message_visibility_batch(
+                    QueueUrl=queue_url,
+                    Entries=[
+                        {'Id': str(index), 'ReceiptHandle': message.get('ReceiptHandle'), 'VisibilityTimeout': visibility_timeout}
+                        for index, message in enumerate(group)
+                    ],
+                )
+            except Exception as e:
+                self.logger.error(f"Error al cambiar la visibilidad de {len(group)} mensajes de la cola {queue_url}: {e}")
+                with self._lock:
+                    self.stats['failed'] += len(group)
+                continue
+            changed += len(response.get('Successful', []))
+            for item in response.get('Failed', []):
+                self.logger.error(f"No se pudo cambiar la visibilidad del mensaje {group[int(item['Id'])].get('MessageId', 'N/A')}: {item.get('Code')}")
+                with self._lock:
+                    self.stats['failed'] += 1
+        return changed
+
+
 def get_queue_attributes(queue_url, logger):
     """
     Obtiene información sobre la cola SQS
@@ -313,7 +1278,7 @@ def get_queue_attributes(queue_url, logger):
         logger: Logger configurado
     """
     try:
-        response = sqs.get_queue_attributes(
+        response = get_client('sqs').get_queue_attributes(
             QueueUrl=queue_url,
             AttributeNames=['All']
         )
@@ -327,11 +1292,102 @@ def get_queue_attributes(queue_url, logger):
         logger.info(f"Creada: {attributes.get('CreatedTimestamp', 'N/A')}")
         logger.info(f"Última modificación: {attributes.get('LastModifiedTimestamp', 'N/A')}")
         logger.info("===============================\n")
+        return attributes
         
     except Exception as e:
         logger.error(f"Error al obtener atributos de la cola: {e}", exc_info=True)
+        return {}
+
+def get_lanes(config_file: dict) -> List[dict]:
+    """
+    Carriles de prioridad a drenar segun sqs.lanes (queue_url y weight por
+    carril), ordenados de mayor a menor peso. Sin carriles configurados se
+    drena solo sqs.queue_url
+    Args:
+        config_file (dict): archivo de configuracion
+    """
+    lanes = config_file["sqs"].get("lanes") or {}
+    if not lanes:
+        return [{'name': DEFAULT_LANE, 'queue_url': config_file["sqs"]["queue_url"], 'weight': 1}]
+    lanes = [
+        {'name': name, 'queue_url': lane["queue_url"], 'weight': max(1, int(lane.get("weight", 1)))}
+        for name, lane in lanes.items()
+    ]
+    return sorted(lanes, key=lambda lane: -lane['weight'])
+
+def receive_lane_batches(lanes, spans, wait_seconds=RECEIVE_WAIT_SECONDS, deadline=None, visibility_timeout=None):
+    """
+    Recibe los mensajes de los carriles con round robin ponderado: en cada
+    ronda un carril recibe hasta weight lotes de 10 mensajes, empezando por el
+    de mayor peso, y deja la ronda en cuanto queda vacio. Un carril urgente
+    con mensajes nunca espera mas de una ronda de los demas.
+
+    Mientras llegan mensajes se recibe sin espera (WaitTimeSeconds=0) para que
+    un carril vacio no retrase a los otros. Una ronda sin mensajes se confirma
+    con long polling, repartiendo wait_seconds entre los carriles, y si tampoco
+    trae mensajes el drenado termina. Tambien termina al vencer deadline
+    Args:
+        lanes (list): carriles de get_lanes
+        spans (InvocationSpans): tiempos del drenado (etapa receive)
+        wait_seconds (int): espera total de la ronda de confirmacion
+        deadline (DrainDeadline): limite de tiempo del drenado
+        visibility_timeout (int): visibilidad de los mensajes recibidos, en
+            segundos; sin valor se usa la de la cola
+    Yields:
+        tuple: (carril, mensajes recibidos)
+    """
+    long_poll_seconds = max(1, wait_seconds // len(lanes))
+    long_poll = False
+    extra = {'VisibilityTimeout': int(visibility_timeout)} if visibility_timeout else {}
+    while True:
+        received = False
+        for lane in lanes:
+            for _ in range(lane['weight']):
+                wait = long_poll_seconds if long_poll else 0
+                if deadline is not None:
+                    if deadline.expired():
+                        return
+                    wait = min(wait, int(deadline.remaining_seconds()))
+                with spans.span("receive"):
+                    response = get_client('sqs').receive_message(
+                        QueueUrl=lane['queue_url'],
+                        MaxNumberOfMessages=RECEIVE_MAX_MESSAGES,
+                        WaitTimeSeconds=wait,
+                        MessageAttributeNames=['All'],
+                        AttributeNames=['All'],
+                        **extra
+                    )
+                messages = response.get('Messages', [])
+                if not messages:
+                    break
+                received = True
+                yield lane, messages
+        if not received and long_poll:
+            return
+        long_poll = not received
+
+def get_queue_time_ms(message):
+    """
+    Milisegundos desde que el mensaje se envio a la cola (SentTimestamp), o
+    None si SQS no informo el atributo
+    """
+    sent_timestamp = (message.get('Attributes') or {}).get('SentTimestamp')
+    if sent_timestamp is None:
+        return None
+    return max(0, int(time.time() * 1000) - int(sent_timestamp))
+
+def emit_lane_metrics(lane_stats):
+    """
+    Publica por carril la profundidad inicial, los mensajes procesados y el
+    tiempo en cola (promedio y maximo) con dimensiones Function y Lane
+    """
+    for name, lane in lane_stats.items():
+        dimensions = {"Function": FUNCTION_NAME, "Lane": name}
+        put_metrics({"LaneDepth": lane['depth'], "LaneProcessed": lane['processed']}, "Count", dimensions)
+        if lane['processed']:
+            put_metrics({"LaneQueueTimeAvg": lane['avg_queue_time_ms'], "LaneQueueTimeMax": lane['max_queue_time_ms']}, "Milliseconds", dimensions)
 
-def process_message_and_send_to_latinia(message, latinia_url, session, timeout_seconds, logger, latinia_secret_id_oauth, latinia_url_auth):
+def process_message_and_send_to_latinia(message, latinia_url, session, timeout_seconds, logger, latinia_secret_id_oauth, latinia_url_auth, spans=None, deadline=None, rate_limiter=None):
     """
     Procesa un mensaje de SQS y envía su payload a Latinia
     Args:
@@ -340,9 +1396,13 @@ def process_message_and_send_to_latinia(message, latinia_url, session, timeout_s
         session (Session): Sesión de requests configurada
         timeout_seconds (int): Timeout en segundos
         logger: Logger configurado
+        spans (InvocationSpans): tiempos por etapa del mensaje
+        deadline (DrainDeadline): limite de tiempo del drenado
+        rate_limiter (TokenBucket): limitador de Latinia para el reenvio tras un 401
     Returns:
         bool: True si el envío fue exitoso, False en caso contrario
     """
+    spans = spans or InvocationSpans()
     try:
         message_id = message.get('MessageId', 'N/A')
         logger.info(f"Procesando mensaje {message_id}")
@@ -350,26 +1410,33 @@ def process_message_and_send_to_latinia(message, latinia_url, session, timeout_s
         message_body = message.get('Body', '{}')
         
         try:
-            parsed_body = json.loads(message_body)
-            logger.info(f"Cuerpo del mensaje parseado: {json.dumps(parsed_body, indent=2, ensure_ascii=False)}")
+            with spans.span("parse"):
+                parsed_body = json_loads(message_body)
+                logger.info("Cuerpo del mensaje parseado: %s", log_payload(parsed_body))
             
             payload = parsed_body.get('payload')
+            if not payload and parsed_body.get('payload_ref'):
+                with spans.span("claim_check"):
+                    payload = load_claim_check_payload(parsed_body['payload_ref'])
             if not payload:
                 logger.error(f"No se encontró 'payload' en el mensaje {message_id}")
                 return False
                 
-            logger.info(f"Payload extraído del mensaje {message_id}: {json.dumps(payload, indent=2, ensure_ascii=False)}")
-            
+            logger.info("Payload extraído del mensaje %s: %s", message_id, log_payload(payload))
+            spans.set_nemonic((payload.get('header') or {}).get('refService'))
 
-            response = send_notification_to_latinia(
-                latinia_url=latinia_url,
-                body=payload, 
-                session=session,
-                timeout_seconds=timeout_seconds,
-                logger=logger,
-                latinia_secret_id_oauth=latinia_secret_id_oauth,
-                latinia_url_auth=latinia_url_auth
-            )
+            with spans.span("latinia"):
+                response = send_notification_to_latinia(
+                    latinia_url=latinia_url,
+                    body=payload, 
+                    session=session,
+                    timeout_seconds=timeout_seconds,
+                    logger=logger,
+                    latinia_secret_id_oauth=latinia_secret_id_oauth,
+                    latinia_url_auth=latinia_url_auth,
+                    deadline=deadline,
+                    rate_limiter=rate_limiter,
+                )
             
             logger.info(f"Mensaje {message_id} enviado exitosamente a Latinia")
             return True
@@ -383,99 +1450,606 @@ def process_message_and_send_to_latinia(message, latinia_url, session, timeout_s
         logger.error(f"Error al procesar mensaje {message.get('MessageId', 'N/A')}: {e}", exc_info=True)
         return False
     
-def process_all_messages_and_send_to_latinia(queue_url, latinia_url, reintentos, backoff_factor, timeout_seconds, logger,latinia_secret_id_oauth, latinia_url_auth):
+def get_drain_config(config_file: dict) -> Dict[str, Any]:
+    """
+    Obtiene el motor (threads o asyncio) y la concurrencia del drenado desde sqs.drain
+    Args:
+        config_file (dict): archivo de configuracion
+    """
+    drain = config_file["sqs"].get("drain") or {}
+    engine = str(drain.get("engine", DRAIN_ENGINE_THREADS)).lower()
+    if engine not in DRAIN_ENGINES:
+        raise ValueError(f"Motor de drenado no soportado: {engine}")
+    return {
+        "engine": engine,
+        "concurrency": max(1, int(drain.get("concurrency", DEFAULT_DRAIN_CONCURRENCY))),
+        "ack_flush_interval_ms": float(drain.get("ack_flush_interval_ms", DEFAULT_ACK_FLUSH_INTERVAL_MS)),
+        "visibility_timeout_seconds": int(drain.get("visibility_timeout_seconds", DEFAULT_VISIBILITY_TIMEOUT_SECONDS)),
+    }
+
+def send_and_ack_message(message, lane, number, session, latinia_url, timeout_seconds, logger, latinia_secret_id_oauth, latinia_url_auth, acks, deadline=None, rate_limiter=None):
+    """
+    Envia un mensaje a Latinia y, si el envio fue exitoso, registra su
+    eliminacion de la cola de su carril. Se ejecuta en los hilos de envio del drenado
+    Args:
+        message (dict): Mensaje de SQS
+        lane (dict): carril del que se recibio el mensaje
+        number (int): numero del mensaje dentro del drenado, para el log
+        acks (AckBuffer): confirmaciones pendientes del drenado; None si los
+            mensajes los elimina el event source mapping
+        deadline (DrainDeadline): limite de tiempo del drenado
+        rate_limiter (TokenBucket): limitador de Latinia para el reenvio tras un 401
+    Returns:
+        bool: True si el envío fue exitoso
+    """
+    message_id = message.get('MessageId', 'N/A')
+    logger.info(f"--- Procesando mensaje #{number} (ID: {message_id}) ---")
+    spans = InvocationSpans()
+    success = process_message_and_send_to_latinia(
+        message=message,
+        latinia_url=latinia_url,
+        session=session,
+        timeout_seconds=timeout_seconds,
+        logger=logger,
+        latinia_secret_id_oauth=latinia_secret_id_oauth,
+        latinia_url_auth=latinia_url_auth,
+        spans=spans,
+        deadline=deadline,
+        rate_limiter=rate_limiter,
+    )
+    if success and acks is not None:
+        acks.add(lane['queue_url'], message)
+    elif not success:
+        logger.error(f"Falló el envío del mensaje {message_id} a Latinia")
+    spans.emit("sent" if success else "failed")
+    logger.info(f"--- Fin procesamiento mensaje #{number} ---\n")
+    return success
+
+def record_message_result(stats, queue_times, lane, message, success):
+    """
+    Acumula el resultado de un mensaje en las estadisticas del drenado y de su carril
+    """
+    lane_stats = stats['lanes'][lane['name']]
+    lane_stats['processed'] += 1
+    queue_time_ms = get_queue_time_ms(message)
+    if queue_time_ms is not None:
+        queue_times[lane['name']].append(queue_time_ms)
+    if success:
+        stats['successful_sends'] += 1
+        lane_stats['successful_sends'] += 1
+    else:
+        stats['failed_sends'] += 1
+        lane_stats['failed_sends'] += 1
+    stats['processed_messages'].append({
+        'message_id': message.get('MessageId', 'N/A'),
+        'lane': lane['name'],
+        'success': success,
+        'timestamp': get_proccess_date()
+    })
+
+def drain_should_stop(deadline, stats, logger) -> bool:
+    """
+    Indica si el drenado debe detenerse: sin tokens del limitador o con el
+    limite de tiempo vencido
+    """
+    if stats['rate_limited'] or stats['deadline_reached']:
+        return True
+    if deadline is not None and deadline.expired():
+        logger.warning("Limite de tiempo del drenado alcanzado. Se deja de recibir; los mensajes sin enviar vuelven a la cola")
+        stats['deadline_reached'] = True
+        return True
+    return False
+
+def drain_lanes_threads(batches, drain_spans, stats, queue_times, logger, concurrency, rate_limiter, rate_limit_max_wait_ms, send, deadline=None, release=None):
+    """
+    Motor de drenado con hilos: los mensajes de cada lote recibido se envian
+    en paralelo con hasta concurrency hilos, y mientras tanto ya esta en
+    curso la recepcion del siguiente lote
+    Args:
+        batches (Iterator): lotes (lane, messages), p. ej. de receive_lane_batches
+        send (Callable): send(message, lane, number) -> bool, envia y elimina un mensaje
+        deadline (DrainDeadline): al vencer no se envian mas mensajes
+        release (Callable): release(lane, messages), devuelve a la cola los
+            mensajes recibidos que no se enviaron al detenerse el drenado
+    """
+    release = release or (lambda lane, messages: None)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="drain") as workers, \
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="receive") as receiver:
+        next_batch = receiver.submit(next, batches, None)
+        while True:
+            batch = next_batch.result()
+            next_batch = None
+            if batch is None:
+                break
+            lane, messages = batch
+            if drain_should_stop(deadline, stats, logger):
+                release(lane, messages)
+                break
+            # El siguiente lote se recibe mientras se envia este
+            next_batch = receiver.submit(next, batches, None)
+            dispatched = []
+            for message in messages:
+                if drain_should_stop(deadline, stats, logger):
+                    break
+                if rate_limiter is not None:
+                    with drain_spans.span("rate_limit_wait"):
+                        acquired = rate_limiter.acquire(rate_limit_max_wait_ms / 1000)
+                    if not acquired:
+                        logger.warning("Limite de envio a Latinia alcanzado. Se detiene el drenado; los mensajes restantes vuelven a la cola")
+                        stats['rate_limited'] = True
+                        break
+                stats['total_messages'] += 1
+                dispatched.append((message, workers.submit(send, message, lane, stats['total_messages'])))
+            release(lane, messages[len(dispatched):])
+            for message, future in dispatched:
+                record_message_result(stats, queue_times, lane, message, future.result())
+
+            if drain_should_stop(deadline, stats, logger):
+                break
+        if next_batch is not None:
+            # Lote recibido por anticipado que ya no se envia
+            leftover = next_batch.result()
+            if leftover is not None:
+                release(*leftover)
+
+async def drain_lanes_async(batches, drain_spans, stats, queue_times, logger, concurrency, rate_limiter, rate_limit_max_wait_ms, send, deadline=None, release=None):
+    """
+    Motor de drenado con asyncio: mantiene hasta concurrency envios en curso
+    sin esperar a que termine cada lote, y recibe el siguiente lote mientras
+    haya cupo. Los resultados se registran en el orden de recepcion
+    Args:
+        batches (Iterator): lotes (lane, messages), p. ej. de receive_lane_batches
+        send (Callable): corrutina send(message, lane, number) -> bool
+        deadline (DrainDeadline): al vencer no se envian mas mensajes
+        release (Callable): release(lane, messages), devuelve a la cola los
+            mensajes recibidos que no se enviaron al detenerse el drenado
+    """
+    import asyncio
+    from collections import deque
+
+    release = release or (lambda lane, messages: None)
+    slots = asyncio.Semaphore(concurrency)
+    pending = deque()
+
+    async def run(message, lane, number):
+        try:
+            return await send(message, lane, number)
+        finally:
+            slots.release()
+
+    next_batch = asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+    try:
+        while True:
+            batch = await next_batch
+            next_batch = None
+            if batch is None:
+                break
+            lane, messages = batch
+            if drain_should_stop(deadline, stats, logger):
+                await asyncio.to_thread(release, lane, messages)
+                break
+            next_batch = asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+            dispatched = 0
+            for message in messages:
+                if drain_should_stop(deadline, stats, logger):
+                    break
+                if rate_limiter is not None:
+                    # El limitador puede consultar DynamoDB: nunca se llama en el event loop
+                    with drain_spans.span("rate_limit_wait"):
+                        acquired = await asyncio.to_thread(rate_limiter.acquire, rate_limit_max_wait_ms / 1000)
+                    if not acquired:
+                        logger.warning("Limite de envio a Latinia alcanzado. Se detiene el drenado; los mensajes restantes vuelven a la cola")
+                        stats['rate_limited'] = True
+                        break
+                await slots.acquire()
+                if drain_should_stop(deadline, stats, logger):
+                    slots.release()
+                    break
+                dispatched += 1
+                stats['total_messages'] += 1
+                pending.append((lane, message, asyncio.ensure_future(run(message, lane, stats['total_messages']))))
+                while pending and pending[0][2].done():
+                    done_lane, done_message, task = pending.popleft()
+                    record_message_result(stats, queue_times, done_lane, done_message, task.result())
+            if dispatched < len(messages):
+                await asyncio.to_thread(release, lane, messages[dispatched:])
+            if drain_should_stop(deadline, stats, logger):
+                break
+    finally:
+        if next_batch is not None:
+            # Lote recibido por anticipado que ya no se envia
+            await asyncio.wait([next_batch])
+            if not next_batch.cancelled() and next_batch.exception() is None and next_batch.result() is not None:
+                await asyncio.to_thread(release, *next_batch.result())
+        for lane, message, task in pending:
+            record_message_result(stats, queue_times, lane, message, await task)
+
+async def send_notification_to_latinia_async(http, latinia_url, body, timeout_seconds, logger, latinia_secret_id_oauth, latinia_url_auth, reintentos=0, backoff_factor=0.5, deadline=None, rate_limiter=None):
     """
-    Lee todos los mensajes de la cola y envía sus payloads a Latinia
+    Envio de notificacion a latinia con aiohttp, para el motor asyncio.
+    Reintenta los estados 500, 502, 503 y 504 como la sesion de requests y
+    solicita un token nuevo una vez si Latinia responde 401
+    Args:
+        http (aiohttp.ClientSession): sesion HTTP del drenado
+        reintentos (int): reintentos ante estados 5xx
+        backoff_factor (float): factor de retroceso entre reintentos
+        deadline (DrainDeadline): acota el timeout de cada intento al tiempo
+            restante de la invocacion
+        rate_limiter (TokenBucket): el reenvio tras un 401 toma un token; sin
+            token no se reenvia
+    Raises:
+        aiohttp.ClientError: error de conexion o estado HTTP de error
+        asyncio.TimeoutError: Latinia no respondio en timeout_seconds
+        requests.exceptions.Timeout: no queda tiempo de la invocacion para otro intento
+    """
+    import asyncio
+    import aiohttp
+
+    logger.info(f"Enviando notificación a Latinia: {latinia_url}")
+    logger.info("Payload a enviar: %s", log_payload(body))
+    data = json_dumps_bytes(body)
+    oauth_token = await asyncio.to_thread(get_oauth_token, latinia_url_auth, latinia_secret_id_oauth, logger, False, deadline)
+    token_refreshed = False
+    intento = 0
+    while True:
+        async with http.post(
+            latinia_url,
+            data=data,
+            timeout=aiohttp.ClientTimeout(total=request_timeout(timeout_seconds, deadline)),
+            headers={"Authorization": f"Bearer {oauth_token}", "Content-Type": "application/json"},
+        ) as response:
+            text = await response.text()
+        logger.info("Respuesta de Latinia: %s - %s", response.status, log_payload(text))
+        if response.status == 401 and not token_refreshed and (rate_limiter is None or await asyncio.to_thread(rate_limiter.try_acquire)):
+            logger.warning("Latinia rechazo el token de OAuth. Se solicita un token nuevo")
+            token_refreshed = True
+            oauth_token = await asyncio.to_thread(get_oauth_token, latinia_url_auth, latinia_secret_id_oauth, logger, True, deadline)
+            continue
+        if response.status in LATINIA_RETRY_STATUSES and intento < reintentos:
+            intento += 1
+            await asyncio.sleep(backoff_factor * (2 ** (intento - 1)))
+            continue
+        response.raise_for_status()
+        return response.status
+
+async def send_and_ack_message_async(message, lane, number, http, latinia_url, timeout_seconds, logger, latinia_secret_id_oauth, latinia_url_auth, acks, reintentos=0, backoff_factor=0.5, deadline=None, rate_limiter=None):
+    """
+    Version asincrona de send_and_ack_message: lee el payload del mensaje
+    (o de S3 si tiene claim-check), lo envia a Latinia y, si el envio fue
+    exitoso, registra su eliminacion de la cola de su carril. Las llamadas a
+    SQS y S3 usan boto3 en el pool de hilos del loop
+    Returns:
+        bool: True si el envío fue exitoso
+    """
+    import asyncio
+
+    message_id = message.get('MessageId', 'N/A')
+    logger.info(f"--- Procesando mensaje #{number} (ID: {message_id}) ---")
+    spans = InvocationSpans()
+    success = False
+    try:
+        with spans.span("parse"):
+            parsed_body = json_loads(message.get('Body', '{}'))
+        payload = parsed_body.get('payload')
+        if not payload and parsed_body.get('payload_ref'):
+            with spans.span("claim_check"):
+                payload = await asyncio.to_thread(load_claim_check_payload, parsed_body['payload_ref'])
+        if not payload:
+            logger.error(f"No se encontró 'payload' en el mensaje {message_id}")
+        else:
+            spans.set_nemonic((payload.get('header') or {}).get('refService'))
+            with spans.span("latinia"):
+                await send_notification_to_latinia_async(
+                    http, latinia_url, payload, timeout_seconds, logger, latinia_secret_id_oauth, latinia_url_auth,
+                    reintentos=reintentos, backoff_factor=backoff_factor, deadline=deadline, rate_limiter=rate_limiter,
+                )
+            logger.info(f"Mensaje {message_id} enviado exitosamente a Latinia")
+            success = True
+    except Exception as e:
+        logger.error(f"Error al procesar mensaje {message_id}: {e}", exc_info=True)
+
+    if success and acks is not None:
+        # Al completar un grupo, add elimina el lote: se ejecuta fuera del loop
+        await asyncio.to_thread(acks.add, lane['queue_url'], message)
+    elif not success:
+        logger.error(f"Falló el envío del mensaje {message_id} a Latinia")
+    spans.emit("sent" if success else "failed")
+    logger.info(f"--- Fin procesamiento mensaje #{number} ---\n")
+    return success
+
+async def run_async_drain(batches, drain_spans, stats, queue_times, logger, concurrency, rate_limiter, rate_limit_max_wait_ms, latinia_url, timeout_seconds, latinia_secret_id_oauth, latinia_url_auth, reintentos, backoff_factor, acks, deadline=None, release=None, done=None):
+    """
+    Prepara el loop (pool de hilos para boto3 y sesion de aiohttp) y ejecuta drain_lanes_async
+    """
+    import asyncio
+    import aiohttp
+
+    # boto3 no es asincrono: receive, delete, S3 y el token usan este pool
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=min(concurrency, AWS_MAX_POOL_CONNECTIONS), thread_name_prefix="drain-io")
+    )
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency)
+    async with aiohttp.ClientSession(connector=connector, headers=LATINIA_SESSION_HEADERS) as http:
+        async def send(message, lane, number):
+            try:
+                return await send_and_ack_message_async(
+                    message, lane, number, http, latinia_url, timeout_seconds, logger, latinia_secret_id_oauth, latinia_url_auth, acks,
+                    reintentos=reintentos, backoff_factor=backoff_factor, deadline=deadline, rate_limiter=rate_limiter,
+                )
+            finally:
+                if done is not None:
+                    done(message)
+
+        await drain_lanes_async(
+            batches, drain_spans, stats, queue_times, logger, concurrency, rate_limiter, rate_limit_max_wait_ms, send,
+            deadline=deadline, release=release,
+        )
+
+def new_drain_stats() -> dict:
+    return {
+        'total_messages': 0,
+        'successful_sends': 0,
+        'failed_sends': 0,
+        'processed_messages': [],
+        'rate_limited': False,
+        'deadline_reached': False,
+        'lanes': {},
+    }
+
+def new_lane_stats(depth: int = 0) -> dict:
+    return {
+        'depth': depth,
+        'processed': 0,
+        'successful_sends': 0,
+        'failed_sends': 0,
+        'avg_queue_time_ms': 0,
+        'max_queue_time_ms': 0,
+    }
+
+def finish_lane_stats(stats, queue_times):
+    """
+    Calcula el tiempo en cola promedio y maximo por carril y emite sus metricas
+    """
+    for name, times in queue_times.items():
+        if times:
+            stats['lanes'][name]['avg_queue_time_ms'] = round(sum(times) / len(times), 3)
+            stats['lanes'][name]['max_queue_time_ms'] = max(times)
+    emit_lane_metrics(stats['lanes'])
+
+def run_drain_engine(batches, drain_spans, stats, queue_times, logger, engine, concurrency, rate_limiter, rate_limit_max_wait_ms, latinia_url, reintentos, backoff_factor, timeout_seconds, latinia_secret_id_oauth, latinia_url_auth, pool_connections, pool_maxsize, acks, visibility=None, deadline=None, release=None):
+    """
+    Envia a Latinia los mensajes de batches con el motor indicado (threads o
+    asyncio). Si aiohttp no esta instalado se usa threads. Con visibility, los
+    mensajes sin enviar al detenerse vuelven a la cola de inmediato (o los
+    trata release, si se indica) y cada envio terminado deja de extender su
+    visibilidad
+    """
+    if release is None and visibility is not None:
+        release = visibility.release
+    done = visibility.done if visibility is not None else None
+    if engine == DRAIN_ENGINE_ASYNCIO and importlib.util.find_spec("aiohttp") is None:
+        logger.warning("aiohttp no esta instalado, se usa el motor de drenado threads")
+        engine = DRAIN_ENGINE_THREADS
+    # Con limitador no se usan reintentos (cada reintento seria una solicitud
+    # sin token); el mensaje fallido se reintenta al volver a la cola
+    reintentos = 0 if rate_limiter is not None else reintentos
+    logger.info(f"Motor de drenado {engine} con {concurrency} envios simultaneos")
+
+    if engine == DRAIN_ENGINE_ASYNCIO:
+        import asyncio
+
+        asyncio.run(run_async_drain(
+            batches, drain_spans, stats, queue_times, logger, concurrency, rate_limiter, rate_limit_max_wait_ms,
+            latinia_url, timeout_seconds, latinia_secret_id_oauth, latinia_url_auth, reintentos, backoff_factor, acks,
+            deadline=deadline, release=release, done=done,
+        ))
+        return
+    session = get_session(latinia_url, reintentos, backoff_factor, pool_connections, max(pool_maxsize, concurrency))
+    logger.info("Sesión de requests obtenida con configuración de reintentos")
+
+    def send(message, lane, number):
+        try:
+            return send_and_ack_message(
+                message, lane, number, session, latinia_url, timeout_seconds, logger, latinia_secret_id_oauth, latinia_url_auth, acks,
+                deadline=deadline, rate_limiter=rate_limiter,
+            )
+        finally:
+            if done is not None:
+                done(message)
+
+    drain_lanes_threads(
+        batches, drain_spans, stats, queue_times, logger, concurrency, rate_limiter, rate_limit_max_wait_ms, send,
+        deadline=deadline, release=release,
+    )
+
+def process_all_messages_and_send_to_latinia(queue_url, latinia_url, reintentos, backoff_factor, timeout_seconds, logger,latinia_secret_id_oauth, latinia_url_auth, pool_connections=10, pool_maxsize=10, rate_limiter=None, rate_limit_max_wait_ms=DEFAULT_RATE_LIMIT_MAX_WAIT_MS, lanes=None, concurrency=DEFAULT_DRAIN_CONCURRENCY, engine=DRAIN_ENGINE_THREADS, ack_flush_interval_ms=DEFAULT_ACK_FLUSH_INTERVAL_MS, visibility_timeout_seconds=DEFAULT_VISIBILITY_TIMEOUT_SECONDS, deadline=None):
+    """
+    Lee todos los mensajes de la cola y envía sus payloads a Latinia.
+
+    Con el motor threads los mensajes de cada lote se envian en paralelo con
+    hasta concurrency hilos; con el motor asyncio se mantienen hasta
+    concurrency envios en curso con aiohttp, sin un hilo por envio. En ambos
+    el siguiente lote se recibe mientras se envia el actual, y cada mensaje
+    se elimina de la cola solo si su envio fue exitoso, igual que en el envio
+    secuencial (concurrency 1). Las eliminaciones se agrupan con
+    DeleteMessageBatch y las pendientes se eliminan antes de retornar.
+
+    Al vencer deadline se deja de recibir y de enviar: los mensajes recibidos
+    sin enviar vuelven a la cola con visibilidad 0 y los que siguen en curso
+    extienden su visibilidad hasta terminar
     Args:
         queue_url (string): URL de la cola SQS
+        lanes (list): carriles de prioridad de get_lanes; sin carriles se drena
+            solo queue_url
         latinia_url (string): URL de la API de Latinia
         reintentos (int): Número de reintentos para la sesión
         backoff_factor (float): Factor de backoff para reintentos
         timeout_seconds (int): Timeout en segundos
         logger: Logger configurado
+        pool_connections (int): cantidad de pools de conexiones a mantener
+        pool_maxsize (int): conexiones keep-alive maximas por host; se amplia
+            a concurrency si es menor
+        rate_limiter (TokenBucket): limitador hacia Latinia; cada mensaje
+            espera su token hasta rate_limit_max_wait_ms y, si no lo obtiene,
+            el drenado se detiene y los mensajes restantes quedan en la cola
+        concurrency (int): envios simultaneos a Latinia
+        engine (str): motor de drenado, threads o asyncio. Si aiohttp no esta
+            instalado se usa threads
+        ack_flush_interval_ms (float): espera maxima de una eliminacion
+            pendiente antes de enviarla sin completar el grupo
+        visibility_timeout_seconds (int): visibilidad de los mensajes
+            recibidos; se extiende mientras el envio siga en curso
+        deadline (DrainDeadline): limite de tiempo del drenado
     Returns:
         dict: Estadísticas del procesamiento
     """
-    stats = {
-        'total_messages': 0,
-        'successful_sends': 0,
-        'failed_sends': 0,
-        'processed_messages': []
-    }
+    stats = {**new_drain_stats(), 'acks': {}, 'visibility': {}}
+    drain_spans = InvocationSpans()
+    lanes = lanes or [{'name': DEFAULT_LANE, 'queue_url': queue_url, 'weight': 1}]
+    concurrency = max(1, int(concurrency))
     
     try:
-        session = create_session(reintentos, backoff_factor)
-        logger.info("Sesión de requests creada con configuración de reintentos")
-        
-        logger.info(f"Iniciando procesamiento de mensajes de la cola: {queue_url}")
+        for lane in lanes:
+            attributes = get_queue_attributes(lane['queue_url'], logger)
+            stats['lanes'][lane['name']] = new_lane_stats(int(attributes.get('ApproximateNumberOfMessages', 0)))
+        queue_times = {lane['name']: [] for lane in lanes}
+        logger.info(f"Iniciando procesamiento de mensajes de los carriles: {[(lane['name'], lane['queue_url'], lane['weight']) for lane in lanes]}")
         
-        while True:
-            response = sqs.receive_message(
-                QueueUrl=queue_url,
-                MaxNumberOfMessages=10,
-                WaitTimeSeconds=5,
-                MessageAttributeNames=['All'],
-                AttributeNames=['All']
+        acks = AckBuffer(logger, ack_flush_interval_ms / 1000).start()
+        visibility = VisibilityManager(logger, visibility_timeout_seconds, deadline).start()
+        try:
+            batches = receive_lane_batches(lanes, drain_spans, deadline=deadline, visibility_timeout=visibility_timeout_seconds)
+            run_drain_engine(
+                visibility.track_batches(batches), drain_spans, stats, queue_times, logger, engine, concurrency,
+                rate_limiter, rate_limit_max_wait_ms, latinia_url, reintentos, backoff_factor, timeout_seconds,
+                latinia_secret_id_oauth, latinia_url_auth, pool_connections, pool_maxsize, acks, visibility, deadline,
             )
-            
-            messages = response.get('Messages', [])
-            
-            if not messages:
-                logger.info("No hay más mensajes en la cola")
-                break
-            
-            # Procesar cada mensaje
-            for message in messages:
-                stats['total_messages'] += 1
-                message_id = message.get('MessageId', 'N/A')
-                receipt_handle = message.get('ReceiptHandle')
-                
-                logger.info(f"--- Procesando mensaje #{stats['total_messages']} (ID: {message_id}) ---")
-                
-                success = process_message_and_send_to_latinia(
-                    message=message,
-                    latinia_url=latinia_url,
-                    session=session,
-                    timeout_seconds=timeout_seconds,
-                    logger=logger,
-                    latinia_secret_id_oauth=latinia_secret_id_oauth,
-                    latinia_url_auth=latinia_url_auth
-                )
-                
-                if success:
-                    stats['successful_sends'] += 1
-                    
-                    try:
-                        sqs.delete_message(
-                            QueueUrl=queue_url,
-                            ReceiptHandle=receipt_handle
-                        )
-                        logger.info(f"Mensaje {message_id} eliminado de la cola")
-                    except Exception as e:
-                        logger.error(f"Error al eliminar mensaje {message_id} de la cola: {e}")
-                        
-                else:
-                    stats['failed_sends'] += 1
-                    logger.error(f"Falló el envío del mensaje {message_id} a Latinia")
-                
-                stats['processed_messages'].append({
-                    'message_id': message_id,
-                    'success': success,
-                    'timestamp': get_proccess_date()
-                })
-                
-                logger.info(f"--- Fin procesamiento mensaje #{stats['total_messages']} ---\n")
+        finally:
+            visibility.close()
+            stats['visibility'] = dict(visibility.stats)
+            # Las eliminaciones pendientes se envian aunque el drenado falle,
+            # para que un mensaje ya entregado no se vuelva a enviar
+            acks.close()
+            drain_spans.record("delete", acks.elapsed_ms)
+            stats['acks'] = dict(acks.stats)
+            put_metrics({"AckDeleted": acks.stats['deleted'], "AckFailed": acks.stats['failed']}, "Count", {"Function": FUNCTION_NAME})
         
-        logger.info(f"Procesamiento completado. Estadísticas: {json.dumps(stats, indent=2, ensure_ascii=False)}")
+        if not stats['rate_limited'] and not stats['deadline_reached']:
+            logger.info("No hay más mensajes en los carriles")
+        finish_lane_stats(stats, queue_times)
+        logger.info("Procesamiento completado. Estadísticas: %s", LazyJson(stats))
+        logger.info(f"Reutilizacion de conexiones HTTP: {get_connection_stats()}")
+        drain_spans.emit("drained")
         return stats
         
     except Exception as e:
         logger.error(f"Error durante el procesamiento de mensajes: {e}", exc_info=True)
+        drain_spans.emit("error")
         raise
 
+def get_sqs_records(event) -> List[dict]:
+    """
+    Devuelve los registros SQS de un evento del event source mapping; lista
+    vacia si la invocacion no viene de un trigger de SQS (drenado programado)
+    """
+    if not isinstance(event, dict):
+        return []
+    return [record for record in event.get('Records') or [] if record.get('eventSource') == SQS_EVENT_SOURCE]
+
+def record_to_message(record: dict) -> dict:
+    """
+    Convierte un registro del evento de SQS al formato de ReceiveMessage
+    """
+    return {
+        'MessageId': record.get('messageId'),
+        'ReceiptHandle': record.get('receiptHandle'),
+        'Body': record.get('body', '{}'),
+        'Attributes': record.get('attributes') or {},
+        'MessageAttributes': {
+            name: {'DataType': attribute.get('dataType'), 'StringValue': attribute.get('stringValue')}
+            for name, attribute in (record.get('messageAttributes') or {}).items()
+        },
+    }
+
+def get_record_lane(record: dict, lanes: List[dict]) -> dict:
+    """
+    Carril de un registro segun la cola de origen (eventSourceARN)
+    """
+    queue_name = (record.get('eventSourceARN') or '').rsplit(':', 1)[-1]
+    for lane in lanes:
+        if queue_name and lane['queue_url'].rstrip('/').rsplit('/', 1)[-1] == queue_name:
+            return lane
+    return {'name': DEFAULT_LANE, 'queue_url': None, 'weight': 1}
 
+def batch_item_failures(message_ids) -> dict:
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in message_ids]}
 
+def process_sqs_records(records, latinia_url, reintentos, backoff_factor, timeout_seconds, logger, latinia_secret_id_oauth, latinia_url_auth, pool_connections=10, pool_maxsize=10, rate_limiter=None, rate_limit_max_wait_ms=DEFAULT_RATE_LIMIT_MAX_WAIT_MS, lanes=None, concurrency=DEFAULT_DRAIN_CONCURRENCY, engine=DRAIN_ENGINE_THREADS, visibility_timeout_seconds=DEFAULT_VISIBILITY_TIMEOUT_SECONDS, deadline=None):
+    """
+    Envia a Latinia los mensajes entregados por el event source mapping de
+    SQS, en paralelo con el motor de drenado configurado. Los mensajes no se
+    eliminan aqui: el event source mapping elimina los exitosos y vuelve a
+    entregar los informados en batchItemFailures (requiere
+    ReportBatchItemFailures en el trigger). Los mensajes que no se llegan a
+    enviar (limite de tasa, limite de tiempo o error del motor) tambien se
+    informan como fallidos. Al vencer el limite de tiempo los de un carril
+    conocido vuelven a la cola de inmediato; sin tokens del limitador quedan
+    invisibles hasta que venza su visibilidad, como espera antes del
+    reintento, para no volver a entregarse en caliente y agotar sus intentos
+    hacia la DLQ
+    Args:
+        records (list): registros SQS del evento
+        lanes (list): carriles de get_lanes, para asociar cada registro a su
+            carril por la cola de origen
+        visibility_timeout_seconds (int): visibilidad de la cola; se extiende
+            la de los mensajes cuyo envio sigue en curso
+        deadline (DrainDeadline): limite de tiempo de la invocacion
+    Returns:
+        dict: respuesta con batchItemFailures
+    """
+    stats = new_drain_stats()
+    drain_spans = InvocationSpans()
+    concurrency = max(1, int(concurrency))
+    batches = {}
+    for record in records:
+        lane = get_record_lane(record, lanes or [])
+        batches.setdefault(lane['name'], (lane, []))[1].append(record_to_message(record))
+    for name in batches:
+        stats['lanes'][name] = new_lane_stats()
+    queue_times = {name: [] for name in batches}
+    logger.info(f"Procesando {len(records)} mensajes del event source mapping de los carriles: {list(batches)}")
 
+    outcome = "event"
+    visibility = VisibilityManager(logger, visibility_timeout_seconds, deadline).start()
 
+    def release(lane, messages):
+        if stats['rate_limited']:
+            visibility.forget(messages)
+        else:
+            visibility.release(lane, messages)
 
+    try:
+        run_drain_engine(
+            visibility.track_batches(iter(batches.values())), drain_spans, stats, queue_times, logger, engine, concurrency,
+            rate_limiter, rate_limit_max_wait_ms, latinia_url, reintentos, backoff_factor, timeout_seconds,
+            latinia_secret_id_oauth, latinia_url_auth, pool_connections, pool_maxsize, None, visibility, deadline, release,
+        )
+    except Exception as e:
+        logger.error(f"Error durante el procesamiento de los mensajes del evento: {e}", exc_info=True)
+        outcome = "error"
+    finally:
+        visibility.close()
 
+    successful = {message['message_id'] for message in stats['processed_messages'] if message['success']}
+    failed = [record.get('messageId') for record in records if record.get('messageId') not in successful]
+    for lane, messages in batches.values():
+        for message in messages:
+            if message['MessageId'] in successful:
+                # Si el mensaje se vuelve a entregar, ya fue enviado: sin payload
+                # termina en la DLQ en lugar de enviarse dos veces
+                delete_claim_check_payload(message, logger)
+    finish_lane_stats(stats, queue_times)
+    logger.info("Procesamiento del evento completado. Estadísticas: %s", LazyJson(stats))
+    logger.info(f"Mensajes a reintentar: {failed}")
+    drain_spans.emit(outcome)
+    return batch_item_failures(failed)
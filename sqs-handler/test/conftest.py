@@ -0,0 +1,143 @@
+import importlib.util
+import json
+import os
+import threading
+import time
+
+import pytest
+import yaml
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# El sqs-handler lee el mismo YAML que la Lambda de ingreso
+CONFIG_PATH = os.path.join(os.path.dirname(ROOT), "main-lambda-component", "config-dev.yml")
+ARN_BAJA = "arn:aws:sqs:us-east-1:308528169754:bb-notificaciones-reenvio"
+
+
+def load_sqs_handler():
+    """
+    Carga una copia nueva del sqs-handler: cada prueba parte de sus caches vacios
+    """
+    spec = importlib.util.spec_from_file_location("sqs_handler_lambda_function", os.path.join(ROOT, "lambda_function.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeClock:
+    """
+    Reloj controlado por la prueba: devuelve now hasta que se avanza a mano
+    """
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeLatinia:
+    """
+    Latinia simulado que tarda latency_seconds por envio y rechaza los ids indicados
+    """
+
+    def __init__(self, latency_seconds=0.05, failed_ids=()):
+        self.latency_seconds = latency_seconds
+        self.failed_ids = set(failed_ids)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, body, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency_seconds)
+            if body["header"]["id"] in self.failed_ids:
+                raise RuntimeError("Latinia rechazo el mensaje")
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class FakeSQS:
+    def __init__(self, batches, latinia):
+        self.batches = list(batches)
+        self.latinia = latinia
+        self.deleted = []
+        self.receives_during_send = 0
+
+    def get_queue_attributes(self, QueueUrl, AttributeNames):
+        return {"Attributes": {}}
+
+    def receive_message(self, **kwargs):
+        # Latencia del receive; con la recepcion anticipada los envios ya estan en curso
+        time.sleep(0.02)
+        if self.latinia.in_flight:
+            self.receives_during_send += 1
+        return {"Messages": self.batches.pop(0)} if self.batches else {}
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        self.deleted.extend(entry["ReceiptHandle"] for entry in Entries)
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries]}
+
+
+class FakeAWS(FakeSQS):
+    """
+    SQS y S3 simulados: registra los borrados de mensajes y de payloads con claim-check
+    """
+
+    def __init__(self, batches, latinia):
+        super().__init__(batches, latinia)
+        self.deleted_objects = []
+
+    def delete_object(self, Bucket, Key):
+        self.deleted_objects.append(f"s3://{Bucket}/{Key}")
+
+
+def build_batches(batches, size):
+    return [
+        [
+            {
+                "MessageId": f"m-{batch}-{index}",
+                "ReceiptHandle": f"r-{batch}-{index}",
+                "Body": json.dumps({"payload": {"header": {"id": f"m-{batch}-{index}"}}}),
+            }
+            for index in range(size)
+        ]
+        for batch in range(batches)
+    ]
+
+
+def sqs_record(message_id, arn=ARN_BAJA, claim_check=None):
+    record = {
+        "messageId": message_id,
+        "receiptHandle": f"r-{message_id}",
+        "body": json.dumps({"payload": {"header": {"id": message_id}}}),
+        "attributes": {"SentTimestamp": "1700000000000"},
+        "messageAttributes": {},
+        "eventSource": "aws:sqs",
+        "eventSourceARN": arn,
+    }
+    if claim_check:
+        record["messageAttributes"]["ClaimCheck"] = {"stringValue": claim_check, "dataType": "String"}
+    return record
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    """
+    sqs-handler con la configuracion de dev, sin limitador, y Latinia y AWS simulados
+    """
+    sqs_handler = load_sqs_handler()
+    with open(CONFIG_PATH) as file:
+        config = yaml.safe_load(file)
+    config["latinia"]["rate_limit"]["enabled"] = False
+    config["sqs"]["drain"]["concurrency"] = 4
+    latinia = FakeLatinia(latency_seconds=0.02, failed_ids={"m-2"})
+    aws = FakeAWS([], latinia)
+    monkeypatch.setattr(sqs_handler, "load_yaml_file", lambda path: config)
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: aws)
+    monkeypatch.setattr(sqs_handler, "send_notification_to_latinia", latinia)
+    return sqs_handler, config, latinia, aws
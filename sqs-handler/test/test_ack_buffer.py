@@ -0,0 +1,140 @@
+import logging
+import time
+
+import pytest
+
+from conftest import FakeLatinia, FakeSQS, build_batches, load_sqs_handler
+
+
+class FakeBatchSQS:
+    """
+    SQS simulado para DeleteMessageBatch: failures indica, por llamada, los
+    receipt handles que fallan y si el error es del cliente (SenderFault)
+    """
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.calls = []
+        self.deleted = []
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        self.calls.append((QueueUrl, [entry["ReceiptHandle"] for entry in Entries]))
+        failing = self.failures.pop(0) if self.failures else {}
+        if failing == "error":
+            raise ConnectionError("SQS no responde")
+        response = {"Successful": [], "Failed": []}
+        for entry in Entries:
+            if entry["ReceiptHandle"] in failing:
+                response["Failed"].append({"Id": entry["Id"], "Code": "InternalError", "SenderFault": failing[entry["ReceiptHandle"]]})
+            else:
+                self.deleted.append(entry["ReceiptHandle"])
+                response["Successful"].append({"Id": entry["Id"]})
+        return response
+
+
+def messages(count):
+    return [{"MessageId": f"m-{index}", "ReceiptHandle": f"r-{index}"} for index in range(count)]
+
+
+@pytest.fixture
+def sqs_handler(monkeypatch):
+    module = load_sqs_handler()
+    monkeypatch.setattr(module, "ACK_RETRY_BACKOFF_SECONDS", 0)
+    return module
+
+
+def use_sqs(monkeypatch, sqs_handler, sqs):
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: sqs)
+
+
+def test_confirmaciones_se_eliminan_en_grupos_de_diez(sqs_handler, monkeypatch):
+    sqs = FakeBatchSQS()
+    use_sqs(monkeypatch, sqs_handler, sqs)
+    acks = sqs_handler.AckBuffer(logging.getLogger(), flush_interval_seconds=60)
+
+    for message in messages(23):
+        acks.add("url", message)
+
+    assert [len(handles) for _, handles in sqs.calls] == [10, 10]
+    acks.close()
+    assert [len(handles) for _, handles in sqs.calls] == [10, 10, 3]
+    assert acks.stats == {"deleted": 23, "failed": 0, "batches": 3}
+
+
+def test_grupo_incompleto_se_elimina_por_tiempo(sqs_handler, monkeypatch):
+    sqs = FakeBatchSQS()
+    use_sqs(monkeypatch, sqs_handler, sqs)
+    acks = sqs_handler.AckBuffer(logging.getLogger(), flush_interval_seconds=0.05).start()
+
+    acks.add("url-alta", messages(1)[0])
+    acks.add("url-baja", messages(2)[1])
+    time.sleep(0.2)
+
+    assert sorted(sqs.calls) == [("url-alta", ["r-0"]), ("url-baja", ["r-1"])]
+    acks.close()
+    assert len(sqs.calls) == 2
+
+
+def test_fallo_parcial_se_reintenta_solo_lo_fallido(sqs_handler, monkeypatch):
+    sqs = FakeBatchSQS(failures=[{"r-2": False, "r-5": True}, "error"])
+    use_sqs(monkeypatch, sqs_handler, sqs)
+    acks = sqs_handler.AckBuffer(logging.getLogger(), flush_interval_seconds=60)
+
+    for message in messages(10):
+        acks.add("url", message)
+
+    # r-5 es un error del cliente (receipt handle invalido) y no se reintenta
+    assert sqs.calls[1:] == [("url", ["r-2"]), ("url", ["r-2"])]
+    assert sorted(sqs.deleted) == sorted(f"r-{index}" for index in range(10) if index != 5)
+    assert acks.stats == {"deleted": 9, "failed": 1, "batches": 3}
+
+
+def test_reintentos_agotados_cuentan_como_fallidos(sqs_handler, monkeypatch):
+    sqs = FakeBatchSQS(failures=["error", "error", "error"])
+    use_sqs(monkeypatch, sqs_handler, sqs)
+    acks = sqs_handler.AckBuffer(logging.getLogger(), flush_interval_seconds=60, max_attempts=3)
+
+    acks.add("url", messages(1)[0])
+    acks.close()
+
+    assert len(sqs.calls) == 3
+    assert acks.stats == {"deleted": 0, "failed": 1, "batches": 3}
+
+
+def test_drenado_elimina_pendientes_antes_de_retornar(monkeypatch):
+    sqs_handler = load_sqs_handler()
+    latinia = FakeLatinia(latency_seconds=0)
+    sqs = FakeSQS(build_batches(2, 7), latinia)
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: sqs)
+    monkeypatch.setattr(sqs_handler, "send_notification_to_latinia", latinia)
+
+    stats = sqs_handler.process_all_messages_and_send_to_latinia(
+        "url", "https://latinia", 3, 0.5, 5, logging.getLogger(), "secreto", "https://auth",
+        concurrency=4, ack_flush_interval_ms=60000,
+    )
+
+    assert len(sqs.deleted) == 14
+    assert stats["acks"] == {"deleted": 14, "failed": 0, "batches": 2}
+
+
+def test_drenado_con_error_elimina_lo_ya_enviado(monkeypatch):
+    sqs_handler = load_sqs_handler()
+    latinia = FakeLatinia(latency_seconds=0)
+    sqs = FakeSQS(build_batches(1, 3), latinia)
+    receive = sqs.receive_message
+
+    def receive_then_fail(**kwargs):
+        if sqs.batches:
+            return receive(**kwargs)
+        raise ConnectionError("SQS no responde")
+
+    sqs.receive_message = receive_then_fail
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: sqs)
+    monkeypatch.setattr(sqs_handler, "send_notification_to_latinia", latinia)
+
+    with pytest.raises(ConnectionError):
+        sqs_handler.process_all_messages_and_send_to_latinia(
+            "url", "https://latinia", 3, 0.5, 5, logging.getLogger(), "secreto", "https://auth", ack_flush_interval_ms=60000,
+        )
+
+    assert sqs.deleted == ["r-0-0", "r-0-1", "r-0-2"]
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import threading
+import time
+
+import pytest
+
+from conftest import FakeLatinia, FakeSQS, build_batches, load_sqs_handler
+
+
+class FakeAsyncLatinia(FakeLatinia):
+    """
+    Latinia simulado para el motor asyncio: cada envio es una corrutina
+    """
+
+    async def send(self, message, lane, number):
+        body = self.sqs_handler.json_loads(message["Body"])["payload"]
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency_seconds)
+        finally:
+            self.in_flight -= 1
+        if body["header"]["id"] in self.failed_ids:
+            return False
+        self.sent.append(number)
+        return True
+
+
+class DenyAfter:
+    """
+    Limitador que concede allowed tokens y luego los niega
+    """
+
+    def __init__(self, allowed):
+        self.allowed = allowed
+        self.threads = set()
+
+    def try_acquire(self):
+        self.threads.add(threading.current_thread())
+        if self.allowed:
+            self.allowed -= 1
+            return True
+        return False
+
+    def acquire(self, timeout_seconds):
+        return self.try_acquire()
+
+
+def drain_async(monkeypatch, batches, latinia, concurrency, rate_limiter=None):
+    sqs_handler = load_sqs_handler()
+    sqs = FakeSQS(batches, latinia)
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: sqs)
+    latinia.sqs_handler = sqs_handler
+    latinia.sent = []
+    lanes = [{"name": "default", "queue_url": "url", "weight": 1}]
+    stats = sqs_handler.new_drain_stats()
+    stats["lanes"]["default"] = sqs_handler.new_lane_stats()
+    start = time.perf_counter()
+    spans = sqs_handler.InvocationSpans()
+    asyncio.run(sqs_handler.drain_lanes_async(
+        sqs_handler.receive_lane_batches(lanes, spans), spans, stats, {"default": []}, logging.getLogger(), concurrency, rate_limiter, 100,
+        latinia.send,
+    ))
+    return stats, sqs, time.perf_counter() - start
+
+
+def test_motor_asyncio_mantiene_envios_en_curso_entre_lotes(monkeypatch):
+    latinia = FakeAsyncLatinia(latency_seconds=0.1)
+
+    stats, sqs, elapsed = drain_async(monkeypatch, build_batches(5, 10), latinia, concurrency=50)
+
+    assert stats["successful_sends"] == 50
+    # Los cinco lotes quedan en curso a la vez, sin esperar a que termine cada uno
+    assert latinia.max_in_flight > 10
+    assert elapsed < 0.4
+
+
+def test_motor_asyncio_respeta_la_concurrencia(monkeypatch):
+    latinia = FakeAsyncLatinia(latency_seconds=0.02)
+
+    stats, _, _ = drain_async(monkeypatch, build_batches(3, 10), latinia, concurrency=4)
+
+    assert stats["total_messages"] == 30
+    assert latinia.max_in_flight == 4
+
+
+def test_motor_asyncio_conserva_orden_y_fallidos(monkeypatch):
+    latinia = FakeAsyncLatinia(latency_seconds=0.01, failed_ids={"m-0-3", "m-1-7"})
+
+    stats, _, _ = drain_async(monkeypatch, build_batches(2, 10), latinia, concurrency=8)
+
+    assert stats["successful_sends"] == 18
+    assert stats["failed_sends"] == 2
+    assert [message["message_id"] for message in stats["processed_messages"]] == [
+        f"m-{batch}-{index}" for batch in range(2) for index in range(10)
+    ]
+
+
+def test_motor_asyncio_se_detiene_sin_tokens(monkeypatch):
+    latinia = FakeAsyncLatinia(latency_seconds=0.01)
+
+    rate_limiter = DenyAfter(12)
+
+    stats, _, _ = drain_async(monkeypatch, build_batches(3, 10), latinia, concurrency=8, rate_limiter=rate_limiter)
+
+    assert stats["rate_limited"] is True
+    assert stats["total_messages"] == 12
+    assert stats["successful_sends"] == 12
+    # El limitador (que puede consultar DynamoDB) no se llama en el hilo del event loop
+    assert threading.main_thread() not in rate_limiter.threads
+
+
+def test_sin_aiohttp_se_usa_el_motor_threads(monkeypatch):
+    sqs_handler = load_sqs_handler()
+    latinia = FakeLatinia(latency_seconds=0.01)
+    sqs = FakeSQS(build_batches(1, 3), latinia)
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: sqs)
+    monkeypatch.setattr(sqs_handler, "send_notification_to_latinia", latinia)
+    monkeypatch.setattr(sqs_handler.importlib.util, "find_spec", lambda name: None)
+
+    stats = sqs_handler.process_all_messages_and_send_to_latinia(
+        "url", "https://latinia", 3, 0.5, 5, logging.getLogger(), "secreto", "https://auth",
+        concurrency=3, engine="asyncio",
+    )
+
+    assert stats["successful_sends"] == 3
+    assert len(sqs.deleted) == 3
+
+
+def test_motor_asyncio_con_aiohttp(monkeypatch):
+    pytest.importorskip("aiohttp")
+    from aiohttp import web
+
+    sqs_handler = load_sqs_handler()
+    received = []
+
+    async def notify(request):
+        received.append(await request.json())
+        return web.json_response({"ok": True})
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/notify", notify)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            return await asyncio.to_thread(
+                sqs_handler.process_all_messages_and_send_to_latinia,
+                "url", f"http://127.0.0.1:{port}/notify", 3, 0.5, 5, logging.getLogger(), "secreto", "https://auth",
+                concurrency=20, engine="asyncio",
+            )
+        finally:
+            await runner.cleanup()
+
+    latinia = FakeLatinia(latency_seconds=0)
+    sqs = FakeSQS(build_batches(2, 10), latinia)
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: sqs)
+    monkeypatch.setattr(sqs_handler, "get_oauth_token", lambda *args: "token")
+
+    stats = asyncio.run(run())
+
+    assert stats["successful_sends"] == 20
+    assert len(received) == 20
+    assert len(sqs.deleted) == 20
+
+
+@pytest.mark.parametrize("tokens,posts", [(0, 1), (1, 2)])
+def test_motor_asyncio_reenvio_tras_401_toma_token(monkeypatch, tokens, posts):
+    aiohttp = pytest.importorskip("aiohttp")
+    from aiohttp import web
+
+    sqs_handler = load_sqs_handler()
+    received = []
+    rate_limiter = DenyAfter(tokens)
+
+    async def notify(request):
+        received.append(request.headers["Authorization"])
+        return web.Response(status=401)
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/notify", notify)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            async with aiohttp.ClientSession() as http:
+                await sqs_handler.send_notification_to_latinia_async(
+                    http, f"http://127.0.0.1:{port}/notify", {"header": {}}, 5, logging.getLogger(), "secreto", "https://auth",
+                    rate_limiter=rate_limiter,
+                )
+        finally:
+            await runner.cleanup()
+
+    monkeypatch.setattr(sqs_handler, "get_oauth_token", lambda *args: "token")
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(run())
+
+    assert len(received) == posts
+    assert threading.main_thread() not in rate_limiter.threads
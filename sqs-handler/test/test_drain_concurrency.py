@@ -0,0 +1,62 @@
+import time
+
+from conftest import FakeLatinia, FakeSQS, build_batches, load_sqs_handler
+
+
+def drain(monkeypatch, batches, latinia, concurrency):
+    sqs_handler = load_sqs_handler()
+    sqs = FakeSQS(batches, latinia)
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: sqs)
+    monkeypatch.setattr(sqs_handler, "send_notification_to_latinia", latinia)
+    start = time.perf_counter()
+    stats = sqs_handler.process_all_messages_and_send_to_latinia(
+        "url", "https://latinia", 3, 0.5, 5, sqs_handler.logging.getLogger(), "secreto", "https://auth",
+        concurrency=concurrency,
+    )
+    return stats, sqs, time.perf_counter() - start
+
+
+def test_lote_se_envia_en_paralelo(monkeypatch):
+    latinia = FakeLatinia(latency_seconds=0.05)
+
+    stats, sqs, elapsed = drain(monkeypatch, build_batches(3, 10), latinia, concurrency=10)
+
+    assert stats["successful_sends"] == 30
+    assert len(sqs.deleted) == 30
+    assert latinia.max_in_flight == 10
+    # Secuencial serian 30 x 50 ms
+    assert elapsed < 0.75
+
+
+def test_siguiente_lote_se_recibe_durante_el_envio(monkeypatch):
+    latinia = FakeLatinia(latency_seconds=0.05)
+
+    stats, sqs, _ = drain(monkeypatch, build_batches(3, 4), latinia, concurrency=4)
+
+    assert stats["total_messages"] == 12
+    assert sqs.receives_during_send >= 2
+
+
+def test_fallidos_no_se_eliminan_con_envio_concurrente(monkeypatch):
+    latinia = FakeLatinia(latency_seconds=0.01, failed_ids={"m-0-3", "m-1-7"})
+
+    stats, sqs, _ = drain(monkeypatch, build_batches(2, 10), latinia, concurrency=5)
+
+    assert stats["successful_sends"] == 18
+    assert stats["failed_sends"] == 2
+    assert "r-0-3" not in sqs.deleted and "r-1-7" not in sqs.deleted
+    assert len(sqs.deleted) == 18
+    # Las estadisticas conservan el orden de recepcion
+    assert [message["message_id"] for message in stats["processed_messages"]][:3] == ["m-0-0", "m-0-1", "m-0-2"]
+    assert [message["success"] for message in stats["processed_messages"]].count(False) == 2
+
+
+def test_concurrencia_desde_yaml():
+    sqs_handler = load_sqs_handler()
+
+    assert sqs_handler.get_drain_config({"sqs": {"drain": {"concurrency": 16}}}) == {"engine": "threads", "concurrency": 16, "ack_flush_interval_ms": 500, "visibility_timeout_seconds": 30}
+    assert sqs_handler.get_drain_config({"sqs": {}}) == {"engine": "threads", "concurrency": 1, "ack_flush_interval_ms": 500, "visibility_timeout_seconds": 30}
+    assert sqs_handler.get_drain_config({"sqs": {"drain": {"concurrency": 0}}}) == {"engine": "threads", "concurrency": 1, "ack_flush_interval_ms": 500, "visibility_timeout_seconds": 30}
+    assert sqs_handler.get_drain_config({"sqs": {"drain": {"engine": "AsyncIO", "concurrency": 200, "ack_flush_interval_ms": 100}}}) == {
+        "engine": "asyncio", "concurrency": 200, "ack_flush_interval_ms": 100, "visibility_timeout_seconds": 30,
+    }
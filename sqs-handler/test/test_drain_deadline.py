@@ -0,0 +1,292 @@
+import asyncio
+import logging
+
+import pytest
+import requests
+
+from conftest import FakeLatinia, FakeSQS, build_batches, load_sqs_handler, sqs_record
+
+
+class FakeVisibilitySQS(FakeSQS):
+    """
+    SQS simulado que registra los receive y los cambios de visibilidad
+    """
+
+    def __init__(self, batches, latinia):
+        super().__init__(batches, latinia)
+        self.receives = []
+        self.visibility_changes = []
+
+    def receive_message(self, **kwargs):
+        self.receives.append(kwargs)
+        return super().receive_message(**kwargs)
+
+    def change_message_visibility_batch(self, QueueUrl, Entries):
+        self.visibility_changes.extend((entry["ReceiptHandle"], entry["VisibilityTimeout"]) for entry in Entries)
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries]}
+
+
+class CountingLatinia(FakeLatinia):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sent = 0
+
+    def __call__(self, body, **kwargs):
+        super().__call__(body, **kwargs)
+        self.sent += 1
+
+
+class DeadlineAfterSends:
+    """
+    Limite de tiempo que vence despues de sends envios terminados
+    """
+
+    def __init__(self, latinia, sends):
+        self.latinia = latinia
+        self.sends = sends
+
+    def expired(self):
+        return self.latinia.sent >= self.sends
+
+    def remaining_seconds(self):
+        return 0 if self.expired() else 3
+
+
+class FakeContext:
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+def drain(monkeypatch, sqs, latinia, **kwargs):
+    sqs_handler = load_sqs_handler()
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: sqs)
+    monkeypatch.setattr(sqs_handler, "send_notification_to_latinia", latinia)
+    stats = sqs_handler.process_all_messages_and_send_to_latinia(
+        "url", "https://latinia", 3, 0.5, 5, logging.getLogger(), "secreto", "https://auth", **kwargs,
+    )
+    return sqs_handler, stats
+
+
+def test_limite_desde_el_contexto():
+    sqs_handler = load_sqs_handler()
+    now = [100.0]
+    config = {"sqs": {"drain": {"safety_margin_ms": 5000}}}
+
+    deadline = sqs_handler.get_drain_deadline(config, FakeContext(20000))
+    deadline.clock = lambda: now[0]
+    deadline.deadline = now[0] + 15
+
+    assert sqs_handler.get_drain_deadline(config, None) is None
+    assert 14.9 < sqs_handler.get_drain_deadline(config, FakeContext(20000)).remaining_seconds() <= 15
+    assert sqs_handler.get_drain_deadline({"sqs": {}}, FakeContext(10000)).expired() is True
+    now[0] += 16
+    assert deadline.expired() is True
+
+
+def test_al_vencer_el_limite_se_deja_de_recibir_y_se_libera_lo_recibido(monkeypatch):
+    latinia = CountingLatinia(latency_seconds=0.01)
+    sqs = FakeVisibilitySQS(build_batches(5, 10), latinia)
+
+    _, stats = drain(monkeypatch, sqs, latinia, concurrency=10, deadline=DeadlineAfterSends(latinia, 10))
+
+    assert stats["deadline_reached"] is True
+    # Se envia el primer lote; el segundo, recibido por anticipado, vuelve a la cola
+    assert stats["successful_sends"] == 10
+    assert len(sqs.receives) == 2
+    assert sqs.visibility_changes == [(f"r-1-{index}", 0) for index in range(10)]
+    assert stats["visibility"]["released"] == 10
+    assert len(sqs.batches) == 3
+
+
+def test_receive_fija_visibilidad_y_acota_el_long_polling(monkeypatch):
+    latinia = FakeLatinia(latency_seconds=0)
+    sqs = FakeVisibilitySQS([], latinia)
+
+    class Remaining:
+        def expired(self):
+            return False
+
+        def remaining_seconds(self):
+            return 2.5
+
+    drain(monkeypatch, sqs, latinia, visibility_timeout_seconds=45, deadline=Remaining())
+
+    assert {receive["VisibilityTimeout"] for receive in sqs.receives} == {45}
+    assert [receive["WaitTimeSeconds"] for receive in sqs.receives] == [0, 2]
+
+
+def test_envio_lento_extiende_la_visibilidad(monkeypatch):
+    latinia = FakeLatinia(latency_seconds=0.8)
+    sqs = FakeVisibilitySQS(build_batches(1, 2), latinia)
+
+    _, stats = drain(monkeypatch, sqs, latinia, concurrency=2, visibility_timeout_seconds=1)
+
+    assert stats["successful_sends"] == 2
+    assert {handle for handle, timeout in sqs.visibility_changes if timeout == 1} == {"r-0-0", "r-0-1"}
+    assert stats["visibility"]["extended"] >= 2
+
+
+def test_extension_solo_de_mensajes_en_curso():
+    sqs_handler = load_sqs_handler()
+    now = [0.0]
+    sqs = FakeVisibilitySQS([], FakeLatinia())
+    sqs_handler.get_client = lambda service_name, region_name=None: sqs
+    manager = sqs_handler.VisibilityManager(logging.getLogger(), 30, clock=lambda: now[0])
+    lane = {"name": "low", "queue_url": "url", "weight": 1}
+    messages = build_batches(1, 3)[0]
+
+    list(manager.track_batches(iter([(lane, messages)])))
+    manager.done(messages[0])
+    now[0] = 10
+    manager.extend_due()
+    assert sqs.visibility_changes == []
+
+    now[0] = 16
+    manager.extend_due()
+    assert sqs.visibility_changes == [("r-0-1", 30), ("r-0-2", 30)]
+
+    manager.release(lane, [messages[2]])
+    now[0] = 40
+    manager.extend_due()
+    assert sqs.visibility_changes[2:] == [("r-0-2", 0), ("r-0-1", 30)]
+
+
+def test_al_vencer_el_limite_se_extiende_lo_que_sigue_en_curso(monkeypatch):
+    sqs_handler = load_sqs_handler()
+    monkeypatch.setattr(sqs_handler, "VISIBILITY_CHECK_INTERVAL_SECONDS", 0.01)
+    sqs = FakeVisibilitySQS([], FakeLatinia())
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: sqs)
+
+    class Expired:
+        def expired(self):
+            return True
+
+    manager = sqs_handler.VisibilityManager(logging.getLogger(), 30, deadline=Expired())
+    list(manager.track_batches(iter([({"name": "low", "queue_url": "url"}, build_batches(1, 2)[0])])))
+    manager.start()
+    asyncio.run(asyncio.sleep(0.1))
+    manager.close()
+
+    # Una sola extension forzada, aunque no haya pasado la mitad de la visibilidad
+    assert sqs.visibility_changes == [("r-0-0", 30), ("r-0-1", 30)]
+
+
+def test_motor_asyncio_libera_lo_no_enviado_al_vencer_el_limite(monkeypatch):
+    sqs_handler = load_sqs_handler()
+    latinia = FakeLatinia()
+    sqs = FakeVisibilitySQS(build_batches(3, 10), latinia)
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: sqs)
+    lanes = [{"name": "default", "queue_url": "url", "weight": 1}]
+    stats = sqs_handler.new_drain_stats()
+    stats["lanes"]["default"] = sqs_handler.new_lane_stats()
+    released = []
+    sent = []
+
+    async def send(message, lane, number):
+        sent.append(message["MessageId"])
+        await asyncio.sleep(0.01)
+        return True
+
+    class ExpiresAfterSends:
+        def expired(self):
+            return len(sent) >= 4
+
+        def remaining_seconds(self):
+            return 0 if self.expired() else 3
+
+    deadline = ExpiresAfterSends()
+    spans = sqs_handler.InvocationSpans()
+    asyncio.run(sqs_handler.drain_lanes_async(
+        sqs_handler.receive_lane_batches(lanes, spans), spans, stats, {"default": []},
+        logging.getLogger(), 4, None, 100, send, deadline=deadline,
+        release=lambda lane, messages: released.extend(message["MessageId"] for message in messages),
+    ))
+
+    assert stats["deadline_reached"] is True
+    assert stats["successful_sends"] == 4
+    # El resto del primer lote y el lote recibido por anticipado vuelven a la cola
+    assert released == [f"m-0-{index}" for index in range(4, 10)] + [f"m-1-{index}" for index in range(10)]
+
+
+def test_evento_sqs_sin_tiempo_devuelve_y_libera_todo(handler):
+    sqs_handler, config, latinia, aws = handler
+    aws.change_message_visibility_batch = lambda QueueUrl, Entries: aws.deleted_objects.extend(
+        (QueueUrl, entry["ReceiptHandle"], entry["VisibilityTimeout"]) for entry in Entries
+    ) or {"Successful": [{"Id": entry["Id"]} for entry in Entries]}
+
+    response = sqs_handler.lambda_handler({"Records": [sqs_record("m-0"), sqs_record("m-1")]}, FakeContext(1000))
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "m-0"}, {"itemIdentifier": "m-1"}]}
+    assert latinia.max_in_flight == 0
+    queue_url = config["sqs"]["lanes"]["low"]["queue_url"]
+    assert aws.deleted_objects == [(queue_url, "r-m-0", 0), (queue_url, "r-m-1", 0)]
+
+
+def test_margen_por_defecto_desde_el_timeout_de_latinia():
+    sqs_handler = load_sqs_handler()
+    config = {"sqs": {"drain": {}}, "lambda": {"timeout_seconds": 10}}
+
+    deadline = sqs_handler.get_drain_deadline(config, FakeContext(60000))
+
+    # Envio y reintento tras 401 (2 x 10 s) mas el cierre del drenado
+    assert 37.9 < deadline.remaining_seconds() <= 38
+
+
+def test_solicitudes_acotadas_al_fin_de_la_invocacion():
+    sqs_handler = load_sqs_handler()
+    now = [0.0]
+    deadline = sqs_handler.DrainDeadline(20000, safety_margin_ms=15000, clock=lambda: now[0])
+
+    assert deadline.request_timeout(10) == 10
+    now[0] = 12
+    # El margen (15 s) no alcanza para el timeout de 10 s: se acota al fin menos el cierre
+    assert deadline.expired() is True
+    assert deadline.request_timeout(10) == 6
+    now[0] = 17.9
+    with pytest.raises(requests.exceptions.Timeout):
+        deadline.request_timeout(10)
+    assert sqs_handler.request_timeout(10) == 10
+
+
+def test_envio_y_token_usan_el_tiempo_restante(monkeypatch):
+    sqs_handler = load_sqs_handler()
+    now = [0.0]
+    deadline = sqs_handler.DrainDeadline(10000, safety_margin_ms=5000, clock=lambda: now[0])
+    posts = []
+    sessions = []
+
+    class Response:
+        def __init__(self, status_code, payload=None):
+            self.status_code = status_code
+            self.text = ""
+            self.payload = payload
+
+        def json(self):
+            return self.payload
+
+        def raise_for_status(self):
+            if self.status_code >= 400:
+                raise requests.exceptions.HTTPError(str(self.status_code))
+
+    class Session:
+        def post(self, url, timeout, **kwargs):
+            posts.append((url, timeout))
+            now[0] += 2
+            if url == "https://auth":
+                return Response(200, {"access_token": "token", "expires_in": 3600})
+            return Response(401 if len(posts) == 2 else 200)
+
+    monkeypatch.setattr(sqs_handler, "get_secret", lambda *args, **kwargs: {"client_id": "cliente-oauth", "client_secret": "s"})
+    monkeypatch.setattr(sqs_handler, "get_session", lambda url, *args: sessions.append(args) or Session())
+    sqs_handler.oauth_token_cache.invalidate()
+
+    sqs_handler.send_notification_to_latinia(
+        "https://latinia", {"header": {"id": "m-0"}}, Session(), 10, logging.getLogger(), "secreto", "https://auth", deadline=deadline,
+    )
+
+    # Token sin reintentos de urllib3; cada solicitud usa lo que queda hasta 8 s
+    assert sessions == [(0,), (0,)]
+    assert posts == [("https://auth", 8), ("https://latinia", 6), ("https://auth", 4), ("https://latinia", 2)]
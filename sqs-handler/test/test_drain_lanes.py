@@ -0,0 +1,105 @@
+import json
+import time
+
+from conftest import load_sqs_handler
+
+
+class FakeLaneSQS:
+    """
+    Colas SQS en memoria por URL: cada receive_message entrega el siguiente
+    lote preparado de la cola
+    """
+
+    def __init__(self, batches=None, depths=None):
+        self.batches = {url: list(items) for url, items in (batches or {}).items()}
+        self.depths = depths or {}
+        self.receives = []
+        self.deleted = []
+
+    def get_queue_attributes(self, QueueUrl, AttributeNames):
+        return {"Attributes": {"ApproximateNumberOfMessages": str(self.depths.get(QueueUrl, 0))}}
+
+    def receive_message(self, QueueUrl, WaitTimeSeconds, **kwargs):
+        self.receives.append((QueueUrl, WaitTimeSeconds))
+        pending = self.batches.get(QueueUrl)
+        return {"Messages": pending.pop(0)} if pending else {}
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        self.deleted.extend((QueueUrl, entry["ReceiptHandle"]) for entry in Entries)
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries]}
+
+
+def lane_config():
+    return {
+        "queue_url": "url-baja",
+        "lanes": {
+            "low": {"queue_url": "url-baja", "weight": 1},
+            "high": {"queue_url": "url-alta", "weight": 2},
+        },
+    }
+
+
+def lane_messages(lane, batch, count=1, sent_timestamp=None):
+    return [
+        {
+            "MessageId": f"{lane}-{batch}-{i}",
+            "ReceiptHandle": f"r-{lane}-{batch}-{i}",
+            "Body": json.dumps({"payload": {"header": {"refService": lane}}}),
+            "Attributes": {"SentTimestamp": str(sent_timestamp)} if sent_timestamp else {},
+        }
+        for i in range(count)
+    ]
+
+
+def test_drenado_ponderado_entre_carriles(monkeypatch):
+    sqs_handler = load_sqs_handler()
+    sqs = FakeLaneSQS(batches={
+        "url-alta": [lane_messages("alta", batch) for batch in range(3)],
+        "url-baja": [lane_messages("baja", batch) for batch in range(3)],
+    })
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: sqs)
+    monkeypatch.setattr(sqs_handler, "send_notification_to_latinia", lambda **kwargs: None)
+    lanes = sqs_handler.get_lanes({"sqs": lane_config()})
+
+    stats = sqs_handler.process_all_messages_and_send_to_latinia(
+        "url-baja", "https://latinia", 3, 0.5, 5, sqs_handler.logging.getLogger(), "secreto", "https://auth", lanes=lanes,
+    )
+
+    assert [lane["name"] for lane in lanes] == ["high", "low"]
+    assert [message["lane"] for message in stats["processed_messages"]] == ["high", "high", "low", "high", "low", "low"]
+    assert stats["lanes"]["high"]["successful_sends"] == 3
+    assert sorted(sqs.deleted) == [("url-alta", f"r-alta-{batch}-0") for batch in range(3)] + [("url-baja", f"r-baja-{batch}-0") for batch in range(3)]
+    # Solo la ronda final sin mensajes usa long polling, repartido entre los carriles
+    assert [wait for _, wait in sqs.receives if wait] == [2, 2]
+
+
+def test_estadisticas_de_profundidad_y_tiempo_en_cola(monkeypatch, capsys):
+    sqs_handler = load_sqs_handler()
+    sent_timestamp = int(time.time() * 1000) - 1500
+    sqs = FakeLaneSQS(
+        batches={"url-alta": [lane_messages("alta", 0, count=2, sent_timestamp=sent_timestamp)]},
+        depths={"url-alta": 2, "url-baja": 7},
+    )
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: sqs)
+    monkeypatch.setattr(sqs_handler, "send_notification_to_latinia", lambda **kwargs: None)
+    lanes = sqs_handler.get_lanes({"sqs": lane_config()})
+
+    stats = sqs_handler.process_all_messages_and_send_to_latinia(
+        "url-baja", "https://latinia", 3, 0.5, 5, sqs_handler.logging.getLogger(), "secreto", "https://auth", lanes=lanes,
+    )
+
+    assert stats["lanes"]["high"]["depth"] == 2
+    assert stats["lanes"]["low"]["depth"] == 7
+    assert stats["lanes"]["high"]["processed"] == 2
+    assert stats["lanes"]["high"]["max_queue_time_ms"] >= 1500
+    assert stats["lanes"]["low"]["processed"] == 0
+    documents = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith('{"_aws"')]
+    lane_documents = [document for document in documents if "Lane" in document]
+    assert {(document["Lane"], document.get("LaneDepth")) for document in lane_documents if "LaneDepth" in document} == {("high", 2), ("low", 7)}
+    assert any(document.get("LaneQueueTimeMax", 0) >= 1500 for document in lane_documents)
+
+
+def test_sin_carriles_se_drena_la_cola_unica():
+    sqs_handler = load_sqs_handler()
+
+    assert sqs_handler.get_lanes({"sqs": {"queue_url": "url-unica"}}) == [{"name": "default", "queue_url": "url-unica", "weight": 1}]
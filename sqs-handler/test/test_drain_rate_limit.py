@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from conftest import FakeClock, load_sqs_handler
+
+
+def test_drenado_se_detiene_sin_tokens(monkeypatch):
+    sqs_handler = load_sqs_handler()
+    messages = [{"MessageId": f"m-{i}", "ReceiptHandle": f"r-{i}", "Body": json.dumps({"payload": {"header": {}}})} for i in range(3)]
+
+    class FakeSQS:
+        def __init__(self):
+            self.deleted = []
+
+        def receive_message(self, **kwargs):
+            return {"Messages": messages}
+
+        def delete_message_batch(self, QueueUrl, Entries):
+            self.deleted.extend(entry["ReceiptHandle"] for entry in Entries)
+            return {"Successful": [{"Id": entry["Id"]} for entry in Entries]}
+
+    sqs = FakeSQS()
+    monkeypatch.setattr(sqs_handler, "get_client", lambda service_name, region_name=None: sqs)
+    monkeypatch.setattr(sqs_handler, "send_notification_to_latinia", lambda **kwargs: None)
+    limiter = sqs_handler.TokenBucket("latinia", rate_per_second=0.001, burst=2, clock=FakeClock(1000.0))
+
+    stats = sqs_handler.process_all_messages_and_send_to_latinia(
+        "url", "https://latinia", 3, 0.5, 5, sqs_handler.logging.getLogger(), "secreto", "https://auth",
+        rate_limiter=limiter, rate_limit_max_wait_ms=0,
+    )
+
+    assert stats["rate_limited"] is True
+    assert stats["successful_sends"] == 2
+    assert sqs.deleted == ["r-0", "r-1"]
+
+
+@pytest.mark.parametrize("tokens,posts", [(0, 1), (1, 2)])
+def test_drenado_reenvio_tras_401_toma_token(monkeypatch, tokens, posts):
+    import requests
+
+    sqs_handler = load_sqs_handler()
+    calls = []
+
+    class Response:
+        status_code = 401
+        text = ""
+
+        def raise_for_status(self):
+            raise requests.exceptions.HTTPError("401")
+
+    class Session:
+        def post(self, url, timeout, **kwargs):
+            calls.append(url)
+            return Response()
+
+    monkeypatch.setattr(sqs_handler, "get_oauth_token", lambda *args, **kwargs: "token")
+    limiter = sqs_handler.TokenBucket("latinia", rate_per_second=0.001, burst=1, clock=FakeClock(1000.0))
+    for _ in range(1 - tokens):
+        limiter.try_acquire()
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        sqs_handler.send_notification_to_latinia(
+            "https://latinia", {"header": {}}, Session(), 5, sqs_handler.logging.getLogger(), "secreto", "https://auth",
+            rate_limiter=limiter,
+        )
+
+    assert len(calls) == posts
@@ -0,0 +1,86 @@
+import json
+
+from conftest import ARN_BAJA, build_batches, sqs_record
+
+
+def test_evento_sqs_informa_solo_los_fallidos(handler):
+    sqs_handler, _, latinia, aws = handler
+    event = {"Records": [sqs_record(f"m-{index}") for index in range(8)]}
+
+    response = sqs_handler.lambda_handler(event, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "m-2"}]}
+    assert latinia.max_in_flight == 4
+    # Los exitosos los elimina el event source mapping
+    assert aws.deleted == []
+
+
+def test_evento_sqs_elimina_claim_check_solo_de_exitosos(handler):
+    sqs_handler, _, _, aws = handler
+    event = {"Records": [
+        sqs_record("m-1", claim_check="s3://bucket/payloads/m-1.json.gz"),
+        sqs_record("m-2", claim_check="s3://bucket/payloads/m-2.json.gz"),
+    ]}
+
+    response = sqs_handler.lambda_handler(event, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "m-2"}]}
+    assert aws.deleted_objects == ["s3://bucket/payloads/m-1.json.gz"]
+
+
+def test_evento_sqs_en_mantenimiento_devuelve_todo(handler):
+    sqs_handler, config, latinia, _ = handler
+    config["latinia"]["mantenimiento"] = True
+
+    response = sqs_handler.lambda_handler({"Records": [sqs_record("m-0"), sqs_record("m-1")]}, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "m-0"}, {"itemIdentifier": "m-1"}]}
+    assert latinia.max_in_flight == 0
+
+
+def test_evento_sqs_sin_tokens_devuelve_los_no_enviados(handler, monkeypatch):
+    sqs_handler, _, _, aws = handler
+
+    class DenyAfter:
+        allowed = 2
+
+        def acquire(self, timeout_seconds):
+            self.allowed -= 1
+            return self.allowed >= 0
+
+    monkeypatch.setattr(sqs_handler, "get_rate_limiter", lambda config_file: DenyAfter())
+    aws.change_message_visibility_batch = lambda QueueUrl, Entries: aws.deleted_objects.extend(
+        (entry["ReceiptHandle"], entry["VisibilityTimeout"]) for entry in Entries
+    ) or {"Successful": [{"Id": entry["Id"]} for entry in Entries]}
+
+    response = sqs_handler.lambda_handler({"Records": [sqs_record(f"m-{index}") for index in (0, 1, 3, 4)]}, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "m-3"}, {"itemIdentifier": "m-4"}]}
+    # Sin tokens no se liberan: vuelven al vencer su visibilidad, no en caliente
+    assert aws.deleted_objects == []
+
+
+def test_registro_se_asocia_al_carril_de_su_cola(handler):
+    sqs_handler, config, _, _ = handler
+    lanes = sqs_handler.get_lanes(config)
+
+    high = sqs_handler.get_record_lane(sqs_record("m-0", arn=ARN_BAJA + "-prioritaria"), lanes)
+    low = sqs_handler.get_record_lane(sqs_record("m-0"), lanes)
+    unknown = sqs_handler.get_record_lane(sqs_record("m-0", arn="arn:aws:sqs:us-east-1:308528169754:otra"), lanes)
+
+    assert (high["name"], low["name"], unknown["name"]) == ("high", "low", "default")
+    message = sqs_handler.record_to_message(sqs_record("m-0", claim_check="s3://bucket/key"))
+    assert message["MessageAttributes"]["ClaimCheck"]["StringValue"] == "s3://bucket/key"
+    assert sqs_handler.get_queue_time_ms(message) is not None
+
+
+def test_evento_programado_mantiene_el_drenado_por_polling(handler):
+    sqs_handler, config, latinia, aws = handler
+    aws.batches = build_batches(1, 3)
+    config["sqs"].pop("lanes")
+
+    response = sqs_handler.lambda_handler({"source": "aws.events"}, None)
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["stats"]["successful_sends"] == 3
+    assert len(aws.deleted) == 3